@@ -1,10 +1,14 @@
-from fastapi import FastAPI, UploadFile, File
+from contextlib import asynccontextmanager
+import asyncio
+from fastapi import FastAPI, UploadFile, File, Header, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel
+from typing import Optional
 import numpy as np
-import torch
 import io
+import base64
 from pathlib import Path
 import glob
 import random
@@ -13,46 +17,102 @@ from fastapi.responses import StreamingResponse
 import json
 import time
 RAW_NPZ_DIR = DATA_RAW / "3dses_npz"
-from config import CHECKPOINT_DIR, NUM_CLASSES, GRID_SIZE, PROJECT_ROOT
-from models.pointnet import PointNetSegLite
-from rl_nav import SimpleRLAgent
+from config import CHECKPOINT_DIR, GRID_SIZE, PROJECT_ROOT, PRELOAD_MODELS, WARMUP_POINTS
+from config import SESSION_TTL, SESSION_MAX, SESSION_DIR, DATA_PROCESSED, SEG_JOB_WORKERS
+from config import ALLOW_DEBUG_PROFILE, TNET_POINTS, SEG_MODEL_NAME, SEG_MODEL_AB
+from config import NUM_CLASSES, ROBOT_HEIGHT, STEP_HEIGHT, MAP_TILE_SIZE, MAP_FEED_POLL, FEATURE_CACHE_MB
+from config import INGEST_POOL_MB
+from config import API_WORKERS, TORCH_THREADS, TORCH_INTEROP_THREADS, CPU_AFFINITY
+import runtime
+from model_loader import LazyModel, get_device
+from model_registry import ModelRegistry
+from sessions import SessionStore, DiskSessionBackend
+from seg_jobs import SegJobManager
+from mapping import LAYER_NAMES, build_layers, stack_layers
+from map_pyramid import MapPyramid
+from registration import ScanMap, transform
+from feature_cache import FeatureCache, scene_hash
+from ingest import BufferPool, as_batch, load_points, normalize_into
+from exploration import nearest_free
+from scan_format import open_scan_bytes
+from metrics import REGISTRY, MetricsMiddleware, stage, record_inference
+
+# torch, the segmentation model and the RL agent are loaded lazily
+# (see model_loader.py) so /health answers before they are ready.
+
+# CPU pinning + thread budget of this worker, before torch is imported
+runtime.configure(API_WORKERS, TORCH_THREADS, TORCH_INTEROP_THREADS, CPU_AFFINITY)
 
 # -----------------------------------------------------------
-# FastAPI Setup
+# Segmentation Models (checkpoints in CHECKPOINT_DIR, see model_registry.py)
 # -----------------------------------------------------------
 
-app = FastAPI(title="Indoor LiDAR Mapping & Navigation API")
+def warmup_seg_model(model):
+    """
+    One forward pass at a typical request size so the first real
+    request does not pay for allocator / kernel initialisation.
+    """
+    import torch
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    with torch.no_grad():
+        model(torch.zeros((1, WARMUP_POINTS, model.input_dim), device=get_device()))
+
+
+def build_rl_agent():
+    from rl_nav import SimpleRLAgent
+    return SimpleRLAgent(device=get_device())
+
+
+SEG_MODELS = ModelRegistry(
+    CHECKPOINT_DIR,
+    default=SEG_MODEL_NAME,
+    ab=SEG_MODEL_AB,
+    warmup=warmup_seg_model,
 )
 
-DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+# RL Agent (holds the shared Q-network; per-session agents reuse it)
+RL_AGENT = LazyModel("rl_agent", build_rl_agent)
+
+
+def build_session_agent():
+    from rl_nav import SimpleRLAgent
+    return SimpleRLAgent(device=get_device(), q_net=RL_AGENT.get().q_net)
+
+
+# Occupancy map + RL environment, per X-Session-ID
+SESSIONS = SessionStore(
+    grid_size=GRID_SIZE,
+    agent_factory=build_session_agent,
+    ttl=SESSION_TTL,
+    max_sessions=SESSION_MAX,
+    backend=DiskSessionBackend(SESSION_DIR) if SESSION_DIR else None,
+)
+
+BACKEND_DIR = Path(__file__).resolve().parent
 
 # -----------------------------------------------------------
-# Load Segmentation Model (input_dim=7 since your dataset is Nx7)
+# FastAPI Setup
 # -----------------------------------------------------------
 
-SEG_MODEL = PointNetSegLite(num_classes=NUM_CLASSES, input_dim=7).to(DEVICE)
+@asynccontextmanager
+async def lifespan(app):
+    if PRELOAD_MODELS:
+        SEG_MODELS.warmup_async()
+        RL_AGENT.warmup_async()
+    yield
 
-ckpt = CHECKPOINT_DIR / "pointnet_3dses_best.pth"
-if ckpt.exists():
-    SEG_MODEL.load_state_dict(torch.load(ckpt, map_location=DEVICE))
-    SEG_MODEL.eval()
-    print("[INFO] Loaded segmentation checkpoint.")
-else:
-    print("[WARN] Segmentation checkpoint not found. Using random weights.")
 
-# Global occupancy map
-GLOBAL_OCC = np.zeros((GRID_SIZE, GRID_SIZE), dtype=np.uint8)
+app = FastAPI(title="Indoor LiDAR Mapping & Navigation API", lifespan=lifespan)
 
-# RL Agent
-RL_AGENT = SimpleRLAgent(device=DEVICE)
-BACKEND_DIR = Path(__file__).resolve().parent
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["ETag", "X-Tile-Shape"],
+)
+app.add_middleware(MetricsMiddleware)
 
 # -----------------------------------------------------------
 # Response Models
@@ -61,12 +121,25 @@ BACKEND_DIR = Path(__file__).resolve().parent
 class SegmentResponse(BaseModel):
     num_points: int
     labels: list[int]
+    profile: Optional[dict] = None   # only with X-Debug-Profile and ALLOW_DEBUG_PROFILE=1
+    model: Optional[str] = None      # checkpoint that produced the labels
+    scene: Optional[str] = None      # pass back as X-Scene when re-segmenting parts of this cloud
+    cached: Optional[bool] = None    # scene features came from the feature cache
 
 
 class MapResponse(BaseModel):
     grid: list[list[int]]
 
 
+class ScanRegistrationResponse(MapResponse):
+    pose: list[list[float]]   # 4x4, scan frame -> map frame
+    fitness: float            # share of scan points matched to the map
+    rmse: float               # point-to-plane residual (m)
+    iterations: int
+    fused: bool               # False: alignment too poor, map unchanged
+    scans: int                # scans fused so far
+
+
 class RLStateResponse(BaseModel):
     grid: list[list[int]]
     reward: float
@@ -83,6 +156,76 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus text format: request / stage latency histograms,
+    model inference counters and process memory.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness: 200 once every model is loaded and warmed up, else 503.
+    Models not loaded yet start warming up in the background, so polling
+    /ready brings a worker up without PRELOAD_MODELS or a first request.
+    `runtime` shows this worker's CPU / thread budget (runtime.py).
+    """
+    SEG_MODELS.warmup_async()   # no-op once loaded or loading
+    RL_AGENT.warmup_async()
+    models = {
+        "segmentation": SEG_MODELS.entry(SEG_MODELS.default).status(),
+        "rl_agent": RL_AGENT.status(),
+    }
+    is_ready = all(m["state"] == "ready" for m in models.values())
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "models": models, "runtime": runtime.describe()},
+    )
+
+
+# -----------------------------------------------------------
+# Segmentation Model Registry
+# -----------------------------------------------------------
+
+class DefaultModelRequest(BaseModel):
+    name: str
+
+
+@app.get("/models")
+def list_models():
+    """
+    Checkpoints in CHECKPOINT_DIR with metadata, load state, load time
+    and memory. Segmentation endpoints take an X-Model header.
+    """
+    return SEG_MODELS.status()
+
+
+@app.post("/models/{name}/reload")
+def reload_model(name: str):
+    """
+    (Re)loads a checkpoint, e.g. after overwriting the .pth file. The
+    previous version keeps serving until the new one is ready.
+    """
+    if not SEG_MODELS.exists(name):
+        return unknown_model(name)
+    new = SEG_MODELS.reload(name)
+    if new.error:
+        return JSONResponse(status_code=500, content={"error": f"Loading {name} failed: {new.error}"})
+    return new.status()
+
+
+@app.post("/models/default")
+def set_default_model(req: DefaultModelRequest):
+    if not SEG_MODELS.exists(req.name):
+        return unknown_model(req.name)
+    SEG_MODELS.get(req.name)   # load before switching, so requests never wait
+    SEG_MODELS.set_default(req.name)
+    return {"default": SEG_MODELS.default}
+
+
 # -----------------------------------------------------------
 # Download Sample NPZ
 # -----------------------------------------------------------
@@ -105,141 +248,448 @@ def download_sample_npz():
 # SEGMENTATION — FIXED VERSION
 # ----------------------------------------------------------
 
-def to_model_input(points: np.ndarray) -> torch.Tensor:
+def to_model_input(points: np.ndarray):
     """
     points: (N, F) -> normalize to (N,7) and convert to (1, N, 7) tensor
     """
+    import torch
+
     points = normalize_point_features(points)              # (N,7)
     pts = torch.from_numpy(points).float().unsqueeze(0)    # (1,N,7)
-    return pts.to(DEVICE)
+    return pts.to(get_device())
     
 def normalize_point_features(points):
     """
-    Ensures points always become (N,7)
+    Ensures points always become (N,7) float32
     - If >7 features → keep first 7
     - If <7 features → pad with zeros
+    Cast, crop and padding happen in one copy; float32 input with at
+    least 7 features is returned without copying.
     """
 
-    pts = np.asarray(points, dtype=np.float32)
+    pts = np.asarray(points)
+    if pts.dtype == np.float32 and pts.shape[1] >= 7:
+        return pts[:, :7]
 
-    # If too many features → crop
-    if pts.shape[1] > 7:
-        pts = pts[:, :7]
+    out = np.empty((pts.shape[0], 7), dtype=np.float32)
+    k = min(pts.shape[1], 7)
+    np.copyto(out[:, :k], pts[:, :k], casting="unsafe")
+    out[:, k:] = 0
+    return out
 
-    # If too few → pad
-    if pts.shape[1] < 7:
-        pad_width = 7 - pts.shape[1]
-        pad = np.zeros((pts.shape[0], pad_width), dtype=np.float32)
-        pts = np.concatenate([pts, pad], axis=1)
+STREAM_BATCH_SIZE = 50000
 
-    return pts
+# Reusable (N,7) model input buffers for /segment and /segment_stream
+INGEST_POOL = BufferPool(max_bytes=INGEST_POOL_MB * 2**20)
 
-@app.post("/segment_stream")
-async def segment_stream(file: UploadFile = File(...)):
-    content = await file.read()
-    data = np.load(io.BytesIO(content))
-
-    if "points" not in data:
-        return StreamingResponse(
-            iter([f"data: {json.dumps({'error': 'points missing'})}\n\n"]),
-            media_type="text/event-stream"
-        )
 
-    points = normalize_point_features(data["points"])
-    N = points.shape[0]
-    batch_size = 50000
+def encode_labels(preds: np.ndarray) -> str:
+    """
+    Pack per-point labels as base64 uint8 (one byte per point).
+    """
+    return base64.b64encode(np.ascontiguousarray(preds, dtype=np.uint8).tobytes()).decode("ascii")
 
-    total_batches = (N + batch_size - 1) // batch_size
 
-    def event_generator():
-        # Send header info (total batches)
-        yield f"data: {json.dumps({'total_batches': total_batches})}\n\n"
+def sse_event(payload: dict, event_id=None) -> str:
+    """
+    Format one Server-Sent Event. Events carrying an id can be resumed
+    with the Last-Event-ID header.
+    """
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}data: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
 
-        all_preds = []
+def segment_stream_events(points: np.ndarray, batch_size=STREAM_BATCH_SIZE, resume_after=0, model_name=None):
+    """
+    Yields SSE events for chunked segmentation of a (N,7) cloud.
 
-        with torch.no_grad():
-            batch_num = 1
-            for i in range(0, N, batch_size):
-                part = points[i:i+batch_size]
-                pts = torch.from_numpy(part).float().unsqueeze(0).to(DEVICE)
+    Protocol:
+      header -> {type, num_points, batch_size, total_batches, encoding, resume_after, model}
+      batch  -> id=<batch>, {type, batch, offset, count, labels(base64 uint8),
+                             progress, batch_ms, elapsed_ms}
+      done   -> {type, num_points, batches_sent, elapsed_ms, cpu_ms}
 
-                logits = SEG_MODEL(pts)
+    Labels are sent exactly once; clients assemble the full result from the
+    (offset, count) of each batch. Batches with id <= resume_after are skipped.
+    """
+    N = points.shape[0]
+    total_batches = (N + batch_size - 1) // batch_size
+    import torch
+
+    model_name = SEG_MODELS.resolve(model_name)
+    model = SEG_MODELS.get(model_name)
+    device = get_device()
+    t0 = time.perf_counter()
+    cpu0 = time.process_time()
+    trans = scene_transform(model, points)
+
+    yield sse_event({
+        "type": "header",
+        "num_points": int(N),
+        "batch_size": int(batch_size),
+        "total_batches": int(total_batches),
+        "encoding": "base64-uint8",
+        "resume_after": int(resume_after),
+        "model": model_name,
+    })
+
+    sent = 0
+    with torch.no_grad():
+        for batch_num in range(resume_after + 1, total_batches + 1):
+            tb = time.perf_counter()
+            offset = (batch_num - 1) * batch_size
+            pts = as_batch(points[offset:offset + batch_size, :model.input_dim], device)
+
+            with stage("forward"):
+                tf = time.perf_counter()
+                logits = model(pts, trans=trans)
                 preds = logits.argmax(dim=1).squeeze(0).cpu().numpy()
+            now = time.perf_counter()
+            record_inference(model_name, preds.shape[0], now - tf)
+
+            sent += 1
+            with stage("serialize"):
+                event = sse_event({
+                    "type": "batch",
+                    "batch": batch_num,
+                    "offset": int(offset),
+                    "count": int(preds.shape[0]),
+                    "labels": encode_labels(preds),
+                    "progress": round(batch_num / total_batches, 4),
+                    "batch_ms": round((now - tb) * 1000, 2),
+                    "elapsed_ms": round((now - t0) * 1000, 2),
+                }, event_id=batch_num)
+            yield event
+
+    yield sse_event({
+        "type": "done",
+        "num_points": int(N),
+        "batches_sent": sent,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+        "cpu_ms": round((time.process_time() - cpu0) * 1000, 2),
+    })
+
+
+def scene_transform(model, points: np.ndarray):
+    """
+    One T-Net transform for a whole scene, estimated from TNET_POINTS
+    points, to reuse for every chunk. None when TNET_POINTS=0 (each chunk
+    then computes its own transform from all of its points).
+    """
+    import torch
 
-                # Save partial results
-                all_preds.append(preds.tolist())
+    if not TNET_POINTS:
+        return None
+    with stage("tnet"), torch.no_grad():
+        return model.input_transform(torch.from_numpy(points[:, :model.input_dim]).unsqueeze(0), TNET_POINTS)
 
-                # Send batch update to UI
-                yield f"data: {json.dumps({'batch': batch_num, 'preds': preds.tolist()})}\n\n"
-                batch_num += 1
 
-        final_preds = np.concatenate([np.array(x) for x in all_preds]).tolist()
+def predict_labels(model, points: np.ndarray, model_name="segmentation", batch_size=STREAM_BATCH_SIZE) -> np.ndarray:
+    """
+    Full-resolution labels for a (N,7) cloud, segmented in chunks of batch_size.
+    """
+    import torch
 
-        # Final result
-        yield f"data: {json.dumps({'done': True, 'final': final_preds})}\n\n"
+    device = get_device()
+    trans = scene_transform(model, points)
+    out = np.empty((points.shape[0],), dtype=np.uint8)
+    with torch.no_grad():
+        for i in range(0, points.shape[0], batch_size):
+            tf = time.perf_counter()
+            pts = torch.from_numpy(points[i:i + batch_size, :model.input_dim]).float().unsqueeze(0).to(device)
+            out[i:i + batch_size] = model(pts, trans=trans).argmax(dim=1).squeeze(0).cpu().numpy()
+            record_inference(model_name, pts.shape[1], time.perf_counter() - tf)
+    return out
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
 
+def resolve_model(name):
+    """
+    Checkpoint name for a request: the X-Model header, else the A/B split
+    (SEG_MODEL_AB), else the default. None if the name is unknown.
+    """
+    try:
+        return SEG_MODELS.resolve(name)
+    except KeyError:
+        return None
 
-@app.post("/segment", response_model=SegmentResponse)
-async def segment(file: UploadFile = File(...)):
-    MAX_PTS = 50000
 
-    content = await file.read()
-    data = np.load(io.BytesIO(content))
+def unknown_model(name):
+    return JSONResponse(status_code=404, content={"error": f"Unknown model '{name}'. See GET /models."})
 
-    if "points" not in data:
-        return {"error": "NPZ must contain 'points' array."}
 
-    raw = data["points"]  # (N,F)
-    points = normalize_point_features(raw)  # (N,7)
-    N = points.shape[0]
+@app.post("/segment_stream")
+async def segment_stream(
+    file: UploadFile = File(...),
+    last_event_id: Optional[str] = Header(None),
+    x_model: Optional[str] = Header(None),
+):
+    model_name = resolve_model(x_model)
+    if model_name is None:
+        return unknown_model(x_model)
+
+    with stage("upload"):
+        content = await file.read()
+    with stage("np_load"):
+        data = open_scan_bytes(content)   # .npz or .lsc
+
+        if "points" not in data:
+            return StreamingResponse(
+                iter([sse_event({"type": "error", "error": "points missing"})]),
+                media_type="text/event-stream"
+            )
+
+    with stage("normalize"):
+        buf = load_points(data, INGEST_POOL)   # (N,7), .lsc decoded straight into it
+
+    # Resume after the last batch the client acknowledged
+    try:
+        resume_after = max(int(last_event_id), 0) if last_event_id else 0
+    except ValueError:
+        resume_after = 0
+
+    return StreamingResponse(
+        released_after(segment_stream_events(buf.array, STREAM_BATCH_SIZE, resume_after, model_name), buf),
+        media_type="text/event-stream",
+    )
 
-    if N > MAX_PTS:
-        idx = np.random.choice(N, MAX_PTS, replace=False)
-        points = points[idx]
-        N = MAX_PTS
 
-    pts = torch.from_numpy(points).float().unsqueeze(0).to(DEVICE)  # (1,N,7)
+def released_after(events, buf):
+    """
+    Yields from `events`, then returns the input buffer to the pool (also
+    when the client disconnects mid-stream).
+    """
+    try:
+        yield from events
+    finally:
+        buf.release()
 
-    with torch.no_grad():
-        logits = SEG_MODEL(pts)  # (1, num_classes, N)
+
+MAX_PTS = 50000
+SUBSAMPLE_RNG = np.random.default_rng()
+
+# T-Net transform + global feature per (scene hash, model version)
+FEATURE_CACHE = FeatureCache(max_bytes=FEATURE_CACHE_MB * 2**20)
+
+
+def segment_subsampled(raw: np.ndarray, model_name=None, profile=False, scene=None, max_points=MAX_PTS):
+    """
+    Labels for at most max_points randomly chosen points of a (N,F) cloud
+    -> (labels, info).
+
+    The T-Net transform and global feature are cached per scene (see
+    feature_cache.py): info["scene"] is the cloud's key and info["cached"]
+    tells whether the features came from the cache. Passing a key back as
+    `scene` with a crop or subset of that cloud reuses the scene's
+    features, so only the local-feature and head layers run. An unknown
+    or evicted key falls back to this cloud's own features.
+
+    With profile=True the full forward pass runs uncached and
+    info["profile"] holds the per-module profile, see models/profiling.py.
+    """
+    import torch
+
+    model_name = SEG_MODELS.resolve(model_name)
+    entry = SEG_MODELS.served(model_name)
+    model = entry.get()
+
+    feats = None
+    if not profile:
+        if scene:
+            feats = FEATURE_CACHE.get((scene, entry.version))
+        if feats is None:
+            lookup = not scene   # an unknown key falls back to this cloud's own features
+            with stage("hash"):
+                scene = scene_hash(raw)
+            if lookup:
+                feats = FEATURE_CACHE.get((scene, entry.version))
+
+    N = raw.shape[0]
+    idx = None
+    if N > max_points:
+        with stage("subsample"):
+            # sorted: the gather below then reads the upload front to back
+            idx = np.sort(SUBSAMPLE_RNG.choice(N, max_points, replace=False))
+            N = max_points
+
+    # Only the chosen rows are cast / padded, straight into a pooled buffer
+    with stage("normalize"):
+        buf = normalize_into(raw, INGEST_POOL, rows=idx)  # (N,7)
+
+    with stage("to_tensor"):
+        pts = as_batch(buf.array[:, :model.input_dim], get_device())  # (1,N,7), no copy on the CPU
+
+    with buf, stage("forward"), torch.no_grad():
+        tf = time.perf_counter()
+        if profile:
+            logits, prof = model.profile(pts)
+        else:
+            if feats is None:
+                trans, global_feat = model.encode(pts, tnet_points=TNET_POINTS or None)
+                FEATURE_CACHE.put((scene, entry.version), (trans, global_feat))
+            else:
+                trans, global_feat = feats
+            logits = model(pts, trans=trans, global_feat=global_feat)  # (1, num_classes, N)
         preds = logits.argmax(dim=1).squeeze(0).cpu().numpy()  # (N,)
+    record_inference(model_name, N, time.perf_counter() - tf)
 
-    return SegmentResponse(num_points=int(N), labels=preds.tolist())
+    if profile:
+        return preds, {"profile": {
+            "num_points": int(N),
+            "forward_ms": round(prof.root_seconds() * 1000, 3),
+            "modules": prof.summary(),
+            "trace": prof.trace(),
+            "model": model_name,
+        }}
+    return preds, {"scene": scene, "cached": feats is not None}
+
+
+@app.post("/segment", response_model=SegmentResponse)
+async def segment(
+    file: UploadFile = File(...),
+    max_points: int = MAX_PTS,
+    x_debug_profile: Optional[str] = Header(None),
+    x_model: Optional[str] = Header(None),
+    x_scene: Optional[str] = Header(None),
+):
+    """
+    Labels for up to max_points (<= MAX_PTS) points of the uploaded cloud.
+    To re-segment a crop or subset of a cloud sent before, pass the
+    `scene` of that response as X-Scene: the cached scene features are
+    reused and only the per-point layers run.
+    """
+    model_name = resolve_model(x_model)
+    if model_name is None:
+        return unknown_model(x_model)
+    if not 0 < max_points <= MAX_PTS:
+        return JSONResponse(status_code=400, content={"error": f"max_points must be in 1..{MAX_PTS}."})
+
+    with stage("upload"):
+        content = await file.read()
+    with stage("np_load"):
+        data = open_scan_bytes(content)   # .npz or .lsc
+
+        if "points" not in data:
+            return {"error": "NPZ must contain 'points' array."}
+        raw = data["points"]  # (N,F)
+
+    profile = bool(x_debug_profile and ALLOW_DEBUG_PROFILE)
+    preds, info = segment_subsampled(raw, model_name, profile=profile, scene=x_scene, max_points=max_points)
+
+    with stage("serialize"):
+        return SegmentResponse(num_points=int(preds.shape[0]), labels=preds.tolist(), model=model_name, **info)
 
 
 @app.get("/segment_random", response_model=SegmentResponse)
-def segment_random():
+def segment_random(x_model: Optional[str] = Header(None)):
+    model_name = resolve_model(x_model)
+    if model_name is None:
+        return unknown_model(x_model)
+
     files = glob.glob(str(RAW_NPZ_DIR / "*.npz"))
     if not files:
         return {"error": "No dataset .npz files found."}
 
     file_path = np.random.choice(files)
-    data = np.load(file_path)
+    with stage("np_load"):
+        data = np.load(file_path)
 
-    if "points" not in data:
-        return {"error": f"'points' not in {file_path}"}
+        if "points" not in data:
+            return {"error": f"'points' not in {file_path}"}
+        raw = data["points"]  # (N,F)
 
-    raw = data["points"]  # (N,F)
-    points = normalize_point_features(raw)  # (N,7)
+    preds, info = segment_subsampled(raw, model_name)
 
-    N = points.shape[0]
-    MAX_PTS = 50000
-    if N > MAX_PTS:
-        idx = np.random.choice(N, MAX_PTS, replace=False)
-        points = points[idx]
-        N = MAX_PTS
+    with stage("serialize"):
+        return SegmentResponse(num_points=int(preds.shape[0]), labels=preds.tolist(), model=model_name, **info)
 
-    pts = torch.from_numpy(points).float().unsqueeze(0).to(DEVICE)  # (1,N,7)
 
-    with torch.no_grad():
-        logits = SEG_MODEL(pts)   # (1, num_classes, N)
-        preds = logits.argmax(dim=1).squeeze(0).cpu().numpy()
+@app.get("/segment/cache")
+def segment_cache_stats():
+    """
+    Scene feature cache: entries, memory (FEATURE_CACHE_MB), hits,
+    misses and evictions.
+    """
+    return FEATURE_CACHE.stats()
 
-    return SegmentResponse(num_points=int(N), labels=preds.tolist())
 
+# -----------------------------------------------------------
+# BATCH SEGMENTATION JOBS
+# -----------------------------------------------------------
+
+SEG_JOBS = SegJobManager(
+    model_getter=SEG_MODELS.get,
+    preprocess=normalize_point_features,
+    infer=predict_labels,
+    workers=SEG_JOB_WORKERS,
+)
+
+JOB_SOURCES = {
+    "raw": RAW_NPZ_DIR,
+    "processed": DATA_PROCESSED,
+    "samples": BACKEND_DIR,
+}
+
+
+class SegJobRequest(BaseModel):
+    source: str = "raw"                  # raw | processed | samples
+    scenes: Optional[list[str]] = None   # file names in source; default: all matching pattern
+    pattern: str = "*.npz"
+    model: Optional[str] = None          # checkpoint name; default: A/B split / default model
+
+
+@app.post("/jobs/segment")
+def submit_segment_job(req: SegJobRequest):
+    """
+    Segments every listed scan of a data directory in the background.
+    Labels are written next to each scan as <scan>.labels.npy.
+    """
+    base = JOB_SOURCES.get(req.source)
+    if base is None:
+        return {"error": f"Unknown source '{req.source}'. Use one of {sorted(JOB_SOURCES)}."}
+
+    if req.scenes:
+        # names only: no paths outside the source directory
+        bad = [n for n in req.scenes if Path(n).name != n or not (base / n).is_file()]
+        if bad:
+            return {"error": f"Scenes not found in {req.source}: {bad}"}
+        paths = [base / n for n in req.scenes]
+    else:
+        # a file-name pattern, matched inside the source directory only
+        if ".." in req.pattern or "/" in req.pattern or "\\" in req.pattern:
+            return {"error": f"Invalid pattern '{req.pattern}': use a file-name pattern such as '*.npz'."}
+        root = base.resolve()
+        paths = sorted(p for p in base.glob(req.pattern) if p.is_file() and p.resolve().is_relative_to(root))
+
+    if not paths:
+        return {"error": f"No scans found in {base}."}
+
+    model_name = resolve_model(req.model)
+    if model_name is None:
+        return unknown_model(req.model)
 
+    job = SEG_JOBS.submit(paths, model=model_name)
+    return job.status()
+
+
+@app.get("/jobs")
+def list_jobs():
+    return {"jobs": [job.status() for job in SEG_JOBS.list()]}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = SEG_JOBS.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job id."})
+    return job.status()
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = SEG_JOBS.cancel(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job id."})
+    return job.status()
 
 
 # -----------------------------------------------------------
@@ -301,39 +751,280 @@ def points_to_occupancy(points, labels=None, grid_size=40, resolution=0.2, z_thr
 
 
 @app.post("/build_map", response_model=MapResponse)
-async def build_map(file: UploadFile = File(...)):
-    global GLOBAL_OCC
+async def build_map(
+    file: UploadFile = File(...),
+    x_session_id: str = Header("default"),
+):
+    with stage("upload"):
+        content = await file.read()
+    # the layer rebuild takes seconds on large scans: keep it off the event loop
+    return await run_in_threadpool(rebuild_map, content, x_session_id)
+
 
-    content = await file.read()
-    data = np.load(io.BytesIO(content))
+def rebuild_map(content, session_id):
+    """
+    build_map() after the upload, in a worker thread: a new map from
+    this scan alone (any fused add_scan map is dropped).
+    """
+    with stage("np_load"):
+        data = open_scan_bytes(content)   # .npz or .lsc
+
+        if "points" not in data:
+            return {"error": "NPZ must contain 'points' array."}
+        if "labels" not in data:
+            return {"error": "NPZ must contain 'labels' array."}
+
+        points = data["points"][:, :3].astype("float32")
+        labels = data["labels"].astype("uint8")
+        # optional sensor position (x, y[, z]) for free-space ray casting
+        origin = data["origin"][:2] if "origin" in data else None
+
+    with stage("occupancy"):
+        layers = build_scan_layers(points, labels, origin)
+        occ = layers["occupancy"]
+
+    with SESSIONS.session(session_id) as s:
+        s.occ = occ
+        s.layers = layers
+        s.scan_map = None
+    with stage("serialize"):
+        return MapResponse(grid=occ.tolist())
+
+
+@app.post("/map/add_scan", response_model=ScanRegistrationResponse)
+async def add_scan(
+    file: UploadFile = File(...),
+    x_session_id: str = Header("default"),
+):
+    """
+    Aligns a scan (points in its sensor frame) to the session's fused map
+    with point-to-plane ICP, fuses it and rebuilds the map layers from the
+    fused cloud (see registration.py). The first scan defines the map
+    frame; /build_map starts over. Optional NPZ keys: `pose` (4x4 initial
+    guess, default the previous scan's pose) and `origin` (sensor x, y in
+    the scan frame, as in /build_map).
+    """
+    with stage("upload"):
+        content = await file.read()
+    # ICP, voxelising and the layer rebuild take seconds on large maps:
+    # keep them off the event loop
+    return await run_in_threadpool(register_scan, content, x_session_id)
 
-    if "points" not in data:
-        return {"error": "NPZ must contain 'points' array."}
-    if "labels" not in data:
-        return {"error": "NPZ must contain 'labels' array."}
 
-    points = data["points"][:, :3].astype("float32")
-    labels = data["labels"].astype("uint8")
+def register_scan(content, session_id):
+    """
+    add_scan() after the upload, in a worker thread.
+    """
+    with stage("np_load"):
+        data = open_scan_bytes(content)   # .npz or .lsc
+
+        if "points" not in data:
+            return JSONResponse(status_code=400, content={"error": "NPZ must contain 'points' array."})
+        if "labels" not in data:
+            return JSONResponse(status_code=400, content={"error": "NPZ must contain 'labels' array."})
+
+        points = data["points"][:, :3].astype("float32")
+        labels = data["labels"].astype("uint8")
+        if len(points) == 0:
+            return JSONResponse(status_code=400, content={"error": "The scan has no points."})
+        init = data["pose"].reshape(4, 4) if "pose" in data else None
+        origin = data["origin"][:2] if "origin" in data else np.median(points[:, :2], axis=0)
+
+    with SESSIONS.session(session_id) as s:
+        if s.scan_map is None:
+            s.scan_map = ScanMap()
+        with stage("register"):
+            reg = s.scan_map.integrate(points, labels, init)
+
+        if reg["fused"]:
+            # carve free space from this scan's sensor position in the map frame
+            sensor = transform(np.array([[origin[0], origin[1], 0.0]], dtype=np.float32), reg["pose"])[0, :2]
+            with stage("occupancy"):
+                layers = build_scan_layers(s.scan_map.points, s.scan_map.labels, sensor)
+            s.occ = layers["occupancy"]
+            s.layers = layers
+        occ = s.occ
+        scans = len(s.scan_map.poses)
+
+    with stage("serialize"):
+        return ScanRegistrationResponse(
+            grid=occ.tolist(),
+            pose=reg["pose"].tolist(),
+            fitness=reg["fitness"],
+            rmse=reg["rmse"],
+            iterations=reg["iterations"],
+            fused=reg["fused"],
+            scans=scans,
+        )
 
-    occ = points_to_occupancy(
+
+def build_scan_layers(points, labels=None, origin=None):
+    """
+    Occupancy grid (same as points_to_occupancy) plus the 2.5D layers and
+    the free/occupied/unknown state, in one pass.
+    """
+    return build_layers(
         points,
-        labels=labels,    # ★ PASS LABELS
+        labels=labels,
         grid_size=GRID_SIZE,
         resolution=0.2,
-        z_thresh=(0.1, 2.5)
+        z_thresh=(0.1, 2.5),
+        num_classes=NUM_CLASSES,
+        robot_height=ROBOT_HEIGHT,
+        step_height=STEP_HEIGHT,
+        origin=origin,
     )
 
-    GLOBAL_OCC = occ
-    return MapResponse(grid=occ.tolist())
+
+@app.get("/map/layers")
+def get_map_layers(x_session_id: str = Header("default")):
+    """
+    The session's 2.5D layers as .npz: `layers` (L,H,W) float16 stacked in
+    the order of `names`, and `class_hist` (C,H,W) uint16.
+    """
+    with SESSIONS.session(x_session_id, write=False) as s:
+        layers = s.layers
+    if layers is None:
+        return JSONResponse(status_code=404, content={"error": "No map built in this session yet."})
+
+    with stage("serialize"):
+        buf = io.BytesIO()
+        np.savez(buf, layers=stack_layers(layers), names=np.array(LAYER_NAMES),
+                 class_hist=layers["class_hist"])
+    return Response(buf.getvalue(), media_type="application/octet-stream")
 
 
 # -----------------------------------------------------------
-# GET GLOBAL MAP
+# GET SESSION MAP
 # -----------------------------------------------------------
 
 @app.get("/get_map", response_model=MapResponse)
-def get_map():
-    return MapResponse(grid=GLOBAL_OCC.tolist())
+def get_map(x_session_id: str = Header("default")):
+    with SESSIONS.session(x_session_id, write=False) as s:
+        return MapResponse(grid=s.occ.tolist())
+
+
+# -----------------------------------------------------------
+# MAP TILES (multi-resolution, see map_pyramid.py)
+# -----------------------------------------------------------
+
+def session_pyramid(s):
+    """
+    The session's pyramid, brought up to date with its occupancy grid
+    (only changed cells are recomputed).
+    """
+    if s.pyramid is None:
+        s.pyramid = MapPyramid(MAP_TILE_SIZE)
+    with stage("pyramid"):
+        s.pyramid.sync(s.occ, s.occ_version)
+    return s.pyramid
+
+
+@app.get("/map/pyramid")
+def get_map_pyramid(x_session_id: str = Header("default")):
+    """
+    Levels (0 = full resolution), their shapes and tiles per side.
+    """
+    with SESSIONS.session(x_session_id, write=False) as s:
+        return session_pyramid(s).info()
+
+
+@app.get("/map/tile/{level}/{x}/{y}")
+def get_map_tile(
+    level: int,
+    x: int,
+    y: int,
+    x_session_id: str = Header("default"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    One tile as raw uint8 class labels in row order (shape in X-Tile-Shape
+    as "rows,cols"). Parent cells hold the most frequent non-empty class
+    of their children. 304 when If-None-Match matches the ETag.
+    """
+    with SESSIONS.session(x_session_id, write=False) as s:
+        tile = session_pyramid(s).tile(level, x, y)
+    if tile is None:
+        return JSONResponse(status_code=404, content={"error": "Tile out of range. See GET /map/pyramid."})
+
+    etag, raw, shape = tile
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",       # always revalidate; 304s are cheap
+        "Vary": "X-Session-ID",
+        "X-Tile-Shape": f"{shape[0]},{shape[1]}",
+    }
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(raw, media_type="application/octet-stream", headers=headers)
+
+
+# -----------------------------------------------------------
+# LIVE MAP / RL UPDATES (WebSocket, see map_feed.py)
+# -----------------------------------------------------------
+
+def session_feed_messages(session_id, epoch, versions):
+    """
+    -> (the session's feed, messages a client at `epoch`/`versions` is
+    missing). Entering the session also picks up changes other workers
+    saved to disk; it is only read, so polling never rewrites it.
+    """
+    with SESSIONS.session(session_id, write=False) as s:
+        if s.feed.epoch != epoch:
+            versions = {}      # versions of another feed mean nothing here
+        return s.feed, s.feed.since(versions)
+
+
+@app.websocket("/ws/map")
+async def map_socket(
+    ws: WebSocket,
+    session: str = "default",
+    epoch: str = "",
+    map_version: Optional[int] = None,
+    rl_version: Optional[int] = None,
+):
+    """
+    Pushes the session's map and RL grid: a snapshot per channel, then
+    cell deltas and agent moves as they happen. To resume after a
+    reconnect, pass the last `epoch` and versions seen; anything no
+    longer in the log is resent as a snapshot. Browsers cannot set
+    headers on a WebSocket, hence ?session= instead of X-Session-ID.
+    """
+    await ws.accept()
+    versions = {"map": map_version, "rl": rl_version}
+    feed = changed = None
+    receive = asyncio.ensure_future(ws.receive())
+    try:
+        while True:
+            current, messages = await run_in_threadpool(session_feed_messages, session, epoch, versions)
+            if current is not feed:
+                if changed is not None:
+                    feed.unsubscribe(changed)
+                if current.epoch != epoch:
+                    versions = {}
+                feed, changed, epoch = current, current.subscribe(), current.epoch
+                await ws.send_text(json.dumps({"type": "hello", "epoch": epoch}))
+            for msg in messages:
+                await ws.send_text(json.dumps(msg))
+                versions[msg["channel"]] = msg["version"]
+
+            # Local changes wake us at once; the timeout catches changes
+            # made by other workers (SESSION_DIR)
+            wake = asyncio.ensure_future(changed.wait())
+            done, _ = await asyncio.wait({receive, wake}, timeout=MAP_FEED_POLL,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            wake.cancel()
+            changed.clear()
+            if receive in done:
+                if receive.result()["type"] == "websocket.disconnect":
+                    break
+                receive = asyncio.ensure_future(ws.receive())   # client messages are ignored
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receive.cancel()
+        if changed is not None:
+            feed.unsubscribe(changed)
 
 
 # -----------------------------------------------------------
@@ -341,8 +1032,10 @@ def get_map():
 # -----------------------------------------------------------
 
 @app.post("/rl_reset_random", response_model=RLStateResponse)
-def rl_reset_random():
-    grid = RL_AGENT.reset_random()
+def rl_reset_random(x_session_id: str = Header("default")):
+    with SESSIONS.session(x_session_id) as s:
+        grid = s.agent.reset_random()
+        s.publish_rl()
     return RLStateResponse(
         grid=grid.tolist(),
         reward=0.0,
@@ -356,8 +1049,20 @@ def rl_reset_random():
 # -----------------------------------------------------------
 
 @app.post("/rl_reset_from_map", response_model=RLStateResponse)
-def rl_reset_from_map():
-    grid = RL_AGENT.reset_from_occ(GLOBAL_OCC)
+def rl_reset_from_map(explore: bool = False, x_session_id: str = Header("default")):
+    """
+    explore: start on the free cell nearest the (0, 0) corner and put the
+    goal on the best frontier of the map (see /explore/frontiers)
+    instead of the far corner.
+    """
+    with SESSIONS.session(x_session_id) as s:
+        state = s.layers.get("state") if s.layers is not None else None
+        start = goal = None
+        if explore and state is not None:
+            start = nearest_free(state, (0, 0))
+            goal = session_frontiers(s)[0].next_goal(start) if start is not None else None
+        grid = s.agent.reset_from_occ(s.occ, state, start, goal)
+        s.publish_rl()
     return RLStateResponse(
         grid=grid.tolist(),
         reward=0.0,
@@ -365,6 +1070,111 @@ def rl_reset_from_map():
         action=-1
     )
 
+
+# -----------------------------------------------------------
+# EXPLORATION (frontiers of the session map, see exploration.py)
+# -----------------------------------------------------------
+
+class FrontierResponse(BaseModel):
+    robot: list[int]
+    frontier_cells: int          # frontier cells in the map, before clustering
+    updated_cells: int           # cells re-examined for this map version (0 = unchanged)
+    clusters: list[dict]         # reachable clusters, best first
+    goal: Optional[list[int]]    # None: nothing left to explore from robot
+    path: list[list[int]]        # [x, y] cells from robot to goal
+
+
+def session_frontiers(s):
+    """
+    -> (the session's FrontierMap brought up to date with its map state,
+    cells re-examined). Only cells changed since the last call are.
+    """
+    with stage("frontiers"):
+        updated = s.frontiers.update(s.layers["state"])
+    return s.frontiers, updated
+
+
+def robot_cell(s, x, y):
+    """
+    (x, y) from the query, else the RL agent's position; None if neither.
+    """
+    if x is not None and y is not None:
+        return [x, y]
+    if s.has_agent:
+        return list(s.agent.env.agent_pos)
+    return None
+
+
+@app.get("/explore/frontiers", response_model=FrontierResponse)
+def explore_frontiers(
+    x: Optional[int] = None,
+    y: Optional[int] = None,
+    limit: int = 20,
+    x_session_id: str = Header("default"),
+):
+    """
+    Frontier clusters (free cells next to unknown ones) of the session
+    map, ranked by path distance from the robot cell (x, y) (default:
+    the RL agent's position), with the path to the best one.
+    """
+    with SESSIONS.session(x_session_id, write=False) as s:
+        if s.layers is None:
+            return JSONResponse(status_code=404, content={"error": "No map built in this session yet."})
+        robot = robot_cell(s, x, y)
+        if robot is None:
+            return JSONResponse(status_code=400, content={"error": "Pass x and y, or reset the RL agent first."})
+        H, W = s.layers["state"].shape
+        if not (0 <= robot[0] < W and 0 <= robot[1] < H):
+            return JSONResponse(status_code=400, content={"error": f"(x, y) must be inside the {W}x{H} map."})
+        frontiers, updated = session_frontiers(s)
+        with stage("rank"):
+            ranked = frontiers.rank(robot)
+            goal = ranked[0]["goal"] if ranked else None
+            path = frontiers.path(robot, goal) if goal is not None else []
+        cells = len(frontiers.cells)
+    return FrontierResponse(
+        robot=robot,
+        frontier_cells=cells,
+        updated_cells=updated,
+        clusters=ranked[:limit],
+        goal=goal,
+        path=path,
+    )
+
+
+class ExploreGoalResponse(RLStateResponse):
+    goal: Optional[list[int]]    # None: exploration finished, goal unchanged
+    path: list[list[int]]
+
+
+@app.post("/explore/next_goal", response_model=ExploreGoalResponse)
+def explore_next_goal(x_session_id: str = Header("default")):
+    """
+    Moves the RL goal to the best frontier as seen from the agent, so
+    /rl_step and /rl_rollout drive it into unexplored space. Call it
+    again after the map grew (/map/add_scan) or the goal was reached.
+    """
+    with SESSIONS.session(x_session_id) as s:
+        if s.layers is None:
+            return JSONResponse(status_code=404, content={"error": "No map built in this session yet."})
+        robot = list(s.agent.env.agent_pos)
+        frontiers, _ = session_frontiers(s)
+        goal = frontiers.next_goal(robot)
+        if goal is not None:
+            s.agent.set_goal(goal)
+        s.publish_rl(explore=goal is not None)
+        grid = s.agent.env.grid.copy()
+        path = frontiers.path(robot, goal) if goal is not None else []
+    return ExploreGoalResponse(
+        grid=grid.tolist(),
+        reward=0.0,
+        done=goal is None,
+        action=-1,
+        goal=goal,
+        path=path,
+    )
+
+
 @app.get("/random_scene_npz")
 def random_scene_npz():
     """
@@ -386,7 +1196,7 @@ def random_scene_npz():
     )
 
 @app.get("/build_map_random", response_model=MapResponse)
-def build_map_random():
+def build_map_random(x_session_id: str = Header("default")):
     files = glob.glob(str(RAW_NPZ_DIR / "*.npz"))
     if not files:
         return {"error": "No dataset .npz found."}
@@ -395,14 +1205,13 @@ def build_map_random():
     data = np.load(file_path)
     points = data["points"][:, :3]  # xyz only
 
-    occ = points_to_occupancy(
-        points,
-        grid_size=GRID_SIZE,
-        resolution=0.2,
-        z_thresh=(0.1, 2.5)
-    )
+    layers = build_scan_layers(points)
+    occ = layers["occupancy"]
 
-    GLOBAL_OCC = occ
+    with SESSIONS.session(x_session_id) as s:
+        s.occ = occ
+        s.layers = layers
+        s.scan_map = None
     return MapResponse(grid=occ.tolist())
 
 
@@ -411,11 +1220,93 @@ def build_map_random():
 # -----------------------------------------------------------
 
 @app.post("/rl_step", response_model=RLStateResponse)
-def rl_step():
-    ns, reward, done, action = RL_AGENT.step(epsilon=0.2)
+def rl_step(x_session_id: str = Header("default")):
+    with SESSIONS.session(x_session_id) as s:
+        ns, reward, done, action = s.agent.step(epsilon=0.2)
+        s.publish_rl(reward=float(reward), done=bool(done), action=int(action))
     return RLStateResponse(
         grid=ns.tolist(),
         reward=float(reward),
         done=bool(done),
         action=int(action),
     )
+
+
+# -----------------------------------------------------------
+# RL: SERVER-SIDE ROLLOUT
+# -----------------------------------------------------------
+
+class RLRolloutResponse(BaseModel):
+    start: list[int]
+    goal: list[int]
+    actions: list[int]
+    positions: list[list[int]]
+    rewards: list[float]
+    total_reward: float
+    done: bool
+
+
+@app.post("/rl_rollout", response_model=RLRolloutResponse)
+def rl_rollout(
+    steps: int = 0,
+    epsilon: float = 0.2,
+    x_session_id: str = Header("default"),
+):
+    """
+    Rolls out `steps` moves (0 = until the episode ends) in one request and
+    returns the trajectory instead of a grid per step. The client replays
+    it on the grid it got from /rl_reset_*.
+    """
+    with SESSIONS.session(x_session_id) as s:
+        start = list(s.agent.env.agent_pos)
+        traj = s.agent.rollout(max_steps=steps or None, epsilon=epsilon)
+        goal = list(s.agent.env.goal_pos)
+        s.publish_rl(positions=traj["positions"], done=traj["done"])
+
+    return RLRolloutResponse(
+        start=start,
+        goal=goal,
+        total_reward=float(sum(traj["rewards"])),
+        **traj,
+    )
+
+
+@app.post("/rl_rollout_stream")
+def rl_rollout_stream(
+    steps: int = 0,
+    epsilon: float = 0.2,
+    chunk: int = 10,
+    interval_ms: int = 0,
+    x_session_id: str = Header("default"),
+):
+    """
+    Streaming rollout for live animation: one SSE event per `chunk` moves,
+    optionally paced by `interval_ms`. The session is locked per chunk,
+    so other requests for it can interleave.
+    """
+    chunk = max(chunk, 1)
+
+    def event_generator():
+        # Never yield inside the session: each next() may run on another
+        # threadpool thread, which could not release the locks
+        with SESSIONS.session(x_session_id) as s:
+            env = s.agent.env
+            max_steps = steps or env.grid_size * env.grid_size
+            start, goal = list(env.agent_pos), list(env.goal_pos)
+        yield sse_event({"type": "start", "start": start, "goal": goal})
+
+        sent = 0
+        done = False
+        while sent < max_steps and not done:
+            with SESSIONS.session(x_session_id) as s:
+                traj = s.agent.rollout(max_steps=min(chunk, max_steps - sent), epsilon=epsilon)
+                s.publish_rl(positions=traj["positions"], done=traj["done"])
+            sent += len(traj["actions"])
+            done = traj["done"]
+            yield sse_event({"type": "steps", "step": sent, **traj}, event_id=sent)
+            if interval_ms and not done:
+                time.sleep(interval_ms / 1000)
+
+        yield sse_event({"type": "done", "steps": sent, "done": done})
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
@@ -0,0 +1,89 @@
+"""
+Batch-level augmentation for segmentation training.
+
+Runs after collation on the whole (B, N, 7) batch [x, y, z, r, g, b,
+intensity] as a handful of tensor ops, on whatever device the batch is
+on, so the DataLoader workers do no extra work:
+
+    augment = BatchAugment(seed=0)
+    for pts, labels in loader:
+        pts, labels = augment(pts.to(device), labels.to(device))
+
+Per sample: rotation about the vertical axis and anisotropic scaling
+around the sample's centroid, brightness / per-channel colour gain and
+intensity gain (multiplicative, so the colour range does not matter),
+and dropout (dropped points become copies of the sample's first point,
+label included, so the batch keeps its shape). Per point: clipped
+Gaussian jitter of xyz. All draws come from one seeded generator.
+"""
+
+import math
+
+import torch
+
+
+class BatchAugment:
+    def __init__(self, rotate=True, scale=(0.9, 1.1), jitter=0.01, jitter_clip=0.05,
+                 color=0.1, intensity=0.1, dropout=0.1, seed=0):
+        self.rotate = rotate
+        self.scale = scale
+        self.jitter = jitter
+        self.jitter_clip = jitter_clip
+        self.color = color
+        self.intensity = intensity
+        self.dropout = dropout
+        self.seed = seed
+        self._generators = {}   # device -> torch.Generator
+
+    def _generator(self, device):
+        g = self._generators.get(device)
+        if g is None:
+            g = self._generators[device] = torch.Generator(device=device).manual_seed(self.seed)
+        return g
+
+    def _uniform(self, shape, low, high, like):
+        g = self._generator(like.device)
+        return torch.rand(shape, generator=g, device=like.device, dtype=like.dtype) * (high - low) + low
+
+    @torch.no_grad()
+    def __call__(self, points, labels):
+        """
+        points: (B, N, 7) float, labels: (B, N) -> augmented copies.
+        """
+        B, N, _ = points.shape
+        points = points.clone()
+        xyz = points[..., :3]
+        center = xyz.mean(dim=1, keepdim=True)
+
+        # Rotation about z and per-axis scale as one (B, 3, 3) matrix
+        transform = torch.eye(3, device=points.device, dtype=points.dtype).repeat(B, 1, 1)
+        if self.rotate:
+            theta = self._uniform((B,), 0.0, 2 * math.pi, points)
+            c, s = torch.cos(theta), torch.sin(theta)
+            transform[:, 0, 0], transform[:, 0, 1] = c, -s
+            transform[:, 1, 0], transform[:, 1, 1] = s, c
+        if self.scale:
+            transform = transform * self._uniform((B, 1, 3), *self.scale, points)
+        xyz = torch.bmm(xyz - center, transform.transpose(1, 2)) + center
+
+        if self.jitter:
+            noise = torch.randn((B, N, 3), generator=self._generator(points.device),
+                                device=points.device, dtype=points.dtype)
+            xyz += noise.mul_(self.jitter).clamp_(-self.jitter_clip, self.jitter_clip)
+        points[..., :3] = xyz
+
+        if self.color:
+            gain = self._uniform((B, 1, 1), 1 - self.color, 1 + self.color, points)
+            gain = gain * self._uniform((B, 1, 3), 1 - self.color / 2, 1 + self.color / 2, points)
+            points[..., 3:6] *= gain
+        if self.intensity:
+            points[..., 6:7] *= self._uniform((B, 1, 1), 1 - self.intensity, 1 + self.intensity, points)
+
+        if self.dropout:
+            # per-sample dropout rate in [0, dropout), as in PointNet++
+            rate = self._uniform((B, 1), 0.0, self.dropout, points)
+            b, n = (self._uniform((B, N), 0.0, 1.0, points) < rate).nonzero(as_tuple=True)
+            points[b, n] = points[b, 0]
+            labels = labels.clone()
+            labels[b, n] = labels[b, 0]
+        return points, labels
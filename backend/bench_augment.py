@@ -0,0 +1,83 @@
+"""
+Cost of batch-level augmentation (augment.BatchAugment) vs the same
+augmentations done per sample with NumPy, as they would run in
+PointCloudDataset.__getitem__.
+
+Both produce a (B, N, 7) batch; the per-sample path also pays for the
+collation of the augmented samples into a tensor.
+
+    cd backend
+    python bench_augment.py --batch 4 16 --points 2048 16384
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from augment import BatchAugment
+
+
+def augment_sample(pts, lbl, rng, scale=(0.9, 1.1), jitter=0.01, jitter_clip=0.05,
+                   color=0.1, intensity=0.1, dropout=0.1):
+    """
+    One (N, 7) sample, same augmentations as BatchAugment.
+    """
+    pts = pts.copy()
+    lbl = lbl.copy()
+    center = pts[:, :3].mean(axis=0)
+    theta = rng.uniform(0, 2 * np.pi)
+    c, s = np.cos(theta), np.sin(theta)
+    rot = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]], dtype=np.float32)
+    transform = rot * rng.uniform(*scale, size=(1, 3)).astype(np.float32)
+    xyz = (pts[:, :3] - center) @ transform.T + center
+    xyz += np.clip(rng.normal(0, jitter, xyz.shape), -jitter_clip, jitter_clip).astype(np.float32)
+    pts[:, :3] = xyz
+    pts[:, 3:6] *= rng.uniform(1 - color, 1 + color) * rng.uniform(1 - color / 2, 1 + color / 2, 3)
+    pts[:, 6] *= rng.uniform(1 - intensity, 1 + intensity)
+    drop = rng.random(len(pts)) < rng.uniform(0, dropout)
+    pts[drop] = pts[0]
+    lbl[drop] = lbl[0]
+    return pts, lbl
+
+
+def timed(fn, repeat=20):
+    fn()
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return float(np.median(out))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--points", type=int, nargs="+", default=[2048, 16384])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    augment = BatchAugment(seed=0)
+    print(f"torch threads: {torch.get_num_threads()}")
+    print(f"{'B':>4} {'N':>7} | {'per-sample ms':>13} | {'batch ms':>9} | {'speedup':>7}")
+    for b in args.batch:
+        for n in args.points:
+            samples = [(rng.random((n, 7), dtype=np.float32) * 10, rng.integers(0, 8, n))
+                       for _ in range(b)]
+            pts = torch.from_numpy(np.stack([p for p, _ in samples]))
+            lbl = torch.from_numpy(np.stack([l for _, l in samples]))
+
+            def per_sample():
+                out = [augment_sample(p, l, rng) for p, l in samples]
+                return torch.from_numpy(np.stack([p for p, _ in out])), torch.from_numpy(np.stack([l for _, l in out]))
+
+            t_sample = timed(per_sample, args.repeat)
+            t_batch = timed(lambda: augment(pts, lbl), args.repeat)
+            print(f"{b:>4} {n:>7} | {t_sample * 1000:>13.2f} | {t_batch * 1000:>9.2f} | {t_sample / t_batch:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Latency of repeated /segment queries on one scene with and without the
+scene feature cache (feature_cache.py), and its eviction behaviour.
+
+Per subsample size, runs segment_subsampled() on a scene three ways:
+cold (cache cleared: T-Net + encoder + head), warm (same upload again,
+found by content hash) and crop (a crop sent with the scene key, found
+without hashing). Then fills a cache sized for --capacity scenes with
+more scenes than that and reports hits, misses and evictions.
+
+    cd backend
+    python bench_feature_cache.py --points 1000000 --sizes 10000 50000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+import api
+from feature_cache import FeatureCache, scene_hash
+
+
+def timed(fn, repeat):
+    fn()
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return float(np.median(out))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=1_000_000, help="points in the scene")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 25_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--capacity", type=int, default=8, help="scenes that fit the eviction test cache")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    raw = rng.random((args.points, 7), dtype=np.float32) * np.float32(10)
+    crop = raw[raw[:, 0] < 5]
+    cache = api.FEATURE_CACHE
+    api.segment_subsampled(raw[:1000])   # load the model
+
+    t_hash = timed(lambda: scene_hash(raw), args.repeat)
+    print(f"torch threads: {torch.get_num_threads()}, scene: {args.points} points, "
+          f"hash: {t_hash * 1000:.1f} ms")
+    print(f"{'points':>7} | {'cold ms':>8} | {'warm ms':>8} | {'crop ms':>8} | {'saved':>6}")
+    for n in args.sizes:
+        def cold():
+            cache.clear()
+            api.segment_subsampled(raw, max_points=n)
+
+        scene = api.segment_subsampled(raw, max_points=n)[1]["scene"]
+        t_cold = timed(cold, args.repeat)
+        api.segment_subsampled(raw, max_points=n)
+        t_warm = timed(lambda: api.segment_subsampled(raw, max_points=n), args.repeat)
+        t_crop = timed(lambda: api.segment_subsampled(crop, scene=scene, max_points=n), args.repeat)
+        print(f"{n:>7} | {t_cold * 1000:>8.1f} | {t_warm * 1000:>8.1f} | {t_crop * 1000:>8.1f} | "
+              f"{1 - t_crop / t_cold:>6.0%}")
+
+    feats = next(iter(cache._entries.values()))
+    per_scene = feats[1]
+    small = FeatureCache(max_bytes=per_scene * args.capacity)
+    for i in range(args.capacity * 2):
+        small.put((f"scene{i}", "v"), feats[0])
+    for i in range(args.capacity * 2):
+        small.get((f"scene{i}", "v"))
+    print(f"\n{per_scene} bytes per scene; cache for {args.capacity} scenes after "
+          f"{args.capacity * 2} scenes: {small.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Frontier update latency (exploration.py) on growing maps.
+
+Simulates exploration of a random room map of each size: the robot
+reveals a disc of `--radius` cells around it, then moves `--stride`
+cells along the path to the next frontier goal. Per map update it times
+
+    diff         FrontierMap.update(state): one comparison with the previous
+                 map, then only the changed cells are re-examined
+    hint         FrontierMap.update(state, changed) with the revealed cells
+                 known (no whole-map comparison)
+    full         a fresh FrontierMap (full frontier scan)
+    rank         clustering + distance field + ranking from the robot
+    cached       rank() again for the same map version (distance field cache)
+
+    cd backend
+    python bench_frontiers.py --sizes 128 512 2048
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from exploration import FrontierMap
+from mapping import FREE, OCCUPIED, UNKNOWN
+
+
+def room_map(size, rng):
+    """
+    Free space with walls on a 16-cell lattice (doors in every wall
+    segment) and random clutter.
+    """
+    truth = np.full((size, size), FREE, dtype=np.int8)
+    truth[::16, :] = OCCUPIED
+    truth[:, ::16] = OCCUPIED
+    for k in range(8, size, 16):
+        truth[::16, k] = FREE
+        truth[k, ::16] = FREE
+    clutter = rng.random((size, size)) < 0.02
+    truth[clutter] = OCCUPIED
+    truth[[0, -1], :] = OCCUPIED
+    truth[:, [0, -1]] = OCCUPIED
+    return truth
+
+
+def reveal(state, truth, pos, radius):
+    x, y = pos
+    H, W = state.shape
+    y0, y1, x0, x1 = max(y - radius, 0), min(y + radius + 1, H), max(x - radius, 0), min(x + radius + 1, W)
+    yy, xx = np.mgrid[y0:y1, x0:x1]
+    disc = (xx - x) ** 2 + (yy - y) ** 2 <= radius ** 2
+    state[y0:y1, x0:x1][disc] = truth[y0:y1, x0:x1][disc]
+    return (yy[disc] * W + xx[disc]).ravel()
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def bench(size, steps, radius, stride, rng):
+    truth = room_map(size, rng)
+    state = np.full_like(truth, UNKNOWN)
+    pos = [8, 8]
+    frontiers = FrontierMap()
+    hinted = FrontierMap()
+    t = {"diff": [], "hint": [], "full": [], "rank": [], "cached": []}
+    checked = []
+    for _ in range(steps):
+        changed = reveal(state, truth, pos, radius)
+        n, dt = timed(lambda: frontiers.update(state))
+        t["diff"].append(dt)
+        checked.append(n)
+        _, dt = timed(lambda: hinted.update(state, changed))
+        t["hint"].append(dt)
+        _, dt = timed(lambda: FrontierMap().update(state))
+        t["full"].append(dt)
+        ranked, dt = timed(lambda: frontiers.rank(pos))
+        t["rank"].append(dt)
+        _, dt = timed(lambda: frontiers.rank(pos))
+        t["cached"].append(dt)
+        if not ranked:
+            break
+        path = frontiers.path(pos, ranked[0]["goal"])
+        pos = path[min(stride, len(path) - 1)]
+    # the first update is a full scan for every FrontierMap
+    ms = {k: 1000 * float(np.median(v[1:] or v)) for k, v in t.items()}
+    known = float((state != UNKNOWN).mean())
+    print(f"{size:>5}x{size:<5} | {len(t['full']):>5} | {known:>6.1%} | {np.median(checked[1:] or checked):>8.0f} | "
+          f"{ms['diff']:>7.2f} | {ms['hint']:>7.2f} | {ms['full']:>7.2f} | {ms['full'] / ms['hint']:>6.1f}x | "
+          f"{ms['rank']:>7.2f} | {ms['cached']:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[128, 512, 2048])
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--radius", type=int, default=12)
+    parser.add_argument("--stride", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'map':<11} | {'steps':>5} | {'known':>6} | {'checked':>8} | {'diff ms':>7} | {'hint ms':>7} | {'full ms':>7} | "
+          f"{'speedup':>7} | {'rank ms':>7} | {'cached':>7}")
+    for size in args.sizes:
+        bench(size, args.steps, args.radius, args.stride, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Latency and peak memory of the upload -> model input path (ingest.py)
+against the previous normalize_point_features() + torch.from_numpy().
+
+    stream   whole scan to (1, N, 7), as /segment_stream does
+    segment  MAX_PTS random points to (1, MAX_PTS, 7), as /segment does
+
+for synthetic scans (generate_dummy_npz.py fixtures) stored as float32
+(N, 7), float64 (N, 7), float32 (N, 4) (xyz + intensity, padded) and
+.lsc (decoded from the file). Every case runs in a fresh process; "peak
+MB" is the growth of its peak RSS (VmHWM, reset before the case) over
+the resident size with the upload already in memory.
+
+    cd backend
+    python bench_ingest.py --points 1000000 5000000
+"""
+
+import argparse
+import io
+import json
+import multiprocessing as mp
+import time
+
+import numpy as np
+
+MAX_PTS = 50000
+INPUTS = ("f32x7", "f64x7", "f32x4", "lsc")
+
+
+def legacy_normalize(points):
+    """
+    normalize_point_features() before ingest.py.
+    """
+    pts = np.asarray(points, dtype=np.float32)
+    if pts.shape[1] > 7:
+        pts = pts[:, :7]
+    if pts.shape[1] < 7:
+        pad = np.zeros((pts.shape[0], 7 - pts.shape[1]), dtype=np.float32)
+        pts = np.concatenate([pts, pad], axis=1)
+    return pts
+
+
+def rss_mb():
+    with open("/proc/self/status") as fh:
+        fields = dict(line.split(":", 1) for line in fh)
+    return int(fields["VmRSS"].split()[0]) / 1024, int(fields["VmHWM"].split()[0]) / 1024
+
+
+def reset_peak():
+    # Linux >= 4.0: resets VmHWM to the current RSS
+    with open("/proc/self/clear_refs", "w") as fh:
+        fh.write("5")
+
+
+def upload(points, kind):
+    """
+    The request body as /segment* receive it.
+    """
+    buf = io.BytesIO()
+    if kind == "lsc":
+        from scan_format import write_scan
+        write_scan(buf, points)
+    else:
+        cols = 4 if kind == "f32x4" else 7
+        dtype = np.float64 if kind == "f64x7" else np.float32
+        np.savez(buf, points=points[:, :cols].astype(dtype))
+    return buf.getvalue()
+
+
+def run_case(points_path, kind, path, mode, repeat, queue):
+    import torch
+    from ingest import BufferPool, as_batch, load_points, normalize_into
+    from scan_format import open_scan_bytes
+
+    torch.set_grad_enabled(False)
+    with np.load(points_path) as d:
+        content = upload(d["points"], kind)
+    pool = BufferPool(max_bytes=1 << 30)
+    device = torch.device("cpu")
+    rng = np.random.default_rng(0)
+
+    def legacy():
+        data = open_scan_bytes(content)
+        raw = data["points"]
+        if mode == "stream":
+            points = legacy_normalize(raw)
+        else:
+            points = legacy_normalize(raw)
+            idx = np.random.choice(points.shape[0], MAX_PTS, replace=False)
+            points = points[idx]
+        return torch.from_numpy(points).float().unsqueeze(0).to(device)
+
+    def pooled():
+        data = open_scan_bytes(content)
+        if mode == "stream":
+            buf = load_points(data, pool)
+        else:
+            raw = data["points"]
+            idx = np.sort(rng.choice(raw.shape[0], MAX_PTS, replace=False))
+            buf = normalize_into(raw, pool, rows=idx)
+        with buf:
+            return float(as_batch(buf.array, device)[0, -1, 0])
+
+    fn = legacy if path == "legacy" else pooled
+    fn()   # warm: allocator, pool buffer
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    # one more run for memory, from the steady state
+    rss, _ = rss_mb()
+    reset_peak()
+    fn()
+    _, peak = rss_mb()
+    queue.put({"ms": 1000 * float(np.median(times)), "peak_mb": peak - rss})
+
+
+def measure(points_path, kind, path, mode, repeat):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=run_case, args=(str(points_path), kind, path, mode, repeat, queue))
+    proc.start()
+    out = queue.get()
+    proc.join()
+    return out
+
+
+def main():
+    from generate_dummy_npz import ensure_fixture
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--inputs", nargs="+", default=list(INPUTS), choices=INPUTS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", default=None, help="write the results as JSON")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'points':>9} | {'input':>6} | {'mode':>7} | {'legacy ms':>9} | {'pooled ms':>9} | "
+          f"{'legacy peak MB':>14} | {'pooled peak MB':>14}")
+    for n in args.points:
+        path = ensure_fixture(n)
+        for kind in args.inputs:
+            for mode in ("stream", "segment"):
+                old = measure(path, kind, "legacy", mode, args.repeat)
+                new = measure(path, kind, "pooled", mode, args.repeat)
+                rows.append({"points": n, "input": kind, "mode": mode, "legacy": old, "pooled": new})
+                print(f"{n:>9} | {kind:>6} | {mode:>7} | {old['ms']:>9.1f} | {new['ms']:>9.1f} | "
+                      f"{old['peak_mb']:>14.1f} | {new['peak_mb']:>14.1f}", flush=True)
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(rows, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
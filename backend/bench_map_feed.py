@@ -0,0 +1,118 @@
+"""
+Bandwidth and update latency: /ws/map deltas vs polling full grids.
+
+Map: the session grid is updated --updates times with --cells changed
+cells each. Polling fetches /get_map every --poll_ms, so a change is seen
+after half a poll interval plus the request on average, and every poll
+carries the whole grid whether it changed or not. The WebSocket pushes
+one delta per update; latency is measured from the change to the
+client receiving it.
+
+RL: one agent step per update; /rl_step returns the full grid, the
+WebSocket delta carries the two changed cells and the agent state.
+
+    cd backend
+    python bench_map_feed.py --grid 200 --cells 50 --poll_ms 200
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import api
+
+SID = "bench-feed"
+HEADERS = {"X-Session-ID": SID}
+
+
+def drain(ws, until_channels):
+    """
+    Reads the hello + initial snapshots.
+    """
+    seen = set()
+    while not until_channels <= seen:
+        msg = json.loads(ws.receive_text())
+        if msg["type"] == "snapshot":
+            seen.add(msg["channel"])
+
+
+def row(name, nbytes, ms, per_s=None):
+    rate = "-" if per_s is None else f"{per_s:,.0f}"
+    print(f"{name:<34} {nbytes:>12,.0f} {ms:>10.2f} {rate:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--grid", type=int, default=200)
+    parser.add_argument("--cells", type=int, default=50, help="changed cells per map update")
+    parser.add_argument("--updates", type=int, default=50)
+    parser.add_argument("--poll_ms", type=float, default=200, help="polling interval")
+    parser.add_argument("--update_ms", type=float, default=1000, help="time between map updates (for bytes/s)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    client = TestClient(api.app)
+    with api.SESSIONS.session(SID) as s:
+        s.occ = rng.integers(0, 8, (args.grid, args.grid)).astype(np.uint8)
+
+    print(f"{'':<34} {'bytes/update':>12} {'latency ms':>10} {'bytes/s':>14}")
+
+    # --- Map: polling ---
+    times, size = [], 0
+    for _ in range(args.updates):
+        t0 = time.perf_counter()
+        size = len(client.get("/get_map", headers=HEADERS).content)
+        times.append(time.perf_counter() - t0)
+    req_ms = statistics.median(times) * 1000
+    row(f"map: poll /get_map every {args.poll_ms:.0f}ms", size * args.update_ms / args.poll_ms,
+        args.poll_ms / 2 + req_ms, size * 1000 / args.poll_ms)
+
+    # --- Map: WebSocket deltas ---
+    with client.websocket_connect(f"/ws/map?session={SID}") as ws:
+        drain(ws, {"map"})
+        times, sizes = [], []
+        for _ in range(args.updates):
+            with api.SESSIONS.session(SID) as s:
+                occ = s.occ.copy()
+                idx = rng.choice(occ.size, args.cells, replace=False)
+                occ.ravel()[idx] = (occ.ravel()[idx] + 1) % 8
+                t0 = time.perf_counter()
+                s.occ = occ
+            sizes.append(len(ws.receive_text()))
+            times.append(time.perf_counter() - t0)
+    per_update = statistics.mean(sizes)
+    row(f"map: ws delta ({args.cells} cells)", per_update, statistics.median(times) * 1000,
+        per_update * 1000 / args.update_ms)
+
+    # --- RL: full grid per step vs ws delta ---
+    client.post("/rl_reset_random", headers=HEADERS)
+    times, size = [], 0
+    for _ in range(args.updates):
+        t0 = time.perf_counter()
+        r = client.post("/rl_step", headers=HEADERS)
+        times.append(time.perf_counter() - t0)
+        size = len(r.content)
+        if r.json()["done"]:
+            client.post("/rl_reset_random", headers=HEADERS)
+    row("rl: POST /rl_step (full grid)", size, statistics.median(times) * 1000)
+
+    with client.websocket_connect(f"/ws/map?session={SID}") as ws:
+        drain(ws, {"map", "rl"})
+        times, sizes = [], []
+        for _ in range(args.updates):
+            t0 = time.perf_counter()
+            done = client.post("/rl_step", headers=HEADERS).json()["done"]
+            sizes.append(len(ws.receive_text()))
+            times.append(time.perf_counter() - t0)
+            if done:
+                client.post("/rl_reset_random", headers=HEADERS)
+                ws.receive_text()   # the new episode's snapshot
+    row("rl: step + ws delta", statistics.mean(sizes), statistics.median(times) * 1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Compare /get_map (whole grid as nested JSON) with the tiled map API.
+
+For a G x G map built from a synthetic scan, reports latency and bytes of:
+  - /get_map
+  - the viewport: the level-0 tiles covering --view cells per side
+  - an overview: every tile of the first level that fits in one tile
+  - revalidating the viewport with If-None-Match (304s)
+and the cost of the incremental pyramid update after a few cells change.
+
+    cd backend
+    python bench_map_tiles.py --grid 1000 --view 256
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import api
+from benchmark import load_fixture
+from mapping import build_layers
+
+SESSION = {"X-Session-ID": "bench-tiles"}
+
+
+def timed(fn, repeat):
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        out.append(time.perf_counter() - t0)
+    return statistics.median(out), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--grid", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--view", type=int, default=256, help="viewport size in level-0 cells")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    points, labels = load_fixture(args.points)
+    occ = build_layers(points[:, :3], labels, grid_size=args.grid)["occupancy"]
+
+    client = TestClient(api.app)
+    with api.SESSIONS.session(SESSION["X-Session-ID"]) as s:
+        s.occ = occ
+
+    info = client.get("/map/pyramid", headers=SESSION).json()
+    ts = info["tile_size"]
+    overview = next(lv for lv in info["levels"] if lv["tiles"] == [1, 1])
+    n_view = (args.view + ts - 1) // ts
+    view_tiles = [(0, x, y) for y in range(n_view) for x in range(n_view)]
+
+    def fetch(tiles, etags=None):
+        nbytes = 0
+        new = {}
+        for t in tiles:
+            headers = dict(SESSION)
+            if etags:
+                headers["If-None-Match"] = etags[t]
+            r = client.get("/map/tile/{}/{}/{}".format(*t), headers=headers)
+            nbytes += len(r.content)
+            new[t] = r.headers["etag"]
+        return nbytes, new
+
+    t_full, r = timed(lambda: client.get("/get_map", headers=SESSION), args.repeat)
+    full_bytes = len(r.content)
+    t_view, (view_bytes, etags) = timed(lambda: fetch(view_tiles), args.repeat)
+    t_over, (over_bytes, _) = timed(lambda: fetch([(overview["level"], 0, 0)]), args.repeat)
+    t_304, (reval_bytes, _) = timed(lambda: fetch(view_tiles, etags), args.repeat)
+
+    print(f"map {args.grid}x{args.grid}, tile {ts}, {len(info['levels'])} levels")
+    print(f"{'request':<34} {'ms':>9} {'bytes':>12}")
+    print(f"{'/get_map (JSON)':<34} {t_full * 1000:>9.2f} {full_bytes:>12,}")
+    print(f"{f'viewport {args.view}px: {len(view_tiles)} tiles':<34} {t_view * 1000:>9.2f} {view_bytes:>12,}")
+    label = f"overview (level {overview['level']}, 1 tile)"
+    print(f"{label:<34} {t_over * 1000:>9.2f} {over_bytes:>12,}")
+    print(f"{'viewport revalidate (304)':<34} {t_304 * 1000:>9.2f} {reval_bytes:>12,}")
+
+    # Incremental update: change a few cells, time the pyramid sync
+    rng = np.random.default_rng(0)
+    with api.SESSIONS.session(SESSION["X-Session-ID"]) as s:
+        for n in (1, 100, 10_000):
+            occ = s.occ.copy()
+            ys, xs = rng.integers(0, args.grid, n), rng.integers(0, args.grid, n)
+            occ[ys, xs] = rng.integers(0, 8, n)
+            s.occ = occ
+            t0 = time.perf_counter()
+            s.pyramid.sync(occ, s.occ_version)
+            print(f"pyramid sync after {n:>6} changed cells: {(time.perf_counter() - t0) * 1000:.2f} ms")
+        t0 = time.perf_counter()
+        s.pyramid._build(occ)
+        print(f"full pyramid rebuild: {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure the overhead of the /metrics instrumentation.
+
+Runs the same requests with metrics.ENABLED on and off, interleaved in
+rounds so drift affects both equally, and reports the median latency
+difference per endpoint. The target is < 1% on real work (/segment,
+/build_map); /get_map shows the fixed per-request cost.
+
+    cd backend
+    python bench_metrics.py --rounds 20
+"""
+
+import argparse
+import io
+import statistics
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import api
+import metrics
+from generate_dummy_npz import ensure_fixture
+
+
+def timed(fn, n):
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--per_round", type=int, default=5)
+    args = parser.parse_args()
+
+    client = TestClient(api.app)
+    with np.load(ensure_fixture(100_000)) as d:
+        points, labels = d["points"], d["labels"]
+
+    def npz(**arrays):
+        buf = io.BytesIO()
+        np.savez(buf, **arrays)
+        return buf.getvalue()
+
+    seg_body = npz(points=points[:50_000])
+    map_body = npz(points=points, labels=labels)
+    cases = {
+        "/segment": lambda: client.post("/segment", files={"file": ("s.npz", seg_body)}),
+        "/build_map": lambda: client.post("/build_map", files={"file": ("s.npz", map_body)}),
+        "/get_map": lambda: client.get("/get_map"),
+    }
+    for fn in cases.values():
+        fn()  # load models / warm caches
+
+    print(f"{'endpoint':>12} | {'off ms':>9} | {'on ms':>9} | overhead")
+    for name, fn in cases.items():
+        per_round = 1 if name == "/segment" else args.per_round
+        on, off = [], []
+        for _ in range(args.rounds):
+            metrics.ENABLED = False
+            off += timed(fn, per_round)
+            metrics.ENABLED = True
+            on += timed(fn, per_round)
+        m_off, m_on = statistics.median(off), statistics.median(on)
+        print(f"{name:>12} | {m_off * 1000:>9.3f} | {m_on * 1000:>9.3f} | "
+              f"{100 * (m_on - m_off) / m_off:+.2f}% ({(m_on - m_off) * 1e6:+.0f} us)")
+
+    # Raw cost of the primitives
+    n = 100_000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with metrics.stage("bench"):
+            pass
+    print(f"stage() context: {(time.perf_counter() - t0) / n * 1e6:.2f} us per use")
+
+
+if __name__ == "__main__":
+    main()
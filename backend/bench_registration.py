@@ -0,0 +1,112 @@
+"""
+Accuracy and speed of scan-to-map registration (registration.py).
+
+A synthetic room (floor, ceiling, walls, an inner wall, boxes) is scanned
+from a sequence of sensor poses; each scan keeps the points within --range
+of the sensor, expressed in the sensor frame, with 1 cm noise. Scans are
+integrated in order starting from the previous pose, and the estimated
+pose is compared with the true one.
+
+    cd backend
+    python bench_registration.py --points 100000 1000000
+"""
+
+import argparse
+
+import numpy as np
+
+from registration import ScanMap, rotation
+
+ROOM = (12.0, 8.0, 3.0)
+BOXES = [((2.0, 2.0, 0.0), (1.0, 1.5, 1.0)), ((9.0, 5.5, 0.0), (1.5, 1.0, 1.8)),
+         ((4.0, 6.0, 0.0), (0.5, 0.5, 2.5)), ((10.0, 1.5, 0.0), (0.8, 0.8, 0.8))]
+# sensor (x, y, yaw in degrees), ~0.5 m and a few degrees apart
+TRAJECTORY = [(3.0, 3.0, 0), (3.5, 3.2, 8), (4.0, 3.6, 15), (4.6, 4.0, 20), (5.2, 4.2, 28)]
+
+
+def planes():
+    """
+    Axis-aligned rectangles (origin, edge u, edge v, label).
+    """
+    X, Y, Z = ROOM
+    out = [
+        ((0, 0, 0), (X, 0, 0), (0, Y, 0), 0),      # floor
+        ((0, 0, Z), (X, 0, 0), (0, Y, 0), 1),      # ceiling
+        ((0, 0, 0), (X, 0, 0), (0, 0, Z), 2),
+        ((0, Y, 0), (X, 0, 0), (0, 0, Z), 2),
+        ((0, 0, 0), (0, Y, 0), (0, 0, Z), 2),
+        ((X, 0, 0), (0, Y, 0), (0, 0, Z), 2),
+        ((7.0, 0, 0), (0, 4.5, 0), (0, 0, Z), 3),  # inner wall
+    ]
+    for (x, y, z), (w, d, h) in BOXES:
+        out += [
+            ((x, y, z + h), (w, 0, 0), (0, d, 0), 4),
+            ((x, y, z), (w, 0, 0), (0, 0, h), 4),
+            ((x, y + d, z), (w, 0, 0), (0, 0, h), 4),
+            ((x, y, z), (0, d, 0), (0, 0, h), 4),
+            ((x + w, y, z), (0, d, 0), (0, 0, h), 4),
+        ]
+    return [tuple(np.array(v, dtype=np.float64) for v in p[:3]) + (p[3],) for p in out]
+
+
+def sensor_pose(x, y, yaw_deg):
+    pose = np.eye(4)
+    pose[:3, :3] = rotation(np.array([0, 0, np.radians(yaw_deg)]))
+    pose[:3, 3] = (x, y, 0.0)
+    return pose
+
+
+def scan(pose, n, max_range, rng):
+    """
+    -> (points (n,3) in the sensor frame, labels (n,)).
+    """
+    rects = planes()
+    area = np.array([np.linalg.norm(np.cross(u, v)) for _, u, v, _ in rects])
+    pts, labels = [], []
+    while sum(len(p) for p in pts) < n:
+        k = rng.choice(len(rects), size=n, p=area / area.sum())
+        a, b = rng.random((2, n, 1))
+        o = np.stack([rects[i][0] for i in k])
+        u = np.stack([rects[i][1] for i in k])
+        v = np.stack([rects[i][2] for i in k])
+        p = o + a * u + b * v
+        keep = np.linalg.norm(p[:, :2] - pose[:2, 3], axis=1) < max_range
+        pts.append(p[keep])
+        labels.append(np.array([rects[i][3] for i in k])[keep])
+    p = np.concatenate(pts)[:n]
+    p += rng.normal(0, 0.01, p.shape)
+    local = (p - pose[:3, 3]) @ pose[:3, :3]
+    return local.astype(np.float32), np.concatenate(labels)[:n].astype(np.uint8)
+
+
+def pose_error(est, true):
+    d = np.linalg.inv(true) @ est
+    angle = np.degrees(np.arccos(np.clip((np.trace(d[:3, :3]) - 1) / 2, -1, 1)))
+    return np.linalg.norm(d[:3, 3]), angle
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--range", type=float, default=7.0, help="sensor range (m)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in args.points:
+        print(f"\n=== {n:,} points per scan ===")
+        print(f"{'scan':>4} | {'seconds':>7} | {'iters':>5} | {'fitness':>7} | {'rmse m':>7} | "
+              f"{'err m':>7} | {'err deg':>7} | {'map pts':>8}")
+        smap = ScanMap()
+        first = sensor_pose(*TRAJECTORY[0])
+        for i, (x, y, yaw) in enumerate(TRAJECTORY):
+            true = sensor_pose(x, y, yaw)
+            points, labels = scan(true, n, args.range, rng)
+            # world frame = first sensor frame
+            reg = smap.integrate(points, labels)
+            err_t, err_r = pose_error(reg["pose"], np.linalg.inv(first) @ true)
+            print(f"{i:>4} | {reg['seconds']:>7.3f} | {reg['iterations']:>5} | {reg['fitness']:>7.3f} | "
+                  f"{reg['rmse']:>7.4f} | {err_t:>7.4f} | {err_r:>7.3f} | {len(smap.points):>8,}")
+
+
+if __name__ == "__main__":
+    main()
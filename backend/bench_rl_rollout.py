@@ -0,0 +1,83 @@
+"""
+Compare per-step RL over HTTP with server-side rollouts.
+
+  step    : one /rl_step request per move (what the UI does today)
+  rollout : one /rl_rollout request per episode
+  stream  : one /rl_rollout_stream request per episode (SSE chunks)
+
+All modes play the same seeded episodes in-process (FastAPI TestClient)
+and report requests, response bytes, wall time and time per move. The
+grid is the API's (GRID_SIZE in config.py; the Q-network is sized for it).
+
+    cd backend
+    python bench_rl_rollout.py --episodes 20
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import api
+
+
+def seed_all(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def run_step(client, max_steps):
+    requests, nbytes, moves = 0, 0, 0
+    for _ in range(max_steps):
+        r = client.post("/rl_step")
+        requests += 1
+        nbytes += len(r.content)
+        moves += 1
+        if r.json()["done"]:
+            break
+    return requests, nbytes, moves
+
+
+def run_rollout(client, max_steps):
+    r = client.post("/rl_rollout", params={"steps": max_steps})
+    return 1, len(r.content), len(r.json()["actions"])
+
+
+def run_stream(client, max_steps):
+    r = client.post("/rl_rollout_stream", params={"steps": max_steps, "chunk": 25})
+    moves = 0
+    for line in r.text.splitlines():
+        if line.startswith("data:") and '"type":"done"' in line:
+            moves = int(line.split('"steps":')[1].split(",")[0])
+    return 1, len(r.content), moves
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    client = TestClient(api.app)
+    max_steps = api.GRID_SIZE * api.GRID_SIZE
+    client.post("/rl_reset_random")  # load the agent outside the timings
+
+    print(f"{'mode':>8} | {'requests':>8} | {'bytes':>12} | {'moves':>7} | {'wall s':>7} | {'us/move':>8}")
+    for name, fn in (("step", run_step), ("rollout", run_rollout), ("stream", run_stream)):
+        seed_all(args.seed)
+        totals = np.zeros(3, dtype=np.int64)
+        wall = 0.0
+        for _ in range(args.episodes):
+            client.post("/rl_reset_random")
+            t0 = time.perf_counter()
+            totals += fn(client, max_steps)
+            wall += time.perf_counter() - t0
+        requests, nbytes, moves = totals
+        print(f"{name:>8} | {requests:>8} | {nbytes:>12,} | {moves:>7} | "
+              f"{wall:>7.3f} | {1e6 * wall / max(moves, 1):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Time to a target validation mIoU: uniform scan sampling (train_seg.py
+default) vs class-balanced block sampling (train_seg.py --balanced).
+
+Builds a procedural dataset (generate_dummy_npz.py: doors, windows and
+sofas are rare) in a temporary directory, trains both ways with the same
+number of samples per epoch and reports, per run, the first epoch and
+wall-clock time at which val mIoU, averaged over the last --window
+epochs (single epochs are noisy), reaches --target, plus the IoU of
+each class averaged over the last --window epochs.
+
+    cd backend
+    python bench_sampler.py --epochs 30 --target 0.5
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import torch
+
+import train_seg
+from class_index import build_class_index, index_path, save_class_index
+from config import NUM_CLASSES
+from generate_dummy_npz import generate_scene
+
+
+def make_dataset(root, train_scenes, val_scenes, points, seed=0):
+    for split, n, offset in (("train", train_scenes, 0), ("val", val_scenes, 1000)):
+        files = []
+        for i in range(n):
+            path = Path(root) / f"{split}_{i:04d}.npz"
+            generate_scene(path, points, rooms=2, furniture_density=0.08, seed=seed + offset + i)
+            files.append(str(path))
+        save_class_index(index_path(root, split), build_class_index(files))
+
+
+def run(root, balanced, args):
+    torch.manual_seed(args.seed)
+    np.random.seed(args.seed)
+    ns = argparse.Namespace(
+        epochs=args.epochs, batch_size=args.batch_size, lr=args.lr, name="bench", augment=False,
+        seed=args.seed, balanced=balanced, balance_start=args.balance_start, balance_end=args.balance_end,
+        samples_per_epoch=args.train_scenes, num_points=args.num_points, workers=0,
+        data_dir=str(root), checkpoint_dir=str(Path(root) / "checkpoints"),
+    )
+    return train_seg.train(ns)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--target", type=float, default=0.5, help="val mIoU to reach")
+    parser.add_argument("--window", type=int, default=3, help="epochs averaged for the target check")
+    parser.add_argument("--train_scenes", type=int, default=24)
+    parser.add_argument("--val_scenes", type=int, default=6)
+    parser.add_argument("--scene_points", type=int, default=200_000)
+    parser.add_argument("--num_points", type=int, default=2048)
+    parser.add_argument("--batch_size", type=int, default=8)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--balance_start", type=float, default=1.0)
+    parser.add_argument("--balance_end", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    torch.set_num_threads(max(torch.get_num_threads(), 1))
+    with tempfile.TemporaryDirectory() as root:
+        make_dataset(root, args.train_scenes, args.val_scenes, args.scene_points, args.seed)
+        results = {}
+        for name, balanced in (("uniform scans", False), ("balanced blocks", True)):
+            print(f"\n=== {name} ===")
+            results[name] = run(root, balanced, args)
+
+    w = args.window
+    print(f"\n{'run':<16} | {'epoch':>5} | {'seconds':>7} | {'final mIoU':>10} | "
+          f"per-class IoU (mean of last {w} epochs)")
+    for name, hist in results.items():
+        miou = np.array([h["val_miou"] for h in hist])
+        smooth = np.convolve(miou, np.ones(w) / w, mode="valid")   # smooth[i] ends at epoch i + w
+        i = int(np.argmax(smooth >= args.target)) if (smooth >= args.target).any() else None
+        reached = (f"{hist[i + w - 1]['epoch']:>5} | {hist[i + w - 1]['seconds']:>7.1f}" if i is not None
+                   else f"{'-':>5} | {'-':>7}")
+        iou = np.nanmean(np.array([h["val_iou"] for h in hist[-w:]], dtype=np.float64), axis=0)
+        cells = " ".join("-" if np.isnan(v) else f"{v:.2f}" for v in iou)
+        print(f"{name:<16} | {reached} | {smooth[-1]:>10.4f} | {cells}")
+    print(f"(target mIoU {args.target}, {NUM_CLASSES} classes)")
+
+
+if __name__ == "__main__":
+    main()
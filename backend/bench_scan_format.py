@@ -0,0 +1,134 @@
+"""
+Size and decode throughput of .lsc scans (scan_format.py) vs NPZ.
+
+For synthetic scans (generate_dummy_npz.py fixtures) and the bundled
+scene*.npz, compares np.savez, np.savez_compressed and .lsc on:
+
+    size       bytes on disk
+    full       points + labels, as PointCloudDataset reads them
+    xyz        the x, y, z columns only (NPZ has to load all points)
+    block      one BLOCK_SIZE x BLOCK_SIZE m block in the middle of the
+               scan, as BlockDataset reads it (NPZ: load all, then filter)
+
+    cd backend
+    python bench_scan_format.py --points 1000000 5000000
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from config import BLOCK_SIZE
+from generate_dummy_npz import ensure_fixture
+from scan_format import ScanFile, write_scan
+
+
+def timed(fn, repeat):
+    fn()
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return float(np.median(out))
+
+
+def center_block(points):
+    xy = points[:, :2]
+    origin = xy.min(axis=0)
+    k = np.floor((np.median(xy, axis=0) - origin) / BLOCK_SIZE)
+    lo = origin + k * BLOCK_SIZE
+    return (lo[0], lo[1], lo[0] + BLOCK_SIZE, lo[1] + BLOCK_SIZE)
+
+
+def npz_readers(path, region):
+    def full():
+        with np.load(path) as d:
+            return d["points"].astype(np.float32), d["labels"].astype(np.int64)
+
+    def xyz():
+        with np.load(path) as d:
+            return d["points"][:, :3].astype(np.float32)
+
+    def block():
+        with np.load(path) as d:
+            p = d["points"]
+            m = (p[:, 0] >= region[0]) & (p[:, 0] < region[2]) & (p[:, 1] >= region[1]) & (p[:, 1] < region[3])
+            return p[m].astype(np.float32), d["labels"][m]
+
+    return {"full": full, "xyz": xyz, "block": block}
+
+
+def lsc_readers(path, region):
+    def full():
+        with ScanFile(path) as s:
+            return s["points"], s["labels"]
+
+    def xyz():
+        with ScanFile(path) as s:
+            return s.read(["x", "y", "z"])
+
+    def block():
+        with ScanFile(path) as s:
+            return s.read(region=region)
+
+    return {"full": full, "xyz": xyz, "block": block}
+
+
+def bench(name, points, labels, tmp, repeat):
+    region = center_block(points)
+    paths = {"npz": tmp / "scan.npz", "npz_compressed": tmp / "scan_c.npz", "lsc": tmp / "scan.lsc"}
+    t_write = {}
+    for fmt, path in paths.items():
+        t0 = time.perf_counter()
+        if fmt == "npz":
+            np.savez(path, points=points, labels=labels)
+        elif fmt == "npz_compressed":
+            np.savez_compressed(path, points=points, labels=labels)
+        else:
+            write_scan(path, points, labels)
+        t_write[fmt] = time.perf_counter() - t0
+
+    n = len(points)
+    print(f"\n{name}: {n} points, points {points.dtype}, labels {labels.dtype}")
+    print(f"{'format':<15} | {'MB':>7} | {'write s':>7} | {'full ms':>8} | {'Mpts/s':>6} | "
+          f"{'xyz ms':>7} | {'block ms':>8}")
+    for fmt, path in paths.items():
+        readers = (lsc_readers if fmt == "lsc" else npz_readers)(path, region)
+        t = {k: timed(fn, repeat) for k, fn in readers.items()}
+        print(f"{fmt:<15} | {os.path.getsize(path) / 1e6:>7.2f} | {t_write[fmt]:>7.2f} | {t['full'] * 1000:>8.1f} | "
+              f"{n / t['full'] / 1e6:>6.1f} | {t['xyz'] * 1000:>7.1f} | {t['block'] * 1000:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for n in args.points:
+            with np.load(ensure_fixture(n)) as d:
+                bench(f"synthetic_{n}", d["points"], d["labels"], tmp, args.repeat)
+        for path in sorted(glob.glob(str(Path(__file__).parent / "scene*.npz")))[:1]:
+            with np.load(path) as d:
+                bench(Path(path).name, d["points"], d["labels"], tmp, args.repeat)
+
+        sizes = {"npz": 0, "lsc": 0}
+        for path in sorted(glob.glob(str(Path(__file__).parent / "scene*.npz"))):
+            with np.load(path) as d:
+                write_scan(tmp / "s.lsc", d["points"], d["labels"])
+            sizes["npz"] += os.path.getsize(path)
+            sizes["lsc"] += os.path.getsize(tmp / "s.lsc")
+        if sizes["lsc"]:
+            print(f"\nbundled scene*.npz: {sizes['npz'] / 1e6:.2f} MB as NPZ, {sizes['lsc'] / 1e6:.3f} MB as .lsc")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark the /segment_stream SSE protocol.
+
+Compares the original protocol (JSON label lists per batch plus a repeated
+`final` dump of every label) with the compact protocol served by api.py
+(base64 uint8 labels with offsets, no final dump).
+
+Reports bytes on the wire and server CPU time for each.
+
+    cd backend
+    python bench_segment_stream.py --points 200000 500000
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+
+import api
+
+
+def legacy_stream_events(points, batch_size=api.STREAM_BATCH_SIZE):
+    """
+    Reference copy of the original event generator, kept only for comparison.
+    """
+    N = points.shape[0]
+    total_batches = (N + batch_size - 1) // batch_size
+    yield f"data: {json.dumps({'total_batches': total_batches})}\n\n"
+
+    all_preds = []
+    with torch.no_grad():
+        batch_num = 1
+        for i in range(0, N, batch_size):
+            part = points[i:i + batch_size]
+            pts = torch.from_numpy(part).float().unsqueeze(0).to(api.get_device())
+            preds = api.SEG_MODELS.get()(pts).argmax(dim=1).squeeze(0).cpu().numpy()
+            all_preds.append(preds.tolist())
+            yield f"data: {json.dumps({'batch': batch_num, 'preds': preds.tolist()})}\n\n"
+            batch_num += 1
+
+    final_preds = np.concatenate([np.array(x) for x in all_preds]).tolist()
+    yield f"data: {json.dumps({'done': True, 'final': final_preds})}\n\n"
+
+
+def measure(events):
+    t0 = time.perf_counter()
+    cpu0 = time.process_time()
+    nbytes = 0
+    for ev in events:
+        nbytes += len(ev.encode("utf-8"))
+    return {
+        "bytes": nbytes,
+        "wall_s": time.perf_counter() - t0,
+        "cpu_s": time.process_time() - cpu0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, nargs="+", default=[100000, 500000])
+    parser.add_argument("--batch_size", type=int, default=api.STREAM_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'N':>10} | {'protocol':>8} | {'bytes':>12} | {'wall s':>8} | {'cpu s':>8}")
+    for n in args.points:
+        points = rng.random((n, 7), dtype=np.float32)
+        legacy = measure(legacy_stream_events(points, args.batch_size))
+        lean = measure(api.segment_stream_events(points, args.batch_size))
+        for name, r in (("legacy", legacy), ("lean", lean)):
+            print(f"{n:>10} | {name:>8} | {r['bytes']:>12,} | "
+                  f"{r['wall_s']:>8.3f} | {r['cpu_s']:>8.3f}")
+        print(f"{'':>10}   bytes x{legacy['bytes'] / lean['bytes']:.1f} smaller, "
+              f"cpu {100 * (1 - lean['cpu_s'] / legacy['cpu_s']):.1f}% less")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Load-test per-session map / RL state with concurrent sessions.
+
+Every simulated client uses its own X-Session-ID: it builds a map from a
+scene, resets the agent from it and steps it. At the end each session's
+map is read back to check that no client overwrote another's state.
+
+In-process (FastAPI TestClient):
+    cd backend
+    python bench_sessions.py --sessions 1 8 32 --steps 50
+
+Against a running server (e.g. several workers sharing SESSION_DIR):
+    SESSION_DIR=/tmp/sessions uvicorn api:app --workers 4 --port 8000
+    python bench_sessions.py --url http://localhost:8000 --sessions 32
+"""
+
+import argparse
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+
+def make_client(url):
+    if url:
+        import httpx
+        return httpx.Client(base_url=url, timeout=60)
+    from fastapi.testclient import TestClient
+    import api
+    return TestClient(api.app)
+
+
+def run_session(client, scene_bytes, steps):
+    sid = uuid.uuid4().hex
+    h = {"X-Session-ID": sid}
+    latencies = []
+
+    def call(method, path, **kw):
+        t0 = time.perf_counter()
+        r = client.request(method, path, headers=h, **kw)
+        r.raise_for_status()
+        latencies.append(time.perf_counter() - t0)
+        return r.json()
+
+    grid = call("POST", "/build_map", files={"file": ("scene.npz", scene_bytes)})["grid"]
+    call("POST", "/rl_reset_from_map")
+    for _ in range(steps):
+        if call("POST", "/rl_step")["done"]:
+            call("POST", "/rl_reset_from_map")
+    isolated = call("GET", "/get_map")["grid"] == grid
+    return latencies, isolated
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="server URL; default runs in-process")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--steps", type=int, default=50)
+    args = parser.parse_args()
+
+    scenes = sorted(BACKEND_DIR.glob("scene*.npz"))
+    scene_bytes = [p.read_bytes() for p in scenes]
+
+    client = make_client(args.url)
+    print(f"{'sessions':>8} | {'requests':>8} | {'req/s':>8} | {'p50 ms':>8} | {'p99 ms':>8} | isolated")
+    for n in args.sessions:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            results = list(pool.map(
+                lambda i: run_session(client, scene_bytes[i % len(scene_bytes)], args.steps),
+                range(n),
+            ))
+        wall = time.perf_counter() - t0
+
+        lat = np.concatenate([np.array(r[0]) for r in results]) * 1000
+        ok = all(r[1] for r in results)
+        print(f"{n:>8} | {lat.size:>8} | {lat.size / wall:>8.1f} | "
+              f"{np.percentile(lat, 50):>8.2f} | {np.percentile(lat, 99):>8.2f} | {ok}")
+
+
+if __name__ == "__main__":
+    main()
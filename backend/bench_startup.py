@@ -0,0 +1,89 @@
+"""
+Benchmark API startup.
+
+Each run happens in a fresh interpreter so import costs are real:
+  - import_s          : `import api`
+  - first_response_s  : import -> first /health response
+  - ready_s           : import -> /ready returns 200 (warm start only)
+  - first_inference_s : latency of the first /segment request
+
+Modes:
+  cold : models load on the first request (default)
+  warm : PRELOAD_MODELS=1, background warm-up; /segment is sent once /ready
+
+    cd backend
+    python bench_startup.py --repeats 3 --points 50000
+"""
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def child(mode, n_points):
+    t0 = time.perf_counter()
+    import api
+    from fastapi.testclient import TestClient
+    t_import = time.perf_counter() - t0
+
+    out = {"mode": mode, "import_s": t_import}
+    with TestClient(api.app) as client:
+        client.get("/health")
+        out["first_response_s"] = time.perf_counter() - t0
+
+        if mode == "warm":
+            while client.get("/ready").status_code != 200:
+                time.sleep(0.01)
+            out["ready_s"] = time.perf_counter() - t0
+
+        buf = io.BytesIO()
+        np.savez(buf, points=np.random.rand(n_points, 7).astype(np.float32))
+        t1 = time.perf_counter()
+        r = client.post("/segment", files={"file": ("scan.npz", buf.getvalue())})
+        r.raise_for_status()
+        out["first_inference_s"] = time.perf_counter() - t1
+
+    print("RESULT " + json.dumps(out))
+
+
+def run_once(mode, n_points):
+    env = dict(os.environ, PRELOAD_MODELS="1" if mode == "warm" else "0")
+    proc = subprocess.run(
+        [sys.executable, __file__, "--child", mode, "--points", str(n_points)],
+        env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    line = [l for l in proc.stdout.splitlines() if l.startswith("RESULT ")][-1]
+    return json.loads(line[len("RESULT "):])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--points", type=int, default=50000)
+    parser.add_argument("--child", choices=["cold", "warm"])
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.points)
+        return
+
+    keys = ["import_s", "first_response_s", "ready_s", "first_inference_s"]
+    print(f"{'mode':>5} | " + " | ".join(f"{k:>17}" for k in keys))
+    for mode in ("cold", "warm"):
+        runs = [run_once(mode, args.points) for _ in range(args.repeats)]
+        cells = []
+        for k in keys:
+            vals = [r[k] for r in runs if k in r]
+            cells.append(f"{np.median(vals):>17.3f}" if vals else f"{'-':>17}")
+        print(f"{mode:>5} | " + " | ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,539 @@
+"""
+Benchmark suite: segmentation, mapping, RL, data loading and the API.
+
+    cd backend
+    python benchmark.py run --out bench_base.json            # full sweep
+    python benchmark.py run --quick --only seg,map --out a.json
+    python benchmark.py list
+    python benchmark.py compare bench_base.json bench_new.json --threshold 0.10
+
+Each benchmark is a function registered with @benchmark(name, params) that
+returns a zero-argument callable for one parameter value; the harness
+warms it up, times it `repeat` times and records min/median/mean/stdev.
+
+`compare` prints the median ratio per benchmark and exits with status 1
+if any benchmark got slower than the threshold.
+
+Inputs come from the synthetic fixtures (generate_dummy_npz.ensure_fixture),
+generated on first use.
+"""
+
+import argparse
+import io
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from generate_dummy_npz import ensure_fixture
+
+BENCHMARKS = {}
+
+
+def benchmark(name, group, params, quick_params=None):
+    """
+    Registers `fn(param) -> callable`. quick_params is the subset used by --quick.
+    """
+    def deco(fn):
+        BENCHMARKS[name] = {
+            "fn": fn,
+            "group": group,
+            "params": params,
+            "quick_params": quick_params if quick_params is not None else params[:1],
+        }
+        return fn
+    return deco
+
+
+def load_fixture(num_points):
+    """
+    (points (N,7) float32, labels (N,) uint8); sizes below 100k are a
+    random subsample of the 100k fixture.
+    """
+    base = 100_000 if num_points <= 100_000 else num_points
+    with np.load(ensure_fixture(base)) as data:
+        points, labels = data["points"], data["labels"]
+    if num_points < base:
+        idx = np.random.default_rng(0).choice(base, num_points, replace=False)
+        points, labels = points[idx], labels[idx]
+    return points, labels
+
+
+def npz_bytes(**arrays):
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+# -----------------------------------------------------------
+# Segmentation
+# -----------------------------------------------------------
+
+@benchmark("seg.forward", "seg", params=[4096, 50_000, 200_000, 1_000_000], quick_params=[4096, 50_000])
+def bench_seg_forward(n):
+    import torch
+    from config import NUM_CLASSES
+    from models.pointnet import PointNetSegLite
+
+    model = PointNetSegLite(num_classes=NUM_CLASSES, input_dim=7).eval()
+    pts = torch.from_numpy(load_fixture(n)[0]).unsqueeze(0)
+
+    def run():
+        with torch.no_grad():
+            model(pts)
+    return run
+
+
+@benchmark("seg.feature_cache", "seg", params=[(50_000, m) for m in ("cold", "warm", "crop")],
+           quick_params=[(50_000, "cold"), (50_000, "crop")])
+def bench_feature_cache(param):
+    """
+    segment_subsampled() on the 1M fixture: cold (cache cleared), warm
+    (same upload, found by hash), crop (half the scene with its key).
+    Long sweeps: bench_feature_cache.py.
+    """
+    import api
+
+    n, mode = param
+    raw = load_fixture(1_000_000)[0]
+    crop = raw[raw[:, 0] < np.median(raw[:, 0])]
+    scene = api.segment_subsampled(raw, max_points=n)[1]["scene"]
+
+    def run():
+        if mode == "cold":
+            api.FEATURE_CACHE.clear()
+            api.segment_subsampled(raw, max_points=n)
+        elif mode == "warm":
+            api.segment_subsampled(raw, max_points=n)
+        else:
+            api.segment_subsampled(crop, scene=scene, max_points=n)
+    return run
+
+
+# -----------------------------------------------------------
+# Mapping
+# -----------------------------------------------------------
+
+@benchmark("map.points_to_occupancy", "map",
+           params=[(n, g) for n in (100_000, 1_000_000, 5_000_000) for g in (40, 200)],
+           quick_params=[(100_000, 40), (1_000_000, 40)])
+def bench_points_to_occupancy(param):
+    from api import points_to_occupancy
+
+    n, grid = param
+    points, labels = load_fixture(n)
+    xyz = points[:, :3]
+
+    def run():
+        points_to_occupancy(xyz, labels=labels, grid_size=grid, resolution=0.2, z_thresh=(0.1, 2.5))
+    return run
+
+
+@benchmark("map.build_layers", "map",
+           params=[(n, g) for n in (100_000, 1_000_000, 5_000_000) for g in (40, 200)],
+           quick_params=[(100_000, 40), (1_000_000, 40)])
+def bench_build_layers(param):
+    from mapping import build_layers
+
+    n, grid = param
+    points, labels = load_fixture(n)
+    xyz = points[:, :3]
+
+    def run():
+        build_layers(xyz, labels=labels, grid_size=grid, resolution=0.2, z_thresh=(0.1, 2.5))
+    return run
+
+
+@benchmark("map.raycast", "map", params=[(n, g) for n in (10_000, 200_000) for g in (200, 1000)],
+           quick_params=[(10_000, 200)])
+def bench_raycast(param):
+    """
+    n distinct rays from the grid centre to random cells.
+    """
+    from mapping import mark_rays
+
+    n, grid = param
+    ends = np.random.default_rng(0).integers(0, grid, (n, 2))
+    free = np.zeros(grid * grid, dtype=bool)
+
+    def run():
+        mark_rays(free, (grid / 2, grid / 2), ends, grid)
+    return run
+
+
+@benchmark("map.icp_register", "map", params=[100_000, 1_000_000], quick_params=[100_000])
+def bench_icp_register(n):
+    """
+    Point-to-plane ICP of the second scan of bench_registration.py's
+    room against a map of the first, target normals included.
+    """
+    from bench_registration import TRAJECTORY, scan, sensor_pose
+    from registration import ScanMap
+
+    rng = np.random.default_rng(0)
+    first = ScanMap()
+    first.integrate(*scan(sensor_pose(*TRAJECTORY[0]), n, 7.0, rng))
+    state = first.state_dict()
+    cloud, _ = first.downsample(*scan(sensor_pose(*TRAJECTORY[1]), n, 7.0, rng))
+
+    def run():
+        # a fresh map per run: its ICP targets are built as after a fused scan
+        ScanMap().load_state_dict(state).register(cloud)
+    return run
+
+
+def frontier_states(size, steps=20, radius=12):
+    """
+    bench_frontiers.py's room map revealed along the diagonal: the state
+    after `steps` discs, the state after one more, and the robot cell
+    (x, y) of the last disc (may be occupied: see nearest_free).
+    """
+    from bench_frontiers import reveal, room_map
+    from mapping import UNKNOWN
+
+    truth = room_map(size, np.random.default_rng(0))
+    state = np.full_like(truth, UNKNOWN)
+    for k in range(steps):
+        reveal(state, truth, (8 + 6 * k, 8 + 6 * k), radius)
+    before = state.copy()
+    reveal(state, truth, (8 + 6 * steps, 8 + 6 * steps), radius)
+    return before, state, (8 + 6 * steps, 8 + 6 * steps)
+
+
+@benchmark("map.frontier_update", "map", params=[512, 2048], quick_params=[512])
+def bench_frontier_update(size):
+    """
+    FrontierMap.update() for one revealed disc (diff against the previous map).
+    """
+    from exploration import FrontierMap
+
+    states = frontier_states(size)[:2]
+    frontiers = FrontierMap()
+    frontiers.update(states[0])
+    step = [1]
+
+    def run():
+        frontiers.update(states[step[0] % 2])
+        step[0] += 1
+    return run
+
+
+@benchmark("map.frontier_rank", "map", params=[512, 2048], quick_params=[512])
+def bench_frontier_rank(size):
+    """
+    FrontierMap.rank() after a map change (one revealed disc): clusters,
+    free-cell graph and distance field from the robot, including the
+    incremental update. Long sweeps: bench_frontiers.py.
+    """
+    from exploration import FrontierMap, nearest_free
+
+    before, after, cell = frontier_states(size)
+    states = [(s, nearest_free(s, cell)) for s in (before, after)]
+    frontiers = FrontierMap()
+    frontiers.update(before)
+    step = [1]
+
+    def run():
+        state, robot = states[step[0] % 2]
+        frontiers.update(state)   # a new map version: nothing of the last rank() is reused
+        frontiers.rank(robot)
+        step[0] += 1
+    return run
+
+
+# -----------------------------------------------------------
+# Data loading
+# -----------------------------------------------------------
+
+@benchmark("data.dataset_getitem", "data", params=[100_000, 1_000_000], quick_params=[100_000])
+def bench_dataset_getitem(n):
+    from config import NUM_POINTS
+    from dataset import PointCloudDataset
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_ds_"))
+    shutil.copy(ensure_fixture(n), tmp / "train_0000.npz")
+    ds = PointCloudDataset(str(tmp), split="train", num_points=NUM_POINTS)
+
+    def run():
+        ds[0]
+    return run
+
+
+@benchmark("data.ingest", "data", params=[(n, m) for n in (1_000_000, 5_000_000) for m in ("stream", "segment")],
+           quick_params=[(1_000_000, "stream"), (1_000_000, "segment")])
+def bench_ingest(param):
+    """
+    Uploaded float64 NPZ -> (1, N, 7) model input through the buffer pool:
+    the whole scan (stream) or a 50k subsample (segment). Peak memory
+    and other input types: bench_ingest.py.
+    """
+    from ingest import BufferPool, as_batch, load_points, normalize_into
+    from scan_format import open_scan_bytes
+    import torch
+
+    n, mode = param
+    body = npz_bytes(points=load_fixture(n)[0].astype(np.float64))
+    pool = BufferPool(max_bytes=1 << 30)
+    device = torch.device("cpu")
+    rng = np.random.default_rng(0)
+
+    def run():
+        data = open_scan_bytes(body)
+        if mode == "stream":
+            buf = load_points(data, pool)
+        else:
+            raw = data["points"]
+            buf = normalize_into(raw, pool, rows=np.sort(rng.choice(len(raw), 50_000, replace=False)))
+        with buf:
+            as_batch(buf.array, device)
+    return run
+
+
+@benchmark("data.lsc_decode", "data", params=[(n, r) for n in (1_000_000, 5_000_000) for r in ("full", "block")],
+           quick_params=[(1_000_000, "full"), (1_000_000, "block")])
+def bench_lsc_decode(param):
+    """
+    .lsc fixture: all points in their original order, or the chunks of
+    one training block around the centre. Sizes vs NPZ: bench_scan_format.py.
+    """
+    from config import BLOCK_SIZE
+    from scan_format import ScanFile, write_scan
+
+    n, read = param
+    points, labels = load_fixture(n)
+    path = Path(tempfile.mkdtemp(prefix="bench_lsc_")) / "scan.lsc"
+    write_scan(path, points, labels)
+    cx, cy = np.median(points[:, :2], axis=0)
+    region = (cx, cy, cx + BLOCK_SIZE, cy + BLOCK_SIZE)
+
+    def run():
+        with ScanFile(path) as scan:
+            if read == "full":
+                scan["points"]
+            else:
+                scan.read(region=region)
+    return run
+
+
+# -----------------------------------------------------------
+# RL
+# -----------------------------------------------------------
+
+@benchmark("rl.mapenv_step", "rl", params=[40, 200])
+def bench_mapenv_step(grid):
+    from rl_nav import MapEnv
+
+    env = MapEnv(grid_size=grid)
+    env.grid[:] = 0          # no obstacles: the episode never ends early
+    actions = np.random.default_rng(0).integers(0, 4, 1000)
+
+    def run():
+        env.steps = 0
+        for a in actions:
+            env.step(int(a))
+    return run
+
+
+# -----------------------------------------------------------
+# API (FastAPI TestClient, end to end)
+# -----------------------------------------------------------
+
+_CLIENT = None
+
+
+def api_client():
+    global _CLIENT
+    if _CLIENT is None:
+        from fastapi.testclient import TestClient
+        import api
+        _CLIENT = TestClient(api.app)
+        _CLIENT.get("/ready")
+        api.SEG_MODELS.get()
+        api.RL_AGENT.get()
+    return _CLIENT
+
+
+@benchmark("api.segment", "api", params=[50_000, 200_000], quick_params=[50_000])
+def bench_api_segment(n):
+    client = api_client()
+    body = npz_bytes(points=load_fixture(n)[0])
+
+    def run():
+        client.post("/segment", files={"file": ("scan.npz", body)}).raise_for_status()
+    return run
+
+
+@benchmark("api.segment_stream", "api", params=[200_000, 1_000_000], quick_params=[200_000])
+def bench_api_segment_stream(n):
+    client = api_client()
+    body = npz_bytes(points=load_fixture(n)[0])
+
+    def run():
+        client.post("/segment_stream", files={"file": ("scan.npz", body)}).raise_for_status()
+    return run
+
+
+@benchmark("api.build_map", "api", params=[100_000, 1_000_000], quick_params=[100_000])
+def bench_api_build_map(n):
+    client = api_client()
+    points, labels = load_fixture(n)
+    body = npz_bytes(points=points, labels=labels)
+
+    def run():
+        client.post("/build_map", files={"file": ("scan.npz", body)}).raise_for_status()
+    return run
+
+
+@benchmark("api.get_map", "api", params=[None])
+def bench_api_get_map(_):
+    client = api_client()
+
+    def run():
+        client.get("/get_map").raise_for_status()
+    return run
+
+
+@benchmark("api.rl_step", "api", params=[None])
+def bench_api_rl_step(_):
+    client = api_client()
+    client.post("/rl_reset_random")
+
+    def run():
+        if client.post("/rl_step").json()["done"]:
+            client.post("/rl_reset_random")
+    return run
+
+
+# -----------------------------------------------------------
+# Harness
+# -----------------------------------------------------------
+
+def key(name, param):
+    if param is None:
+        return name
+    if isinstance(param, tuple):
+        param = "x".join(map(str, param))
+    return f"{name}[{param}]"
+
+
+def time_callable(fn, repeat, warmup, min_time):
+    for _ in range(warmup):
+        fn()
+    times = []
+    t_end = time.perf_counter() + min_time
+    while len(times) < repeat or time.perf_counter() < t_end:
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+        if len(times) >= 10 * repeat:
+            break
+    return {
+        "runs": len(times),
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def environment():
+    env = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    try:
+        import torch
+        env["torch"] = torch.__version__
+        env["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return env
+
+
+def cmd_run(args):
+    only = set(args.only.split(",")) if args.only else None
+    results = {}
+    for name, b in BENCHMARKS.items():
+        if only and b["group"] not in only and name not in only:
+            continue
+        for param in (b["quick_params"] if args.quick else b["params"]):
+            k = key(name, param)
+            fn = b["fn"](param)
+            r = time_callable(fn, args.repeat, args.warmup, args.min_time)
+            results[k] = r
+            print(f"{k:<45} median {r['median'] * 1000:>10.3f} ms   "
+                  f"min {r['min'] * 1000:>10.3f} ms   ({r['runs']} runs)", flush=True)
+
+    out = {"environment": environment(), "results": results}
+    if args.out:
+        Path(args.out).write_text(json.dumps(out, indent=2))
+        print("Saved", args.out)
+
+
+def cmd_compare(args):
+    base = json.loads(Path(args.base).read_text())["results"]
+    new = json.loads(Path(args.new).read_text())["results"]
+
+    regressions = []
+    print(f"{'benchmark':<45} {'base ms':>10} {'new ms':>10} {'ratio':>7}")
+    for k in sorted(set(base) & set(new)):
+        b, n = base[k][args.stat], new[k][args.stat]
+        ratio = n / b if b > 0 else float("inf")
+        flag = ""
+        if ratio > 1 + args.threshold:
+            flag = "  SLOWER"
+            regressions.append(k)
+        elif ratio < 1 - args.threshold:
+            flag = "  faster"
+        print(f"{k:<45} {b * 1000:>10.3f} {n * 1000:>10.3f} {ratio:>7.2f}{flag}")
+
+    for k in sorted(set(base) ^ set(new)):
+        print(f"{k:<45} only in {'base' if k in base else 'new'}")
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("run")
+    p.add_argument("--out", default=None, help="write results JSON here")
+    p.add_argument("--only", default=None, help="comma list of groups (seg,map,data,rl,api) or names")
+    p.add_argument("--quick", action="store_true", help="small parameter set")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--warmup", type=int, default=1)
+    p.add_argument("--min_time", type=float, default=0.5, help="keep timing for at least this many seconds")
+
+    p = sub.add_parser("compare")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.10, help="relative slowdown that fails")
+    p.add_argument("--stat", choices=["median", "min", "mean"], default="median")
+
+    sub.add_parser("list")
+
+    args = parser.parse_args()
+    if args.cmd == "run":
+        cmd_run(args)
+    elif args.cmd == "compare":
+        cmd_compare(args)
+    else:
+        for name, b in BENCHMARKS.items():
+            print(f"{name:<30} [{b['group']}] params={b['params']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Per-block class histograms of the processed scans, for class-balanced
+training (dataset.BlockDataset + ClassBalancedSampler).
+
+Each scan is cut into BLOCK_SIZE x BLOCK_SIZE m columns on its own xy
+grid (origin = the scan's xy minimum). preprocess_3dses.py writes one
+index per split, DATA_PROCESSED/class_index_<split>.npz:
+
+    files       (F,)    scan file names (relative to the split directory)
+    origin      (F, 2)  block grid origin per scan
+    block       (K, 3)  file index, block column, block row
+    hist        (K, C)  points per class in the block
+    block_size  ()      metres
+
+Blocks with fewer than min_points points are left out.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+from torch.utils.data import Sampler
+
+from config import BLOCK_SIZE, NUM_CLASSES
+from scan_format import open_scan, scan_files
+
+
+def index_path(root_dir, split):
+    return Path(root_dir) / f"class_index_{split}.npz"
+
+
+def block_keys(xy, origin, block_size):
+    return np.floor((xy - origin) / block_size).astype(np.int32)
+
+
+def scan_blocks(points, labels, block_size=BLOCK_SIZE, num_classes=NUM_CLASSES):
+    """
+    -> (origin (2,), keys (K, 2) block column/row, hist (K, C)) of one scan.
+    """
+    xy = points[:, :2]
+    origin = xy.min(axis=0)
+    keys = block_keys(xy, origin, block_size)
+    cols = int(keys[:, 0].max()) + 1
+    flat = keys[:, 1].astype(np.int64) * cols + keys[:, 0]
+    labels = np.asarray(labels, dtype=np.int64)
+    valid = (labels >= 0) & (labels < num_classes)
+    uniq, inverse = np.unique(flat[valid], return_inverse=True)
+    hist = np.bincount(inverse * num_classes + labels[valid], minlength=len(uniq) * num_classes)
+    keys = np.stack([uniq % cols, uniq // cols], axis=1).astype(np.int32)
+    return origin.astype(np.float32), keys, hist.reshape(len(uniq), num_classes)
+
+
+def build_class_index(files, block_size=BLOCK_SIZE, num_classes=NUM_CLASSES, min_points=256):
+    origins, blocks, hists = [], [], []
+    for i, path in enumerate(files):
+        with open_scan(path) as data:
+            origin, keys, hist = scan_blocks(data["points"], data["labels"], block_size, num_classes)
+        keep = hist.sum(axis=1) >= min_points
+        origins.append(origin)
+        blocks.append(np.column_stack([np.full(keep.sum(), i, dtype=np.int32), keys[keep]]))
+        hists.append(hist[keep])
+    return {
+        "files": np.array([os.path.basename(p) for p in files]),
+        "origin": np.array(origins, dtype=np.float32).reshape(-1, 2),
+        "block": np.concatenate(blocks) if blocks else np.zeros((0, 3), dtype=np.int32),
+        "hist": np.concatenate(hists) if hists else np.zeros((0, num_classes), dtype=np.int64),
+        "block_size": np.float32(block_size),
+    }
+
+
+def save_class_index(path, index):
+    np.savez(path, **index)
+
+
+def load_class_index(path):
+    with np.load(path) as data:
+        return {k: data[k] for k in data.files}
+
+
+def load_or_build_class_index(root_dir, split):
+    """
+    The split's index, built (and saved) now if preprocessing did not.
+    """
+    path = index_path(root_dir, split)
+    if path.exists():
+        return load_class_index(path)
+    files = scan_files(root_dir, split)
+    index = build_class_index(files)
+    save_class_index(path, index)
+    return index
+
+
+def class_weights(hist, power=0.5):
+    """
+    Per-class weights freq^-power, scaled so the average point weight is 1;
+    classes without points get 0. power=0.5 (inverse square root) keeps
+    the rarest classes from dominating the loss.
+    """
+    counts = np.asarray(hist).reshape(-1, np.shape(hist)[-1]).sum(axis=0).astype(np.float64)
+    freq = counts / max(counts.sum(), 1)
+    w = np.zeros_like(freq)
+    present = counts > 0
+    w[present] = freq[present] ** -power
+    return w / (freq * w).sum()
+
+
+class ClassBalancedSampler(Sampler):
+    """
+    Draws `num_samples` block indices per epoch, with replacement, with
+    probability (1 - balance) * uniform + balance * (mean class weight of
+    the block's points). balance moves linearly from balance_start to
+    balance_end over `epochs`; call set_epoch() before each epoch.
+    """
+
+    def __init__(self, hist, weights, num_samples=None, balance_start=1.0, balance_end=1.0,
+                 epochs=1, seed=0):
+        hist = np.asarray(hist, dtype=np.float64)
+        score = hist @ weights / np.maximum(hist.sum(axis=1), 1)
+        self.uniform = np.full(len(hist), 1.0 / len(hist))
+        self.balanced = score / score.sum()
+        self.num_samples = num_samples or len(hist)
+        self.balance_start, self.balance_end = balance_start, balance_end
+        self.epochs = epochs
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    @property
+    def balance(self):
+        t = min(self.epoch / max(self.epochs - 1, 1), 1.0)
+        return self.balance_start + (self.balance_end - self.balance_start) * t
+
+    def probabilities(self):
+        b = self.balance
+        return (1 - b) * self.uniform + b * self.balanced
+
+    def __len__(self):
+        return self.num_samples
+
+    def __iter__(self):
+        rng = np.random.default_rng((self.seed, self.epoch))
+        return iter(rng.choice(len(self.uniform), self.num_samples, p=self.probabilities()).tolist())
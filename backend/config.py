@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -8,3 +9,66 @@ CHECKPOINT_DIR = Path(__file__).resolve().parent / "checkpoints"
 NUM_CLASSES = 8     # adjust to your label set for 3DSES
 NUM_POINTS = 4096   # number of points sampled per scan
 GRID_SIZE = 40      # size of occupancy grid for mapping / RL
+BLOCK_SIZE = 3.0    # m, side of the training blocks of class_index.py (--balanced)
+
+# API startup: PRELOAD_MODELS=1 loads + warms the models in the background
+# at startup instead of on the first request
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "0") == "1"
+WARMUP_POINTS = int(os.environ.get("WARMUP_POINTS", "50000"))  # N of the warm-up forward pass
+
+# CPU budget per API worker (runtime.py): WEB_CONCURRENCY workers on the
+# host (uvicorn --workers default), torch threads per worker ("auto" =
+# cores / workers), optional pinning ("auto" or a CPU list like "0-3").
+# serve.py sets these; sweep_threads.py suggests values for the host.
+API_WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+TORCH_THREADS = os.environ.get("TORCH_THREADS", "auto")
+TORCH_INTEROP_THREADS = int(os.environ.get("TORCH_INTEROP_THREADS", "0"))
+CPU_AFFINITY = os.environ.get("CPU_AFFINITY", "")
+
+# Per-session map / RL state (see sessions.py). SESSION_DIR enables the
+# on-disk backend so several uvicorn workers can share sessions.
+SESSION_TTL = float(os.environ.get("SESSION_TTL", "3600"))   # seconds
+SESSION_MAX = int(os.environ.get("SESSION_MAX", "256"))
+SESSION_DIR = os.environ.get("SESSION_DIR") or None
+
+# Background batch segmentation (seg_jobs.py): jobs run concurrently
+SEG_JOB_WORKERS = int(os.environ.get("SEG_JOB_WORKERS", "1"))
+
+# Synthetic benchmark fixtures (generate_dummy_npz.py fixtures)
+BENCH_DIR = PROJECT_ROOT / "data" / "bench"
+
+# Debug only, off by default: with ALLOW_DEBUG_PROFILE=1, /segment returns a
+# per-layer profile when the request has X-Debug-Profile: 1. A profiled request
+# bypasses the feature cache, runs slower and exposes model internals.
+ALLOW_DEBUG_PROFILE = os.environ.get("ALLOW_DEBUG_PROFILE", "0") == "1"
+
+# T-Net input transform from a subsample: 0 = all points (exact). With N > 0
+# /segment estimates it from N points and /segment_stream + batch jobs compute
+# it once per scene instead of once per chunk (see study_tnet_subsample.py).
+TNET_POINTS = int(os.environ.get("TNET_POINTS", "0"))
+
+# /segment caches the T-Net transform and global feature of recent scenes
+# (feature_cache.py); least recently used scenes are evicted beyond this size
+FEATURE_CACHE_MB = float(os.environ.get("FEATURE_CACHE_MB", "64"))
+
+# /segment and /segment_stream normalize uploads into reusable (N,7) input
+# buffers (ingest.py); idle buffers beyond this size are freed
+INGEST_POOL_MB = float(os.environ.get("INGEST_POOL_MB", "256"))
+
+# Segmentation model registry (model_registry.py): checkpoints are
+# CHECKPOINT_DIR/<name>.pth. SEG_MODEL is the default; SEG_MODEL_AB
+# ("a:0.9,b:0.1") splits requests without an X-Model header between models.
+SEG_MODEL_NAME = os.environ.get("SEG_MODEL", "pointnet_3dses_best")
+SEG_MODEL_AB = os.environ.get("SEG_MODEL_AB", "")
+
+# 2.5D map layers (mapping.py): a cell is traversable when no point lies
+# between STEP_HEIGHT and ROBOT_HEIGHT (m) above the floor
+ROBOT_HEIGHT = float(os.environ.get("ROBOT_HEIGHT", "0.6"))
+STEP_HEIGHT = float(os.environ.get("STEP_HEIGHT", "0.1"))
+
+# /map/tile: cells per side of a map tile (see map_pyramid.py)
+MAP_TILE_SIZE = int(os.environ.get("MAP_TILE_SIZE", "64"))
+
+# /ws/map: seconds between checks for map changes made by other workers
+# (SESSION_DIR); changes in the same process are pushed at once
+MAP_FEED_POLL = float(os.environ.get("MAP_FEED_POLL", "1.0"))
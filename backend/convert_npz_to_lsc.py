@@ -0,0 +1,82 @@
+"""
+Converts .npz scans (points + labels) to the compressed columnar .lsc
+format (scan_format.py), next to the originals. Every converted scan is
+read back and checked row by row (all columns and the labels) before
+the .npz is deleted.
+
+    cd backend
+    python convert_npz_to_lsc.py ../data/processed/*.npz
+    python convert_npz_to_lsc.py scene*.npz --precision 0.0005 --delete
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from config import BLOCK_SIZE
+from scan_format import ScanFile, write_scan
+
+
+def verify(path, points, labels):
+    """
+    Reads `path` back and compares it with the original row by row: every
+    column within half its quantization step (+ float32 rounding), the
+    labels exactly. -> None, or what does not match.
+    """
+    with ScanFile(path) as check:
+        decoded = check["points"]
+        if decoded.shape != points.shape:
+            return f"{decoded.shape} points read back, expected {points.shape}"
+        for i, col in enumerate(check.header["columns"][:points.shape[1]]):
+            orig = points[:, i].astype(np.float64)
+            err = np.abs(decoded[:, i] - orig)
+            tol = col["scale"] / 2 + np.abs(orig) * 2.0 ** -22
+            bad = np.flatnonzero(err > tol)
+            if len(bad):
+                return f"column {col['name']}: row {bad[0]} is {decoded[bad[0], i]}, expected {orig[bad[0]]}"
+        if labels is not None:
+            bad = np.flatnonzero(check["labels"] != labels)
+            if len(bad):
+                return f"labels: row {bad[0]} differs"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="+", help=".npz scans")
+    parser.add_argument("--chunk_size", type=float, default=BLOCK_SIZE, help="m, side of a chunk")
+    parser.add_argument("--precision", type=float, default=0.001, help="m, xyz quantization step")
+    parser.add_argument("--level", type=int, default=6, help="zlib level")
+    parser.add_argument("--delete", action="store_true", help="remove each .npz once converted")
+    args = parser.parse_args()
+
+    total_in = total_out = 0
+    for src in map(Path, args.files):
+        t0 = time.perf_counter()
+        with np.load(src) as data:
+            points = data["points"]
+            labels = data["labels"] if "labels" in data else None
+        dst = src.with_suffix(".lsc")
+        write_scan(dst, points, labels, args.chunk_size, args.precision, args.level)
+
+        problem = verify(dst, points, labels)
+        if problem:
+            dst.unlink()
+            raise SystemExit(f"{src}: {problem}, not converted")
+
+        size_in, size_out = os.path.getsize(src), os.path.getsize(dst)
+        total_in += size_in
+        total_out += size_out
+        print(f"{src.name}: {size_in / 1e6:.2f} MB -> {size_out / 1e6:.2f} MB "
+              f"({len(points)} points, {time.perf_counter() - t0:.2f}s)")
+        if args.delete:
+            src.unlink()
+    if total_out:
+        print(f"Total: {total_in / 1e6:.2f} MB -> {total_out / 1e6:.2f} MB ({total_in / total_out:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
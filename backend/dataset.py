@@ -1,12 +1,13 @@
 import os
-import glob
 import numpy as np
 from torch.utils.data import Dataset
 
+from scan_format import ScanFile, open_scan, scan_files
+
 
 class PointCloudDataset(Dataset):
     """
-    Dataset for processed .npz files with:
+    Dataset for processed .npz (or .lsc, see scan_format.py) files with:
       - points: (N,7) float32 [x,y,z,r,g,b,intensity]
       - labels: (N,) int64     # dummy / real labels
     """
@@ -16,8 +17,7 @@ class PointCloudDataset(Dataset):
         self.split = split
         self.num_points = num_points
 
-        pattern = os.path.join(root_dir, f"{split}_*.npz")
-        self.files = sorted(glob.glob(pattern))
+        self.files = scan_files(root_dir, split)
 
         if not self.files:
             raise RuntimeError(
@@ -30,10 +30,9 @@ class PointCloudDataset(Dataset):
 
     def __getitem__(self, idx):
         path = self.files[idx]
-        data = np.load(path)
-
-        points = data["points"]  # (N,7)
-        labels = data["labels"]  # (N,)
+        with open_scan(path) as data:
+            points = data["points"]  # (N,7)
+            labels = data["labels"]  # (N,)
 
         N = points.shape[0]
 
@@ -50,3 +49,53 @@ class PointCloudDataset(Dataset):
         lbl = labels[idxs]
 
         return pts.astype("float32"), lbl.astype("int64")
+
+
+class BlockDataset(PointCloudDataset):
+    """
+    One item per block of a class index (class_index.py): num_points
+    drawn from the points inside the block, with probability
+    point_weights[label] (uniform if None), so rare classes show up in
+    every sample that contains them. Labels without a weight (>=
+    num_classes, e.g. 255 = ignore) are then not drawn. From .lsc scans only the chunks
+    overlapping the block are read.
+    """
+
+    def __init__(self, root_dir, index, split='train', num_points=2048, point_weights=None):
+        super().__init__(root_dir, split=split, num_points=num_points)
+        self.index = index
+        self.files = [os.path.join(root_dir, f) for f in index["files"]]
+        self.point_weights = point_weights
+
+    def __len__(self):
+        return len(self.index["block"])
+
+    def __getitem__(self, idx):
+        f, bx, by = self.index["block"][idx]
+        points, labels = self._load_block(self.files[f], self.index["origin"][f], bx, by)
+
+        keys = np.floor((points[:, :2] - self.index["origin"][f]) / self.index["block_size"])
+        inside = np.flatnonzero((keys[:, 0] == bx) & (keys[:, 1] == by))
+
+        p = None
+        if self.point_weights is not None:
+            # labels outside [0, num_classes) (e.g. an ignore label 255) are never drawn,
+            # as evaluate.confusion_matrix ignores them
+            lbl = labels[inside].astype(np.int64)
+            valid = (lbl >= 0) & (lbl < len(self.point_weights))
+            p = np.zeros(len(inside))
+            p[valid] = self.point_weights[lbl[valid]]
+            p = p / p.sum() if p.sum() > 0 else None
+        replace = p is not None or len(inside) < self.num_points
+        idxs = np.random.choice(inside, self.num_points, replace=replace, p=p)
+
+        return points[idxs, :7].astype("float32"), labels[idxs].astype("int64")
+
+    def _load_block(self, path, origin, bx, by):
+        with open_scan(path) as data:
+            if not isinstance(data, ScanFile):
+                return data["points"], data["labels"]
+            size = float(self.index["block_size"])
+            lo = origin + np.array([bx, by]) * size
+            cols = data.read(region=(lo[0], lo[1], lo[0] + size, lo[1] + size))
+            return np.stack([cols[c] for c in data.features], axis=1), cols["labels"]
@@ -0,0 +1,427 @@
+"""
+Offline evaluation of the RL navigation policy (rl_nav.DQN) over many maps.
+
+Episodes come from two sources:
+
+    random   maps as MapEnv.reset_random() draws them (grid_size * 3
+             random obstacles, start (0, 0), goal in the far corner)
+    scenes   occupancy grids of the backend's scene*.npz, built as
+             /build_map + /rl_reset_from_map do (unknown = obstacle), in
+             their 8 rotations / flips, with random start and goal cells
+             that are connected
+
+Each episode is a greedy rollout (epsilon 0 unless --epsilon) with the
+semantics of MapEnv.step(): hitting an obstacle ends it, reaching the
+goal succeeds, grid_size^2 steps time it out. Episodes are spread over
+worker processes, and each worker steps a batch of environments at once
+with one Q-network forward pass per step instead of one per episode.
+With a greedy policy the observation only depends on the agent's
+cell, so revisiting a cell means the episode loops until the time-out;
+such episodes are stopped right away and reported as "loop".
+
+Reported: success rate (over solvable episodes), collisions, loops,
+time-outs, path length of successful episodes against the BFS optimum,
+and episodes / policy steps per second.
+
+    cd backend
+    python eval_rl.py --random 4000 --scene_episodes 500 --workers 4
+    python eval_rl.py --weights q_net.pth --batch 1 --workers 1   # one episode at a time
+    python eval_rl.py --check 50    # compare with SimpleRLAgent.rollout() on the first 50
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from scipy.ndimage import label as connected_regions
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from config import GRID_SIZE, NUM_CLASSES, ROBOT_HEIGHT, STEP_HEIGHT
+from mapping import build_layers
+
+OUTCOMES = ("success", "collision", "loop", "timeout")
+SUCCESS, COLLISION, LOOP, TIMEOUT = range(4)
+MOVES = np.array([[0, -1], [0, 1], [-1, 0], [1, 0]])   # MapEnv actions: up, down, left, right as (dx, dy)
+
+
+# -----------------------------------------------------------
+# Episodes: obstacle grids (N, G, G) int8, starts / goals (N, 2) as (x, y)
+# -----------------------------------------------------------
+
+def random_episodes(n, grid_size, rng):
+    """
+    n maps drawn like MapEnv.reset_random().
+    """
+    grids = np.zeros((n, grid_size, grid_size), dtype=np.int8)
+    k = grid_size * 3
+    xs = rng.integers(0, grid_size, (n, k))
+    ys = rng.integers(0, grid_size, (n, k))
+    grids[np.repeat(np.arange(n), k), ys.ravel(), xs.ravel()] = 1
+    starts = np.zeros((n, 2), dtype=np.int64)
+    goals = np.full((n, 2), grid_size - 1, dtype=np.int64)
+    grids[:, 0, 0] = 0
+    grids[:, -1, -1] = 0
+    return grids, starts, goals
+
+
+def scene_grid(path, grid_size):
+    """
+    The RL grid of a scene: occupied or unknown cells are obstacles.
+    """
+    with np.load(path) as data:
+        points = data["points"][:, :3]
+        labels = data["labels"] if "labels" in data else None
+    layers = build_layers(points, labels=labels, grid_size=grid_size, resolution=0.2, z_thresh=(0.1, 2.5),
+                          num_classes=NUM_CLASSES, robot_height=ROBOT_HEIGHT, step_height=STEP_HEIGHT)
+    return ((layers["occupancy"] == 1) | (layers["state"] < 0)).astype(np.int8)
+
+
+def scene_episodes(paths, n_per_map, grid_size, rng, min_distance=5):
+    """
+    n_per_map episodes on each of the 8 rotations / flips of each scene,
+    start and goal drawn from the same free region, at least
+    min_distance cells apart (Manhattan).
+    """
+    grids, starts, goals = [], [], []
+    for path in paths:
+        base = scene_grid(path, grid_size)
+        for k in range(8):
+            grid = np.rot90(base, k % 4)
+            grid = np.ascontiguousarray(grid.T if k >= 4 else grid)
+            regions, _ = connected_regions(grid == 0)
+            sizes = np.bincount(regions.ravel())
+            sizes[0] = 0
+            if sizes.max() < 2:
+                continue
+            # start cells are uniform, so large rooms get most episodes
+            ys, xs = np.nonzero(regions > 0)
+            cell_region = regions[ys, xs]
+            for _ in range(n_per_map):
+                for _ in range(100):
+                    i = rng.integers(len(xs))
+                    same = np.flatnonzero(cell_region == cell_region[i])
+                    j = same[rng.integers(len(same))]
+                    if abs(xs[i] - xs[j]) + abs(ys[i] - ys[j]) >= min_distance:
+                        break
+                grids.append(grid)
+                starts.append([xs[i], ys[i]])
+                goals.append([xs[j], ys[j]])
+    if not grids:
+        return (np.zeros((0, grid_size, grid_size), dtype=np.int8),
+                np.zeros((0, 2), dtype=np.int64), np.zeros((0, 2), dtype=np.int64))
+    return np.stack(grids), np.array(starts, dtype=np.int64), np.array(goals, dtype=np.int64)
+
+
+def optimal_lengths(grids, starts, goals):
+    """
+    BFS steps from start to goal over free cells (4-connected), -1 if the
+    goal is unreachable.
+    """
+    n, H, W = grids.shape
+    out = np.full(n, -1, dtype=np.int64)
+    idx = np.arange(H * W).reshape(H, W)
+    for e in range(n):
+        free = grids[e] == 0
+        right = idx[:, :-1][free[:, :-1] & free[:, 1:]]
+        down = idx[:-1, :][free[:-1, :] & free[1:, :]]
+        rows, cols = np.concatenate([right, down]), np.concatenate([right + 1, down + W])
+        graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(H * W, H * W)).tocsr()
+        s = starts[e, 1] * W + starts[e, 0]
+        g = goals[e, 1] * W + goals[e, 0]
+        d = dijkstra(graph, directed=False, unweighted=True, indices=s)[g]
+        if np.isfinite(d):
+            out[e] = int(d)
+    return out
+
+
+# -----------------------------------------------------------
+# Batched rollouts (run in the worker processes)
+# -----------------------------------------------------------
+
+_Q_NET = None
+
+
+def build_q_net(grid_size, weights=None, seed=0):
+    """
+    DQN with the weights of a state_dict file (or {"q_net": state_dict}),
+    else a seeded random initialisation.
+    """
+    import torch
+    from rl_nav import DQN
+
+    torch.manual_seed(seed)
+    q_net = DQN(grid_size, 4)
+    if weights:
+        state = torch.load(weights, map_location="cpu")
+        q_net.load_state_dict(state.get("q_net", state))
+    return q_net.eval()
+
+
+def init_worker(state_dict, grid_size, threads):
+    global _Q_NET
+    import torch
+    from rl_nav import DQN
+
+    torch.set_num_threads(threads)
+    torch.set_grad_enabled(False)
+    _Q_NET = DQN(grid_size, 4)
+    _Q_NET.load_state_dict(state_dict)
+    _Q_NET.eval()
+
+
+def rollout_batch(grids, starts, goals, max_steps, epsilon=0.0, seed=0, batch=256):
+    """
+    -> (outcome (N,) int8, steps (N,) int64) of N episodes, stepped
+    `batch` at a time through _Q_NET.
+    """
+    n = len(grids)
+    outcome = np.full(n, -1, dtype=np.int8)
+    steps = np.zeros(n, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    for lo in range(0, n, batch):
+        hi = min(lo + batch, n)
+        o, s = _rollout(grids[lo:hi], starts[lo:hi], goals[lo:hi], max_steps, epsilon, rng)
+        outcome[lo:hi] = o
+        steps[lo:hi] = s
+    return outcome, steps
+
+
+def _rollout(grids, starts, goals, max_steps, epsilon, rng):
+    import torch
+
+    B, H, W = grids.shape
+    ar = np.arange(B)
+    # Observations exactly as MapEnv builds them: 0 free, 1 obstacle, 2 goal, 3 agent.
+    # The torch tensor shares the numpy buffer, so cell updates need no copy.
+    obs = grids.astype(np.float32)
+    obs[ar, goals[:, 1], goals[:, 0]] = 2
+    obs[ar, starts[:, 1], starts[:, 0]] = 3
+    obs_t = torch.from_numpy(obs)
+    pos = starts.copy()
+    visited = np.zeros((B, H * W), dtype=bool)
+    visited[ar, pos[:, 1] * W + pos[:, 0]] = True
+    outcome = np.full(B, -1, dtype=np.int8)
+    steps = np.zeros(B, dtype=np.int64)
+
+    active = ar
+    while len(active):
+        q = _Q_NET(obs_t if len(active) == B else obs_t[torch.from_numpy(active)])
+        action = q.argmax(dim=1).numpy()
+        if epsilon > 0:
+            explore = rng.random(len(active)) < epsilon
+            action[explore] = rng.integers(0, 4, int(explore.sum()))
+
+        x, y = pos[active, 0], pos[active, 1]
+        nx = np.clip(x + MOVES[action, 0], 0, W - 1)
+        ny = np.clip(y + MOVES[action, 1], 0, H - 1)
+        obs[active, y, x] = 0
+        cell = obs[active, ny, nx]
+        obs[active, ny, nx] = 3
+        pos[active, 0], pos[active, 1] = nx, ny
+        steps[active] += 1
+
+        flat = ny * W + nx
+        result = np.full(len(active), -1, dtype=np.int8)
+        result[steps[active] >= max_steps] = TIMEOUT
+        if epsilon == 0:
+            result[visited[active, flat]] = LOOP
+        result[cell == 1] = COLLISION
+        result[cell == 2] = SUCCESS
+        visited[active, flat] = True
+
+        done = result >= 0
+        outcome[active[done]] = result[done]
+        active = active[~done]
+    return outcome, steps
+
+
+def run_chunk(grids, starts, goals, max_steps, epsilon, seed, batch):
+    # wall-clock stamps, comparable across the worker processes
+    t0 = time.time()
+    outcome, steps = rollout_batch(grids, starts, goals, max_steps, epsilon, seed, batch)
+    return outcome, steps, t0, time.time()
+
+
+# -----------------------------------------------------------
+
+def evaluate(episodes, q_net, workers=1, batch=256, epsilon=0.0, seed=0):
+    """
+    episodes: {source: (grids, starts, goals)}. Returns the report dict.
+    """
+    names = list(episodes)
+    grids = np.concatenate([episodes[k][0] for k in names])
+    grid_size = grids.shape[1]
+    starts = np.concatenate([episodes[k][1] for k in names])
+    goals = np.concatenate([episodes[k][2] for k in names])
+    source = np.concatenate([np.full(len(episodes[k][0]), i) for i, k in enumerate(names)])
+    max_steps = grid_size * grid_size
+
+    t0 = time.perf_counter()
+    optimal = optimal_lengths(grids, starts, goals)
+    t_optimal = time.perf_counter() - t0
+
+    n = len(grids)
+    state_dict = {k: v.detach().cpu() for k, v in q_net.state_dict().items()}
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # a few chunks per worker so a slow chunk does not hold up the rest
+    bounds = np.linspace(0, n, max(workers * 4, 1) + 1).astype(int) if workers > 1 else np.array([0, n])
+    chunks = [(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+    outcome = np.full(n, -1, dtype=np.int8)
+    steps = np.zeros(n, dtype=np.int64)
+
+    t0 = time.time()
+    if workers <= 1:
+        init_worker(state_dict, grid_size, threads)
+        results = [run_chunk(grids[lo:hi], starts[lo:hi], goals[lo:hi], max_steps, epsilon, seed + lo, batch)
+                   for lo, hi in chunks]
+    else:
+        # spawn: torch's thread pools do not survive fork()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                 initializer=init_worker, initargs=(state_dict, grid_size, threads)) as pool:
+            futures = [pool.submit(run_chunk, grids[lo:hi], starts[lo:hi], goals[lo:hi], max_steps, epsilon,
+                                   seed + lo, batch) for lo, hi in chunks]
+            results = [f.result() for f in futures]
+    wall = time.time() - t0
+    # rollouts only: worker start-up (spawn + torch import) is in wall
+    elapsed = max(r[3] for r in results) - min(r[2] for r in results)
+    for (lo, hi), (o, s, _, _) in zip(chunks, results):
+        outcome[lo:hi] = o
+        steps[lo:hi] = s
+
+    report = {
+        "episodes": n,
+        "workers": workers,
+        "batch": batch,
+        "epsilon": epsilon,
+        "seconds": round(elapsed, 3),
+        "wall_seconds": round(wall, 3),
+        "episodes_per_sec": round(n / elapsed, 1) if elapsed > 0 else None,
+        "policy_steps_per_sec": round(int(steps.sum()) / elapsed, 1) if elapsed > 0 else None,
+        "optimal_seconds": round(t_optimal, 3),
+        "overall": summarize(outcome, steps, optimal),
+        "by_source": {k: summarize(outcome[source == i], steps[source == i], optimal[source == i])
+                      for i, k in enumerate(names)},
+    }
+    return report, outcome, steps, optimal
+
+
+def summarize(outcome, steps, optimal):
+    solvable = optimal > 0
+    ok = (outcome == SUCCESS) & solvable
+    ratio = steps[ok] / optimal[ok]
+    out = {
+        "episodes": int(len(outcome)),
+        "solvable": int(solvable.sum()),
+        "success_rate": round(float(ok.sum() / solvable.sum()), 4) if solvable.any() else None,
+    }
+    for code, name in enumerate(OUTCOMES[1:], start=1):
+        out[f"{name}_rate"] = round(float((outcome == code).mean()), 4) if len(outcome) else None
+    out["mean_steps"] = round(float(steps.mean()), 2) if len(steps) else None
+    out["path_ratio_mean"] = round(float(ratio.mean()), 3) if len(ratio) else None
+    out["path_ratio_median"] = round(float(np.median(ratio)), 3) if len(ratio) else None
+    out["optimal_paths"] = round(float((ratio == 1).mean()), 4) if len(ratio) else None
+    return out
+
+
+def check_against_env(q_net, grids, starts, goals, outcome, steps, k):
+    """
+    Replays the first k episodes one by one with SimpleRLAgent.rollout()
+    on MapEnv and counts disagreements with the batched outcome / steps.
+    A "loop" must end as a time-out there.
+    """
+    from rl_nav import SimpleRLAgent
+
+    agent = SimpleRLAgent(device="cpu", q_net=q_net)
+    mismatches = 0
+    t0 = time.perf_counter()
+    for e in range(min(k, len(grids))):
+        agent.reset_from_occ(grids[e], start=starts[e], goal=goals[e])
+        traj = agent.rollout(epsilon=0.0)
+        last = traj["rewards"][-1]
+        ref = SUCCESS if last == 1.0 else COLLISION if last == -1.0 else TIMEOUT
+        same = ref == outcome[e] if outcome[e] != LOOP else ref == TIMEOUT
+        if outcome[e] != LOOP:
+            same = same and len(traj["actions"]) == steps[e]
+        mismatches += not same
+    elapsed = time.perf_counter() - t0
+    return mismatches, elapsed
+
+
+def print_report(res):
+    print(f"\n{res['episodes']} episodes in {res['seconds']:.2f}s: {res['episodes_per_sec']:,.1f} episodes/s, "
+          f"{res['policy_steps_per_sec']:,.0f} policy steps/s ({res['workers']} workers, batch {res['batch']}; "
+          f"{res['wall_seconds']:.2f}s with worker start-up)")
+    print(f"{'source':>8} | {'episodes':>8} | {'solvable':>8} | {'success':>7} | {'collide':>7} | {'loop':>6} | "
+          f"{'timeout':>7} | {'steps':>6} | {'len/opt':>7} | {'optimal':>7}")
+    rows = dict(res["by_source"], all=res["overall"])
+
+    def pct(v):
+        return "-" if v is None else f"{100 * v:.1f}%"
+
+    for name, s in rows.items():
+        ratio = "-" if s["path_ratio_mean"] is None else f"{s['path_ratio_mean']:.2f}"
+        print(f"{name:>8} | {s['episodes']:>8} | {s['solvable']:>8} | {pct(s['success_rate']):>7} | "
+              f"{pct(s['collision_rate']):>7} | {pct(s['loop_rate']):>6} | {pct(s['timeout_rate']):>7} | "
+              f"{s['mean_steps'] or 0:>6.1f} | {ratio:>7} | {pct(s['optimal_paths']):>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default=None, help="DQN state_dict (.pth); default: random init from --seed")
+    parser.add_argument("--random", type=int, default=2000, help="episodes on reset_random()-style maps")
+    parser.add_argument("--scenes", default=str(Path(__file__).parent / "scene*.npz"), help="glob of scene scans")
+    parser.add_argument("--scene_episodes", type=int, default=50, help="episodes per scene and rotation / flip")
+    parser.add_argument("--grid", type=int, default=GRID_SIZE)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch", type=int, default=256, help="environments per Q-network forward pass")
+    parser.add_argument("--epsilon", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", type=int, default=0, help="replay the first N episodes with SimpleRLAgent")
+    parser.add_argument("--out", default=None, help="write the report as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    t0 = time.perf_counter()
+    episodes = {}
+    if args.random:
+        episodes["random"] = random_episodes(args.random, args.grid, rng)
+    scenes = sorted(glob.glob(args.scenes))
+    if scenes and args.scene_episodes:
+        episodes["scenes"] = scene_episodes(scenes, args.scene_episodes, args.grid, rng)
+    episodes = {k: v for k, v in episodes.items() if len(v[0])}
+    if not episodes:
+        raise SystemExit("No episodes: pass --random N and / or --scenes matching scene*.npz files.")
+    print(f"[INFO] {sum(len(v[0]) for v in episodes.values())} episodes "
+          f"({', '.join(f'{k}: {len(v[0])}' for k, v in episodes.items())}) built in {time.perf_counter() - t0:.2f}s")
+
+    q_net = build_q_net(args.grid, args.weights, args.seed)
+    res, outcome, steps, _ = evaluate(episodes, q_net, args.workers, args.batch, args.epsilon, args.seed)
+    print_report(res)
+
+    if args.check:
+        if args.epsilon > 0:
+            print("[WARN] --check needs --epsilon 0; skipped.")
+        else:
+            grids = np.concatenate([v[0] for v in episodes.values()])
+            starts = np.concatenate([v[1] for v in episodes.values()])
+            goals = np.concatenate([v[2] for v in episodes.values()])
+            k = min(args.check, len(grids))
+            mismatches, seconds = check_against_env(q_net, grids, starts, goals, outcome, steps, k)
+            res["check"] = {"episodes": k, "mismatches": mismatches, "episodes_per_sec": round(k / seconds, 1)}
+            print(f"\nSimpleRLAgent.rollout() on the first {k} episodes: {mismatches} mismatches, "
+                  f"{k / seconds:.1f} episodes/s one at a time")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(res, indent=2))
+        print("Saved", args.out)
+
+
+if __name__ == "__main__":
+    main()
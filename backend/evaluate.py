@@ -0,0 +1,186 @@
+"""
+Full-resolution evaluation of a segmentation checkpoint.
+
+Every point of every scan in the split is labelled (chunked inference,
+as in /segment_stream) and accumulated into a confusion matrix, from
+which per-class IoU, mIoU and overall accuracy are reported. Scans are
+spread over worker processes; each loads the model once.
+
+    cd backend
+    python evaluate.py                                    # test split, default model
+    python evaluate.py --split val --model my_ckpt --workers 4 --out eval.json
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+from config import CHECKPOINT_DIR, DATA_PROCESSED, NUM_CLASSES, SEG_MODEL_NAME
+from scan_format import open_scan, scan_files
+
+CHUNK = 50000
+
+
+def confusion_matrix(pred, target, num_classes):
+    """
+    (num_classes, num_classes) counts, rows = ground truth. Labels outside
+    [0, num_classes) are ignored.
+    """
+    target = np.asarray(target, dtype=np.int64)
+    pred = np.asarray(pred, dtype=np.int64)
+    valid = (target >= 0) & (target < num_classes)
+    idx = target[valid] * num_classes + pred[valid]
+    return np.bincount(idx, minlength=num_classes * num_classes).reshape(num_classes, num_classes)
+
+
+def per_class_iou(conf):
+    """
+    IoU per class; NaN for classes absent from both prediction and ground truth.
+    """
+    tp = np.diag(conf).astype(np.float64)
+    denom = conf.sum(0) + conf.sum(1) - tp
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denom > 0, tp / denom, np.nan)
+
+
+def summarize(conf):
+    iou = per_class_iou(conf)
+    total = conf.sum()
+    return {
+        "miou": float(np.nanmean(iou)) if not np.all(np.isnan(iou)) else None,
+        "overall_acc": float(np.trace(conf) / total) if total else None,
+        "per_class_iou": [None if np.isnan(v) else float(v) for v in iou],
+        "support": conf.sum(1).tolist(),
+    }
+
+
+# -----------------------------------------------------------
+# Inference (runs in the worker processes)
+# -----------------------------------------------------------
+
+_MODEL = None
+
+
+def load_model(name):
+    from model_registry import CheckpointModel
+    return CheckpointModel(CHECKPOINT_DIR / f"{name}.pth").get()
+
+
+def init_worker(model_name, threads):
+    global _MODEL
+    import torch
+
+    torch.set_num_threads(threads)
+    torch.set_grad_enabled(False)
+    _MODEL = load_model(model_name)
+
+
+def evaluate_scan(path, chunk=CHUNK, tnet_points=0):
+    """
+    -> (path, confusion matrix, num_points, seconds) for one scan.
+    """
+    import torch
+    from model_loader import get_device
+
+    t0 = time.perf_counter()
+    model = _MODEL
+    with open_scan(path) as data:
+        points = np.ascontiguousarray(data["points"][:, :model.input_dim], dtype=np.float32)
+        labels = data["labels"]
+
+    device = get_device()
+    x = torch.from_numpy(points).unsqueeze(0)
+    trans = model.input_transform(x, tnet_points) if tnet_points else None
+    conf = np.zeros((NUM_CLASSES, NUM_CLASSES), dtype=np.int64)
+    for i in range(0, points.shape[0], chunk):
+        pred = model(x[:, i:i + chunk].to(device), trans=trans).argmax(dim=1)[0].cpu().numpy()
+        conf += confusion_matrix(pred, labels[i:i + chunk], NUM_CLASSES)
+    return str(path), conf, int(points.shape[0]), time.perf_counter() - t0
+
+
+# -----------------------------------------------------------
+
+def evaluate(files, model_name, workers=1, chunk=CHUNK, tnet_points=0, verbose=True):
+    # Largest scans first so the last worker is not left with a big one
+    files = sorted(files, key=lambda p: -os.path.getsize(p))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    conf = np.zeros((NUM_CLASSES, NUM_CLASSES), dtype=np.int64)
+    scans = []
+    t0 = time.perf_counter()
+
+    def collect(result):
+        path, c, n, seconds = result
+        conf[...] += c
+        scans.append({"scan": path, "num_points": n, "seconds": round(seconds, 3)})
+        if verbose:
+            print(f"  [{len(scans)}/{len(files)}] {Path(path).name}: {n:,} pts in {seconds:.2f}s", flush=True)
+
+    if workers <= 1:
+        init_worker(model_name, threads)
+        for path in files:
+            collect(evaluate_scan(path, chunk, tnet_points))
+    else:
+        # spawn: torch's thread pools do not survive fork()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                 initializer=init_worker, initargs=(model_name, threads)) as pool:
+            futures = [pool.submit(evaluate_scan, path, chunk, tnet_points) for path in files]
+            for fut in as_completed(futures):
+                collect(fut.result())
+
+    elapsed = time.perf_counter() - t0
+    points = sum(s["num_points"] for s in scans)
+    return {
+        "model": model_name,
+        "scans": len(scans),
+        "points": points,
+        "seconds": round(elapsed, 3),
+        "points_per_sec": round(points / elapsed, 1) if elapsed > 0 else None,
+        "workers": workers,
+        **summarize(conf),
+        "confusion": conf.tolist(),
+        "per_scan": sorted(scans, key=lambda s: s["scan"]),
+    }
+
+
+def print_report(res):
+    print(f"\nModel {res['model']}: {res['scans']} scans, {res['points']:,} points "
+          f"in {res['seconds']:.2f}s ({res['points_per_sec']:,.0f} pts/s, {res['workers']} workers)")
+    print(f"{'class':>5} | {'IoU':>7} | {'points':>12}")
+    for c, (iou, n) in enumerate(zip(res["per_class_iou"], res["support"])):
+        print(f"{c:>5} | {'-' if iou is None else f'{iou:.4f}':>7} | {n:>12,}")
+    miou = res["miou"]
+    print(f"mIoU {'-' if miou is None else f'{miou:.4f}'}   overall acc {res['overall_acc'] or 0:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--split", default="test")
+    parser.add_argument("--data_dir", default=str(DATA_PROCESSED))
+    parser.add_argument("--files", nargs="*", default=None, help="explicit .npz / .lsc scans instead of a split")
+    parser.add_argument("--model", default=SEG_MODEL_NAME, help="checkpoint name in CHECKPOINT_DIR")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="points per forward pass")
+    parser.add_argument("--tnet_points", type=int, default=0, help="per-scene T-Net from N points (0 = off)")
+    parser.add_argument("--out", default=None, help="write the full result as JSON")
+    args = parser.parse_args()
+
+    files = args.files or scan_files(args.data_dir, args.split)
+    if not files:
+        raise SystemExit(f"No {args.split}_*.npz / .lsc scans in {args.data_dir}. Did you run preprocess_3dses.py ?")
+
+    res = evaluate(files, args.model, args.workers, args.chunk, args.tnet_points)
+    print_report(res)
+    if args.out:
+        Path(args.out).write_text(json.dumps(res, indent=2))
+        print("Saved", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Frontier-based exploration on the three-state map of mapping.py
+(-1 unknown, 0 free, 1 occupied).
+
+A frontier cell is a free cell with an unknown 4-neighbour. FrontierMap
+keeps the frontier set between map updates: after one vectorized
+comparison with the previous map, only the changed cells and their
+4-neighbours (the only cells whose frontier status can change) are
+re-examined, so an update costs O(changes), not O(H*W) Python work.
+
+    frontiers = FrontierMap()
+    frontiers.update(layers["state"])          # after every map change
+    ranked = frontiers.rank((x, y))            # best cluster first
+    path = frontiers.path((x, y), ranked[0]["goal"])
+
+Frontier cells are grouped into 8-connected clusters (recomputed only
+when the frontier set changed). Clusters are ranked by the BFS distance
+from the robot over free cells (4-connected) to their closest cell,
+minus size_weight * cluster size; that closest cell is the cluster's
+goal. Distance fields are cached per (map version, robot cell), so the
+RL and planning endpoints can query the same map repeatedly for free.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra
+
+from mapping import FREE, UNKNOWN
+
+_N4 = ((0, 1), (0, -1), (1, 0), (-1, 0))          # (dy, dx)
+_N8_FORWARD = ((0, 1), (1, -1), (1, 0), (1, 1))   # each 8-neighbour pair once
+
+
+def frontier_mask(state):
+    """
+    (H, W) bool: free cells with an unknown 4-neighbour (full scan).
+    """
+    unknown = np.pad(state == UNKNOWN, 1, constant_values=False)
+    near = unknown[:-2, 1:-1] | unknown[2:, 1:-1] | unknown[1:-1, :-2] | unknown[1:-1, 2:]
+    return (state == FREE) & near
+
+
+def nearest_free(state, cell):
+    """
+    Free cell (x, y) closest (Euclidean) to cell = (x, y), None if the
+    map has no free cell.
+    """
+    ys, xs = np.nonzero(state == FREE)
+    if len(xs) == 0:
+        return None
+    i = int(np.argmin((xs - cell[0]) ** 2 + (ys - cell[1]) ** 2))
+    return [int(xs[i]), int(ys[i])]
+
+
+class FrontierMap:
+    def __init__(self, min_size=3, size_weight=0.0, cache_size=8):
+        self.min_size = min_size          # smaller clusters are ignored (sensor noise)
+        self.size_weight = size_weight    # cells of cluster size worth one cell of distance
+        self.cache_size = cache_size      # distance fields kept
+        self.state = None
+        self.frontier = None              # (H, W) bool
+        self.cells = set()                # flat indices of frontier cells
+        self.version = 0                  # bumped by every map change
+        self._clusters = None
+        self._graph = None                # (version, free cells, their adjacency)
+        self._fields = OrderedDict()      # (version, start) -> (free, dist, pred)
+
+    def update(self, state, changed=None):
+        """
+        Brings the frontier set up to date with `state`. `changed`:
+        optional flat indices of the cells that changed, if the caller
+        knows them. Returns the number of cells re-examined.
+        """
+        state = np.asarray(state, dtype=np.int8)
+        if self.state is None or self.state.shape != state.shape:
+            self.state = state.copy()
+            self.frontier = frontier_mask(state)
+            self.cells = set(np.flatnonzero(self.frontier).tolist())
+            self._changed()
+            return state.size
+
+        if changed is None:
+            changed = np.flatnonzero(state.ravel() != self.state.ravel())
+        changed = np.asarray(changed, dtype=np.int64)
+        if len(changed) == 0:
+            return 0
+        self.state.ravel()[changed] = state.ravel()[changed]
+
+        H, W = state.shape
+        cy, cx = np.divmod(changed, W)
+        ys = (cy[:, None] + np.array([0, 0, 0, 1, -1])).ravel()
+        xs = (cx[:, None] + np.array([0, 1, -1, 0, 0])).ravel()
+        ok = (ys >= 0) & (ys < H) & (xs >= 0) & (xs < W)
+        idx = np.unique(ys[ok] * W + xs[ok])
+
+        new = self._frontier_at(idx)
+        flat = self.frontier.ravel()
+        old = flat[idx]
+        flat[idx] = new
+        self.cells.update(idx[new & ~old].tolist())
+        self.cells.difference_update(idx[old & ~new].tolist())
+        self._changed()
+        return len(idx)
+
+    def _changed(self):
+        self.version += 1
+        self._clusters = None
+        self._graph = None
+
+    def _frontier_at(self, idx):
+        H, W = self.state.shape
+        y, x = np.divmod(idx, W)
+        near = np.zeros(len(idx), dtype=bool)
+        for dy, dx in _N4:
+            ny, nx = y + dy, x + dx
+            ok = (ny >= 0) & (ny < H) & (nx >= 0) & (nx < W)
+            near[ok] |= self.state[ny[ok], nx[ok]] == UNKNOWN
+        return (self.state[y, x] == FREE) & near
+
+    def clusters(self):
+        """
+        8-connected frontier clusters as arrays of flat cell indices,
+        largest first.
+        """
+        if self._clusters is None:
+            self._clusters = self._cluster()
+        return self._clusters
+
+    def _cluster(self):
+        cells = np.sort(np.fromiter(self.cells, dtype=np.int64, count=len(self.cells)))
+        if len(cells) == 0:
+            return []
+        W = self.state.shape[1]
+        x = cells % W
+        rows, cols = [], []
+        for dy, dx in _N8_FORWARD:
+            ok = (x + dx >= 0) & (x + dx < W)
+            src = np.flatnonzero(ok)
+            nb = cells[src] + dy * W + dx
+            j = np.minimum(np.searchsorted(cells, nb), len(cells) - 1)
+            hit = cells[j] == nb
+            rows.append(src[hit])
+            cols.append(j[hit])
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        adj = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(len(cells),) * 2)
+        n, labels = connected_components(adj, directed=False)
+        order = np.argsort(labels, kind="stable")
+        groups = np.split(cells[order], np.flatnonzero(np.diff(labels[order])) + 1)
+        return sorted(groups, key=len, reverse=True)
+
+    def _free_graph(self):
+        """
+        -> (sorted flat indices of the free cells, their 4-connected
+        adjacency). Nodes are free cells only, so the search costs
+        O(known space), not O(H*W), on a mostly unexplored map.
+        """
+        if self._graph is None or self._graph[0] != self.version:
+            W = self.state.shape[1]
+            free = np.flatnonzero(self.state.ravel() == FREE)
+            rows, cols = [], []
+            for step, ok in ((1, free % W < W - 1), (W, np.ones(len(free), dtype=bool))):
+                src = np.flatnonzero(ok)
+                nb = free[src] + step
+                j = np.minimum(np.searchsorted(free, nb), max(len(free) - 1, 0))
+                hit = free[j] == nb
+                rows.append(src[hit])
+                cols.append(j[hit])
+            rows, cols = np.concatenate(rows), np.concatenate(cols)
+            graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(len(free),) * 2).tocsr()
+            self._graph = (self.version, free, graph)
+        return self._graph[1], self._graph[2]
+
+    def distance_field(self, start):
+        """
+        -> (free, dist, pred): BFS from start = (x, y) over free cells.
+        free: sorted flat indices of the free cells; dist[i] (cells, inf =
+        unreachable) and pred[i] (node index, < 0 = none) belong to free[i].
+        The start cell itself may be unknown or occupied (the robot stands
+        there); its free neighbours are then at distance 1.
+        """
+        H, W = self.state.shape
+        x, y = int(start[0]), int(start[1])
+        if not (0 <= x < W and 0 <= y < H):
+            raise ValueError(f"start {start} outside the {W}x{H} map")
+        key = (self.version, (x, y))
+        hit = self._fields.get(key)
+        if hit is not None:
+            self._fields.move_to_end(key)
+            return hit
+
+        free, graph = self._free_graph()
+        cells = [y * W + x] if self.state[y, x] == FREE else [
+            (y + dy) * W + x + dx for dy, dx in _N4
+            if 0 <= y + dy < H and 0 <= x + dx < W and self.state[y + dy, x + dx] == FREE]
+        if cells:
+            sources = np.searchsorted(free, cells)
+            dist, pred, _ = dijkstra(graph, directed=False, unweighted=True,
+                                     indices=sources, return_predecessors=True, min_only=True)
+            if self.state[y, x] != FREE:
+                dist += 1
+        else:
+            dist, pred = np.full(len(free), np.inf), np.full(len(free), -9999, dtype=np.int32)
+        field = (free, dist, pred)
+        self._fields[key] = field
+        while len(self._fields) > self.cache_size:
+            self._fields.popitem(last=False)
+        return field
+
+    def rank(self, start):
+        """
+        Reachable clusters of at least min_size cells, best first:
+        [{"size", "centroid": [x, y], "goal": [x, y], "distance", "cost"}].
+        """
+        if self.state is None:
+            return []
+        W = self.state.shape[1]
+        free, dist, _ = self.distance_field(start)
+        out = []
+        for cells in self.clusters():
+            if len(cells) < self.min_size:
+                break   # sorted by size
+            d = dist[np.searchsorted(free, cells)]   # frontier cells are free
+            best = int(np.argmin(d))
+            if not np.isfinite(d[best]):
+                continue
+            goal = int(cells[best])
+            out.append({
+                "size": int(len(cells)),
+                "centroid": [round(float((cells % W).mean()), 2), round(float((cells // W).mean()), 2)],
+                "goal": [goal % W, goal // W],
+                "distance": int(d[best]),
+                "cost": float(d[best] - self.size_weight * len(cells)),
+            })
+        out.sort(key=lambda c: (c["cost"], -c["size"]))
+        return out
+
+    def next_goal(self, start):
+        """
+        The best cluster's goal cell (x, y), or None when there is
+        nothing left to explore from start.
+        """
+        ranked = self.rank(start)
+        return ranked[0]["goal"] if ranked else None
+
+    def path(self, start, goal):
+        """
+        Shortest 4-connected path [[x, y], ...] from start to goal over
+        free cells (from the cached distance field), [] if unreachable.
+        """
+        W = self.state.shape[1]
+        free, dist, pred = self.distance_field(start)
+        g = int(goal[1]) * W + int(goal[0])
+        node = int(np.searchsorted(free, g))
+        if node >= len(free) or free[node] != g or not np.isfinite(dist[node]):
+            return []
+        out = []
+        while node >= 0:
+            out.append([int(free[node] % W), int(free[node] // W)])
+            node = int(pred[node])
+        if out[-1] != [int(start[0]), int(start[1])]:
+            out.append([int(start[0]), int(start[1])])   # the robot's own, non-free cell
+        return out[::-1]
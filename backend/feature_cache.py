@@ -0,0 +1,115 @@
+"""
+LRU cache of per-scene PointNet features for interactive re-queries.
+
+A forward pass has a scene-level part, the T-Net transform and the
+max-pooled global feature (model.encode()), and a per-point part, the
+local features and the segmentation head. When a scene is segmented
+again (another subsample size, a crop, a subset of its points), the
+cached scene-level part is passed to model(..., trans=, global_feat=)
+and only the per-point layers run.
+
+Entries are keyed by (scene hash, model version). The scene hash is
+taken over the uploaded points, so re-uploading the same scan hits the
+cache; a crop is tied to its scene by passing the hash it got back from
+the first request. The model version changes whenever the checkpoint
+file is replaced, so a reloaded model never reuses stale features.
+
+    cache = FeatureCache(max_bytes=64 << 20)
+    feats = cache.get(key)           # (trans, global_feat) or None
+    cache.put(key, feats)
+
+Least recently used scenes are evicted once the cached tensors exceed
+max_bytes.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import FEATURE_CACHE_BYTES, FEATURE_CACHE_EVICTIONS, FEATURE_CACHE_LOOKUPS
+
+
+def scene_hash(points):
+    """
+    Content hash of a point array (shape, dtype and values).
+    """
+    points = np.ascontiguousarray(points)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{points.shape}{points.dtype}".encode())
+    h.update(memoryview(points).cast("B"))
+    return h.hexdigest()
+
+
+def tensor_bytes(tensors):
+    return sum(t.element_size() * t.nelement() for t in tensors)
+
+
+class FeatureCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()   # key -> (tensors, bytes), oldest first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        FEATURE_CACHE_LOOKUPS.inc(1, "miss" if entry is None else "hit")
+        return None if entry is None else entry[0]
+
+    def put(self, key, tensors):
+        """
+        Stores a tuple of tensors (detached). Entries larger than the
+        whole cache are not stored.
+        """
+        tensors = tuple(t.detach() for t in tensors)
+        size = tensor_bytes(tensors)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (tensors, size)
+            self.bytes += size
+            evicted = 0
+            while self.bytes > self.max_bytes:
+                _, (_, freed) = self._entries.popitem(last=False)
+                self.bytes -= freed
+                evicted += 1
+            self.evictions += evicted
+            FEATURE_CACHE_BYTES.set(self.bytes)
+        if evicted:
+            FEATURE_CACHE_EVICTIONS.inc(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            FEATURE_CACHE_BYTES.set(0)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+            }
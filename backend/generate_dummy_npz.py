@@ -1,5 +1,26 @@
+"""
+Synthetic indoor LiDAR scenes.
+
+    python generate_dummy_npz.py                      # the 5 bundled sceneN.npz
+    python generate_dummy_npz.py procedural --rooms 20 --points 100000000 --out big.npz
+    python generate_dummy_npz.py fixtures             # benchmark fixtures in data/bench/
+
+`procedural` builds a random multi-room floor plan (walls with doors and
+windows, floor, ceiling, furniture) as a list of rectangles and samples
+points on them uniformly by area, fully vectorized. Points are generated
+and written in chunks, so memory stays flat up to 10^8 points.
+"""
+
+import argparse
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
 import numpy as np
 
+from config import BENCH_DIR
+
 # ------------------------------------------------------------
 # Helper: Add dummy features + labels
 # ------------------------------------------------------------
@@ -17,6 +38,17 @@ def make_points(label, coords):
     return pts, labels
 
 
+# ------------------------------------------------------------
+# Walls around a square room [0, size]^2 at height z (class 1)
+# ------------------------------------------------------------
+def wall_ring(size, n, z=2.0):
+    t = np.linspace(0, size, n)
+    lo, hi, zz = np.zeros(n), np.full(n, float(size)), np.full(n, z)
+    along_x = np.stack([np.column_stack([t, lo, zz]), np.column_stack([t, hi, zz])], axis=1)
+    along_y = np.stack([np.column_stack([lo, t, zz]), np.column_stack([hi, t, zz])], axis=1)
+    return np.vstack([along_x.reshape(-1, 3), along_y.reshape(-1, 3)])
+
+
 # ------------------------------------------------------------
 # Add ceiling (class 4)
 # ------------------------------------------------------------
@@ -32,19 +64,12 @@ def add_ceiling(xmin, xmax, ymin, ymax, height=3.0, density=200):
 # ============================================================
 # SCENE 1
 # ============================================================
-def scene1():
+def scene1(out_dir="."):
     points = []
     labels = []
 
     # Walls (class 1)
-    w = []
-    for x in np.linspace(0, 10, 300):
-        w.append([x, 0, 2])
-        w.append([x, 10, 2])
-    for y in np.linspace(0, 10, 300):
-        w.append([0, y, 2])
-        w.append([10, y, 2])
-    p, l = make_points(1, np.array(w))
+    p, l = make_points(1, wall_ring(10, 300))
     points.append(p); labels.append(l)
 
     # Chair (class 2)
@@ -73,26 +98,19 @@ def scene1():
 
     P = np.vstack(points)
     L = np.hstack(labels)
-    np.savez("scene1.npz", points=P, labels=L)
+    np.savez(Path(out_dir) / "scene1.npz", points=P, labels=L)
     print("scene1.npz saved", P.shape)
 
 
 # ============================================================
 # SCENE 2
 # ============================================================
-def scene2():
+def scene2(out_dir="."):
     points = []
     labels = []
 
     # Walls
-    w = []
-    for x in np.linspace(0, 12, 300):
-        w.append([x, 0, 2])
-        w.append([x, 12, 2])
-    for y in np.linspace(0, 12, 300):
-        w.append([0, y, 2])
-        w.append([12, y, 2])
-    p, l = make_points(1, np.array(w))
+    p, l = make_points(1, wall_ring(12, 300))
     points.append(p); labels.append(l)
 
     # Door (class 3)
@@ -126,26 +144,19 @@ def scene2():
 
     P = np.vstack(points)
     L = np.hstack(labels)
-    np.savez("scene2.npz", points=P, labels=L)
+    np.savez(Path(out_dir) / "scene2.npz", points=P, labels=L)
     print("scene2.npz saved", P.shape)
 
 
 # ============================================================
 # SCENE 3
 # ============================================================
-def scene3():
+def scene3(out_dir="."):
     points = []
     labels = []
 
     # Walls
-    w = []
-    for x in np.linspace(0, 15, 400):
-        w.append([x, 0, 2])
-        w.append([x, 15, 2])
-    for y in np.linspace(0, 15, 400):
-        w.append([0, y, 2])
-        w.append([15, y, 2])
-    p, l = make_points(1, np.array(w))
+    p, l = make_points(1, wall_ring(15, 400))
     points.append(p); labels.append(l)
 
     # Sofa (class 7)
@@ -179,26 +190,19 @@ def scene3():
 
     P = np.vstack(points)
     L = np.hstack(labels)
-    np.savez("scene3.npz", points=P, labels=L)
+    np.savez(Path(out_dir) / "scene3.npz", points=P, labels=L)
     print("scene3.npz saved", P.shape)
 
 
 # ============================================================
 # SCENE 4
 # ============================================================
-def scene4():
+def scene4(out_dir="."):
     points = []
     labels = []
 
     # Walls
-    w = []
-    for x in np.linspace(0, 14, 300):
-        w.append([x, 0, 2])
-        w.append([x, 14, 2])
-    for y in np.linspace(0, 14, 300):
-        w.append([0, y, 2])
-        w.append([14, y, 2])
-    p, l = make_points(1, np.array(w))
+    p, l = make_points(1, wall_ring(14, 300))
     points.append(p); labels.append(l)
 
     # Bed (class 7)
@@ -227,26 +231,19 @@ def scene4():
 
     P = np.vstack(points)
     L = np.hstack(labels)
-    np.savez("scene4.npz", points=P, labels=L)
+    np.savez(Path(out_dir) / "scene4.npz", points=P, labels=L)
     print("scene4.npz saved", P.shape)
 
 
 # ============================================================
 # SCENE 5
 # ============================================================
-def scene5():
+def scene5(out_dir="."):
     points = []
     labels = []
 
     # Walls
-    w = []
-    for x in np.linspace(0, 10, 300):
-        w.append([x, 0, 2])
-        w.append([x, 10, 2])
-    for y in np.linspace(0, 10, 300):
-        w.append([0, y, 2])
-        w.append([10, y, 2])
-    p, l = make_points(1, np.array(w))
+    p, l = make_points(1, wall_ring(10, 300))
     points.append(p); labels.append(l)
 
     # Desk (table class 5)
@@ -280,18 +277,308 @@ def scene5():
 
     P = np.vstack(points)
     L = np.hstack(labels)
-    np.savez("scene5.npz", points=P, labels=L)
+    np.savez(Path(out_dir) / "scene5.npz", points=P, labels=L)
     print("scene5.npz saved", P.shape)
 
 
+
+
+PRESETS = [scene1, scene2, scene3, scene4, scene5]
+
+
+# ============================================================
+# PROCEDURAL GENERATOR
+# ============================================================
+# Classes: 0 floor, 1 wall, 2 chair, 3 door, 4 ceiling, 5 table, 6 window, 7 sofa
+
+CLASS_RGB = np.array([
+    [120, 110, 100],   # floor
+    [200, 200, 190],   # wall
+    [90, 60, 40],      # chair
+    [150, 100, 60],    # door
+    [230, 230, 230],   # ceiling
+    [160, 120, 80],    # table
+    [140, 180, 220],   # window
+    [80, 80, 140],     # sofa
+], dtype=np.float32)
+
+CLASS_INTENSITY = np.array([60, 120, 90, 100, 140, 95, 30, 70], dtype=np.float32)
+
+NOISE_MODELS = ("none", "gaussian", "range")
+
+
+class Rects:
+    """
+    Collects axis-aligned rectangles o + s*u + t*v, s,t in [0,1], with a label.
+    """
+
+    def __init__(self):
+        self.o, self.u, self.v, self.label = [], [], [], []
+
+    def add(self, o, u, v, label):
+        self.o.append(o); self.u.append(u); self.v.append(v); self.label.append(label)
+
+    def box(self, x0, y0, z0, dx, dy, dz, label):
+        # 4 sides + top (no bottom, it sits on the floor)
+        self.add((x0, y0, z0 + dz), (dx, 0, 0), (0, dy, 0), label)
+        self.add((x0, y0, z0), (dx, 0, 0), (0, 0, dz), label)
+        self.add((x0, y0 + dy, z0), (dx, 0, 0), (0, 0, dz), label)
+        self.add((x0, y0, z0), (0, dy, 0), (0, 0, dz), label)
+        self.add((x0 + dx, y0, z0), (0, dy, 0), (0, 0, dz), label)
+
+    def wall(self, p0, p1, height, opening=None):
+        """
+        Vertical wall from p0 to p1 (xy). opening = (start, width, z0, z1, label)
+        along the wall, e.g. a door (z0=0) or a window.
+        """
+        p0 = np.asarray(p0, dtype=np.float64)
+        d = np.asarray(p1, dtype=np.float64) - p0
+        length = float(np.hypot(*d))
+        e = d / length
+        up = (0.0, 0.0, height)
+
+        def seg(a, b, z0, z1, label):
+            if b - a > 1e-6 and z1 - z0 > 1e-6:
+                self.add((*(p0 + e * a), z0), (*(e * (b - a)), 0.0), (0.0, 0.0, z1 - z0), label)
+
+        if opening is None:
+            seg(0.0, length, 0.0, up[2], 1)
+            return
+
+        start, width, z0, z1, label = opening
+        end = min(start + width, length)
+        seg(0.0, start, 0.0, height, 1)
+        seg(end, length, 0.0, height, 1)
+        seg(start, end, 0.0, z0, 1)
+        seg(start, end, z1, height, 1)
+        seg(start, end, z0, z1, label)
+
+    def arrays(self):
+        return (np.array(self.o, dtype=np.float64), np.array(self.u, dtype=np.float64),
+                np.array(self.v, dtype=np.float64), np.array(self.label, dtype=np.uint8))
+
+
+def build_layout(rooms, furniture_density, rng, height=3.0, room_size=(4.0, 9.0)):
+    """
+    Rooms on a rows x cols grid with random column widths / row depths.
+    Interior walls get a door, exterior walls a window. Furniture count per
+    room ~ Poisson(furniture_density * room area) for each of chair/table/sofa.
+    """
+    cols = int(np.ceil(np.sqrt(rooms)))
+    rows = int(np.ceil(rooms / cols))
+    xs = np.concatenate([[0.0], np.cumsum(rng.uniform(*room_size, cols))])
+    ys = np.concatenate([[0.0], np.cumsum(rng.uniform(*room_size, rows))])
+
+    r = Rects()
+    for k in range(rooms):
+        i, j = divmod(k, cols)
+        x0, x1, y0, y1 = xs[j], xs[j + 1], ys[i], ys[i + 1]
+        w, d = x1 - x0, y1 - y0
+
+        r.add((x0, y0, 0.0), (w, 0, 0), (0, d, 0), 0)        # floor
+        r.add((x0, y0, height), (w, 0, 0), (0, d, 0), 4)     # ceiling
+
+        # Each room owns its south and west walls; the last row/col also closes north/east
+        walls = [((x0, y0), (x1, y0), i == 0), ((x0, y0), (x0, y1), j == 0)]
+        if i == rows - 1 or k + cols >= rooms:
+            walls.append(((x0, y1), (x1, y1), True))
+        if j == cols - 1 or k + 1 >= rooms:
+            walls.append(((x1, y0), (x1, y1), True))
+
+        for p0, p1, exterior in walls:
+            length = float(np.hypot(p1[0] - p0[0], p1[1] - p0[1]))
+            if exterior:
+                width = min(rng.uniform(1.0, 3.0), length - 0.5)
+                opening = (rng.uniform(0.2, length - width - 0.2), width, 1.0, 2.2, 6)
+            else:
+                opening = (rng.uniform(0.3, length - 1.3), 1.0, 0.0, 2.0, 3)
+            r.wall(p0, p1, height, opening)
+
+        for label, (sx, sy, sz), count in (
+            (2, (0.5, 0.5, 0.9), rng.poisson(furniture_density * w * d * 2)),
+            (5, (1.6, 0.9, 0.75), rng.poisson(furniture_density * w * d)),
+            (7, (2.0, 0.9, 0.8), rng.poisson(furniture_density * w * d * 0.5)),
+        ):
+            if count == 0 or w < sx + 0.6 or d < sy + 0.6:
+                continue
+            px = rng.uniform(x0 + 0.3, x1 - sx - 0.3, count)
+            py = rng.uniform(y0 + 0.3, y1 - sy - 0.3, count)
+            for bx, by in zip(px, py):
+                r.box(bx, by, 0.0, sx, sy, sz, label)
+
+    return r.arrays(), (xs[-1], ys[-1], height)
+
+
+def sample_chunk(layout, weights, n, rng, noise="gaussian", sigma=0.01, outliers=0.0, extent=None):
+    """
+    Draws n points on the layout rectangles, uniformly by area.
+    Returns points (n,7) float32 [x,y,z,r,g,b,intensity] and labels (n,) uint8.
+    """
+    O, U, V, L = layout
+    idx = rng.choice(len(L), size=n, p=weights)
+    st = rng.random((n, 2))
+    xyz = O[idx] + st[:, :1] * U[idx] + st[:, 1:] * V[idx]
+    labels = L[idx]
+
+    if noise == "gaussian":
+        xyz += rng.normal(0.0, sigma, (n, 3))
+    elif noise == "range":
+        # error grows with distance from a scanner in the middle of the building
+        center = np.array([extent[0] / 2, extent[1] / 2, 1.5])
+        dist = np.linalg.norm(xyz - center, axis=1, keepdims=True)
+        xyz += rng.normal(0.0, 1.0, (n, 3)) * (sigma * (1.0 + dist / 10.0))
+
+    if outliers > 0:
+        mask = rng.random(n) < outliers
+        xyz[mask] = rng.random((int(mask.sum()), 3)) * np.asarray(extent)
+
+    pts = np.empty((n, 7), dtype=np.float32)
+    pts[:, :3] = xyz
+    pts[:, 3:6] = np.clip(CLASS_RGB[labels] + rng.normal(0, 8, (n, 3)), 0, 255)
+    pts[:, 6] = np.clip(CLASS_INTENSITY[labels] + rng.normal(0, 10, n), 0, 255)
+    return pts, labels
+
+
+def _npy_header(shape, dtype):
+    return {
+        "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        "fortran_order": False,
+        "shape": tuple(shape),
+    }
+
+
+def generate_scene(out_path, num_points, rooms=4, furniture_density=0.05, noise="gaussian",
+                   sigma=0.01, outliers=0.0, seed=0, chunk_size=1_000_000):
+    """
+    Writes a procedural scene as .npz (points (N,7) float32, labels (N,) uint8),
+    streaming `chunk_size` points at a time. Returns throughput stats.
+    """
+    if noise not in NOISE_MODELS:
+        raise ValueError(f"noise must be one of {NOISE_MODELS}")
+
+    seeds = np.random.SeedSequence(seed)
+    layout_rng = np.random.default_rng(seeds.spawn(1)[0])
+    layout, extent = build_layout(rooms, furniture_density, layout_rng)
+
+    O, U, V, _ = layout
+    area = np.linalg.norm(np.cross(U, V), axis=1)
+    weights = area / area.sum()
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    n_chunks = (num_points + chunk_size - 1) // chunk_size
+    chunk_seeds = seeds.spawn(n_chunks)
+
+    # np.savez layout: one .npy member per array. Points are streamed into the
+    # zip; labels go to a temp file first (1 byte/point) and are appended after.
+    with zipfile.ZipFile(out_path, "w", zipfile.ZIP_STORED, allowZip64=True) as zf, \
+            tempfile.TemporaryFile() as label_tmp:
+        with zf.open("points.npy", "w", force_zip64=True) as fh:
+            np.lib.format.write_array_header_1_0(fh, _npy_header((num_points, 7), np.float32))
+            for c in range(n_chunks):
+                n = min(chunk_size, num_points - c * chunk_size)
+                rng = np.random.default_rng(chunk_seeds[c])
+                pts, labels = sample_chunk(layout, weights, n, rng, noise, sigma, outliers, extent)
+                fh.write(pts.tobytes())
+                label_tmp.write(labels.tobytes())
+
+        label_tmp.seek(0)
+        with zf.open("labels.npy", "w", force_zip64=True) as fh:
+            np.lib.format.write_array_header_1_0(fh, _npy_header((num_points,), np.uint8))
+            while True:
+                block = label_tmp.read(1 << 24)
+                if not block:
+                    break
+                fh.write(block)
+
+    seconds = time.perf_counter() - t0
+    size = out_path.stat().st_size
+    return {
+        "path": str(out_path),
+        "points": int(num_points),
+        "rectangles": int(len(weights)),
+        "seconds": seconds,
+        "points_per_sec": num_points / seconds,
+        "mb_per_sec": size / seconds / 1e6,
+    }
+
+
 # ------------------------------------------------------------
-# RUN ALL SCENES
+# Benchmark fixtures
 # ------------------------------------------------------------
+FIXTURE_SIZES = (100_000, 1_000_000, 5_000_000)
+
+
+def fixture_path(num_points):
+    return BENCH_DIR / f"synthetic_{num_points}.npz"
+
+
+def ensure_fixture(num_points, seed=0):
+    """
+    Path of the benchmark fixture with num_points points; generated on first use.
+    Every fixture is the same 12-room building (seed 0), so sizes are comparable.
+    """
+    path = fixture_path(num_points)
+    if not path.exists():
+        generate_scene(path, num_points, rooms=12, furniture_density=0.05, seed=seed)
+    return path
+
+
+def report(stats):
+    print(f"{stats['path']}: {stats['points']:,} points from {stats['rectangles']} surfaces "
+          f"in {stats['seconds']:.2f}s  ({stats['points_per_sec'] / 1e6:.2f} M points/s, "
+          f"{stats['mb_per_sec']:.0f} MB/s)")
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd")
+
+    p = sub.add_parser("presets", help="the 5 bundled sceneN.npz (default)")
+    p.add_argument("--out_dir", default=".")
+
+    p = sub.add_parser("procedural", help="one random multi-room scene")
+    p.add_argument("--out", required=True)
+    p.add_argument("--points", type=int, default=1_000_000)
+    p.add_argument("--rooms", type=int, default=4)
+    p.add_argument("--furniture_density", type=float, default=0.05, help="items per m^2 per room")
+    p.add_argument("--noise", choices=NOISE_MODELS, default="gaussian")
+    p.add_argument("--sigma", type=float, default=0.01, help="noise std in metres")
+    p.add_argument("--outliers", type=float, default=0.0, help="fraction of uniform outliers")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--chunk", type=int, default=1_000_000, help="points generated per chunk")
+
+    p = sub.add_parser("fixtures", help=f"benchmark fixtures in {BENCH_DIR}")
+    p.add_argument("--sizes", type=int, nargs="+", default=list(FIXTURE_SIZES))
+    p.add_argument("--force", action="store_true", help="regenerate existing fixtures")
+
+    args = parser.parse_args()
+
+    if args.cmd in (None, "presets"):
+        print("\nGenerating indoor dummy LiDAR scenes...\n")
+        for scene in PRESETS:
+            scene(getattr(args, "out_dir", "."))
+        print("\nAll scenes generated successfully!\n")
+
+    elif args.cmd == "procedural":
+        report(generate_scene(
+            args.out, args.points, rooms=args.rooms, furniture_density=args.furniture_density,
+            noise=args.noise, sigma=args.sigma, outliers=args.outliers, seed=args.seed,
+            chunk_size=args.chunk,
+        ))
+
+    elif args.cmd == "fixtures":
+        for n in args.sizes:
+            if args.force:
+                fixture_path(n).unlink(missing_ok=True)
+            t0 = time.perf_counter()
+            path = ensure_fixture(n)
+            print(f"{path}  ({time.perf_counter() - t0:.2f}s)")
+
+
 if __name__ == "__main__":
-    print("\nGenerating indoor dummy LiDAR scenes...\n")
-    scene1()
-    scene2()
-    scene3()
-    scene4()
-    scene5()
-    print("\nAll scenes generated successfully!\n")
+    main()
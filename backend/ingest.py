@@ -0,0 +1,194 @@
+"""
+Copy-free path from an uploaded scan to the model's (1, N, 7) input.
+
+The old path made several full-size copies before the forward pass:
+np.asarray(float32) of the upload, np.concatenate with zero padding, and
+for /segment a gather of the subsample from the normalized copy. Here
+the scan is written once, cast, cropped and padded in the same pass,
+into an (N, 7) float32 buffer from a BufferPool:
+
+    with normalize_into(raw, POOL, rows=idx) as buf:   # rows: optional subsample
+        pts = as_batch(buf.array[:, :input_dim], device)
+        logits = model(pts)
+
+A buffer is a torch tensor and buf.array is a numpy view of the same
+memory, so there is no copy to torch either. On a CUDA device the
+buffers are pinned, so the host-to-device copy is asynchronous. Released
+buffers stay in the pool (up to max_bytes) for the next request, so a
+steady request stream does not allocate and zero-fill new pages each
+time. .lsc scans (scan_format.py) are decoded straight into the buffer
+(load_points).
+"""
+
+import threading
+
+import numpy as np
+
+from metrics import INGEST_POOL_BYTES, INGEST_POOL_REQUESTS
+from scan_format import ScanFile
+
+WIDTH = 7          # features the API feeds the models (x, y, z, r, g, b, intensity)
+MIN_ROWS = 4096
+
+
+def capacity(n):
+    """
+    Rows to allocate for n points: n rounded up to 1/8 of its power of
+    two, so buffers are reused across similar sizes and waste <= 12.5%.
+    """
+    n = max(int(n), MIN_ROWS)
+    step = 1 << max(n.bit_length() - 4, 0)
+    return -(-n // step) * step
+
+
+class PooledBuffer:
+    """
+    n rows of a pool buffer: .tensor (n, width) torch, .array (n, width)
+    numpy view of the same memory. Returned to the pool by release() or
+    at the end of a `with` block; do not use the views after that.
+    """
+
+    def __init__(self, pool, storage, n):
+        self._pool = pool
+        self._storage = storage
+        self.tensor = storage[:n]
+        self.array = self.tensor.numpy()
+
+    @classmethod
+    def wrap(cls, array):
+        """
+        An existing float32 array in the same interface (release() is a no-op).
+        """
+        import torch
+
+        buf = cls(None, torch.from_numpy(array), array.shape[0])
+        buf._storage = None
+        return buf
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def release(self):
+        if self._storage is not None:
+            self._pool._release(self._storage)
+            self._storage = None
+            self.tensor = self.array = None
+
+
+class BufferPool:
+    def __init__(self, max_bytes, width=WIDTH, pin=None):
+        self.max_bytes = int(max_bytes)   # idle buffers kept beyond this are freed
+        self.width = width
+        self.pin = pin                    # None: pin when CUDA is available
+        self.hits = 0
+        self.misses = 0
+        self._free = []                   # idle buffers, least recently used first
+        self._lock = threading.Lock()
+
+    def pinned(self):
+        if self.pin is None:
+            import torch
+            self.pin = torch.cuda.is_available()
+        return self.pin
+
+    def acquire(self, n):
+        """
+        A PooledBuffer of n rows (uninitialised).
+        """
+        import torch
+
+        pin = self.pinned()
+        rows = capacity(n)
+        with self._lock:
+            # the smallest idle buffer that fits, unless it is much larger
+            fits = [b for b in self._free if rows <= b.shape[0] <= 2 * rows]
+            storage = min(fits, key=lambda b: b.shape[0]) if fits else None
+            if storage is not None:
+                self._free.remove(storage)
+                self.hits += 1
+            else:
+                self.misses += 1
+            INGEST_POOL_BYTES.set(self._idle_bytes())
+        INGEST_POOL_REQUESTS.inc(1, "hit" if storage is not None else "miss")
+        if storage is None:
+            storage = torch.empty((rows, self.width), dtype=torch.float32, pin_memory=pin)
+        return PooledBuffer(self, storage, n)
+
+    def _release(self, storage):
+        with self._lock:
+            self._free.append(storage)
+            while self._idle_bytes() > self.max_bytes:
+                self._free.pop(0)
+            INGEST_POOL_BYTES.set(self._idle_bytes())
+
+    def _idle_bytes(self):
+        return sum(b.shape[0] * b.shape[1] * 4 for b in self._free)
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+            INGEST_POOL_BYTES.set(0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "idle_buffers": len(self._free),
+                "idle_bytes": self._idle_bytes(),
+                "max_bytes": self.max_bytes,
+                "pinned": bool(self.pin),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def normalize_into(raw, pool, rows=None):
+    """
+    (N, F) points (any numeric dtype) -> PooledBuffer (N, pool.width)
+    float32 in one pass: extra features are dropped, missing ones zero.
+    rows: optional indices to take (a subsample); only those are copied.
+    float32 input with >= width features is used in place (no copy) when
+    the pool does not pin its buffers.
+    """
+    raw = np.asarray(raw)
+    if raw.ndim != 2:
+        raise ValueError(f"Expected (N, F) points, got {raw.shape}")
+    if rows is None and raw.dtype == np.float32 and raw.shape[1] >= pool.width and not pool.pinned():
+        return PooledBuffer.wrap(raw[:, :pool.width])
+    k = min(raw.shape[1], pool.width)
+    src = raw[:, :k]
+    if rows is not None:
+        src = np.take(src, rows, axis=0)
+    buf = pool.acquire(src.shape[0])
+    np.copyto(buf.array[:, :k], src, casting="unsafe")
+    buf.array[:, k:] = 0
+    return buf
+
+
+def load_points(data, pool):
+    """
+    The points of an open scan (open_scan()) as a PooledBuffer. .lsc
+    columns are decoded straight into the buffer; .npz arrays go through
+    normalize_into() (one copy, none for float32 (N, >= 7)).
+    """
+    if isinstance(data, ScanFile):
+        buf = pool.acquire(data.num_points)
+        k = data.read_points_into(buf.array)
+        buf.array[:, k:] = 0
+        return buf
+    return normalize_into(data["points"], pool)
+
+
+def as_batch(points, device):
+    """
+    (N, F) float32 numpy rows (e.g. a PooledBuffer.array slice) -> (1, N, F)
+    tensor on `device`, zero-copy on the CPU.
+    """
+    import torch
+
+    t = torch.from_numpy(points).unsqueeze(0)
+    if device.type == "cpu":
+        return t
+    return t.to(device, non_blocking=t.is_pinned())
@@ -0,0 +1,134 @@
+"""
+Versioned map / RL state for the /ws/map WebSocket.
+
+Each session has a MapFeed with two channels: "map" (the occupancy grid)
+and "rl" (the RL environment grid, 0 free / 1 obstacle / 2 goal /
+3 agent). Every change bumps the channel's version and is logged:
+
+    {"type": "snapshot", "channel", "version", "shape": [h, w], "data": base64 uint8 grid}
+    {"type": "delta",    "channel", "version", "cells": [flat index, ...], "values": [...]}
+
+RL messages also carry "agent" ({"pos", "goal", ...} and, after a
+rollout, the "positions" walked). A client that has seen version v gets
+the logged deltas after v; if those are no longer in the log, or its
+epoch is not the feed's (another process or a new session), it gets a
+snapshot instead. A delta that would be bigger than the snapshot is
+logged as a snapshot.
+"""
+
+import asyncio
+import base64
+import threading
+import uuid
+from collections import deque
+
+import numpy as np
+
+CHANNELS = ("map", "rl")
+
+# ~8 bytes of JSON per changed cell vs ~1.3 per cell (base64) for a snapshot
+_DELTA_CELL_BYTES = 8
+
+
+class GridChannel:
+    def __init__(self, name, history):
+        self.name = name
+        self.version = 0
+        self.grid = None
+        self.agent = None      # latest agent info (rl), repeated in snapshots
+        self._log = deque(maxlen=history)   # (version, cells or None for snapshot, values, agent)
+
+    def publish(self, grid, agent=None):
+        grid = np.asarray(grid).astype(np.uint8)
+        cells = None
+        if self.grid is not None and grid.shape == self.grid.shape:
+            cells = np.flatnonzero(grid != self.grid)
+            if len(cells) == 0 and agent is None:
+                return False
+            if len(cells) * _DELTA_CELL_BYTES > grid.size:
+                cells = None
+        self.version += 1
+        self.grid = grid
+        if agent is not None:
+            self.agent = agent
+        values = grid.ravel()[cells] if cells is not None else None
+        self._log.append((self.version, cells, values, agent))
+        return True
+
+    def snapshot(self):
+        msg = {
+            "type": "snapshot",
+            "channel": self.name,
+            "version": self.version,
+            "shape": list(self.grid.shape),
+            "data": base64.b64encode(self.grid.tobytes()).decode("ascii"),
+        }
+        if self.agent is not None:
+            msg["agent"] = self.agent
+        return msg
+
+    def since(self, version):
+        """
+        Messages that bring a client at `version` up to date (None = knows nothing).
+        """
+        if self.grid is None or version == self.version:
+            return []
+        if version is None or not self._log or not (self._log[0][0] - 1 <= version < self.version):
+            return [self.snapshot()]
+        entries = [e for e in self._log if e[0] > version]
+        if any(cells is None for _, cells, _, _ in entries):
+            return [self.snapshot()]
+        out = []
+        for v, cells, values, agent in entries:
+            msg = {"type": "delta", "channel": self.name, "version": v,
+                   "cells": cells.tolist(), "values": values.tolist()}
+            if agent is not None:
+                msg["agent"] = agent
+            out.append(msg)
+        return out
+
+
+class MapFeed:
+    """
+    Channels of one session plus the asyncio events of the sockets
+    listening to it. publish() may be called from any thread.
+    """
+
+    def __init__(self, history=256):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.channels = {name: GridChannel(name, history) for name in CHANNELS}
+        self._lock = threading.Lock()
+        self._listeners = set()   # (loop, asyncio.Event)
+
+    def publish(self, channel, grid, agent=None):
+        with self._lock:
+            changed = self.channels[channel].publish(grid, agent)
+            listeners = list(self._listeners) if changed else []
+        for loop, event in listeners:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:   # loop closed
+                pass
+
+    def versions(self):
+        return {name: ch.version for name, ch in self.channels.items()}
+
+    def since(self, versions):
+        """
+        versions: {channel: last version seen}; missing channels get a snapshot.
+        """
+        with self._lock:
+            out = []
+            for name, ch in self.channels.items():
+                out += ch.since(versions.get(name))
+            return out
+
+    def subscribe(self):
+        event = asyncio.Event()
+        with self._lock:
+            self._listeners.add((asyncio.get_running_loop(), event))
+        return event
+
+    def unsubscribe(self, event):
+        with self._lock:
+            self._listeners = {(loop, e) for loop, e in self._listeners if e is not event}
@@ -0,0 +1,150 @@
+"""
+Multi-resolution pyramid of an occupancy grid, served as tiles.
+
+Level 0 is the grid itself (uint8 class labels, 0 = empty). Each level
+above halves both sides: a parent cell is empty only if all of its (up
+to) 4 children are (max-pool of occupancy) and otherwise carries the most
+frequent non-empty child class (mode; ties -> first child in row order).
+
+    pyr = MapPyramid(tile_size=64)
+    pyr.sync(occ, version)              # incremental: only changed cells
+    etag, data, shape = pyr.tile(level, tx, ty)
+
+sync() diffs the new grid against the last one and recomputes only the
+ancestors of changed cells; with an unchanged `version` it returns at
+once. Tiles are cached with a content-hash ETag; a tile is dropped from
+the cache only when one of its cells changes.
+"""
+
+import hashlib
+import threading
+
+import numpy as np
+
+
+def reduce_children(children):
+    """
+    children: (K, 4) uint8 -> (K,) parent labels.
+    """
+    nz = children > 0
+    # votes[k, i] = how many non-empty children share child i's label
+    votes = ((children[:, :, None] == children[:, None, :]) & nz[:, None, :]).sum(axis=2)
+    votes[~nz] = -1
+    best = votes.argmax(axis=1)
+    parent = children[np.arange(len(children)), best]
+    parent[~nz.any(axis=1)] = 0
+    return parent
+
+
+def _children(grid, py, px):
+    """
+    (K, 4) labels of the children of parent cells (py, px); cells past
+    the edge of an odd-sized grid count as empty.
+    """
+    h, w = grid.shape
+    out = np.zeros((len(py), 4), dtype=np.uint8)
+    for i, (dy, dx) in enumerate(((0, 0), (0, 1), (1, 0), (1, 1))):
+        y, x = 2 * py + dy, 2 * px + dx
+        ok = (y < h) & (x < w)
+        out[ok, i] = grid[y[ok], x[ok]]
+    return out
+
+
+class MapPyramid:
+    def __init__(self, tile_size=64):
+        self.tile_size = tile_size
+        self.levels = []       # [level 0 grid, level 1, ...] down to one tile
+        self._tiles = {}       # (level, tx, ty) -> (etag, bytes, shape)
+        self.version = None    # version of the grid last synced
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self):
+        return self.levels[0].shape if self.levels else (0, 0)
+
+    def _build(self, grid):
+        self.levels = [grid.copy()]
+        self._tiles.clear()
+        while max(self.levels[-1].shape) > self.tile_size:
+            prev = self.levels[-1]
+            h, w = (prev.shape[0] + 1) // 2, (prev.shape[1] + 1) // 2
+            py, px = np.divmod(np.arange(h * w), w)
+            self.levels.append(reduce_children(_children(prev, py, px)).reshape(h, w))
+
+    def sync(self, grid, version=None):
+        """
+        Brings the pyramid up to date with `grid`; returns the number of
+        changed level-0 cells (-1 for a full rebuild).
+        """
+        with self._lock:
+            if version is not None and version == self.version:
+                return 0
+            self.version = version
+            grid = np.asarray(grid, dtype=np.uint8)
+            if not self.levels or grid.shape != self.levels[0].shape:
+                self._build(grid)
+                return -1
+
+            ys, xs = np.nonzero(grid != self.levels[0])
+            if len(ys) == 0:
+                return 0
+            self.levels[0][ys, xs] = grid[ys, xs]
+            self._invalidate(0, ys, xs)
+            changed = len(ys)
+
+            for level in range(1, len(self.levels)):
+                # parents of the cells changed one level down
+                w = self.levels[level].shape[1]
+                flat = np.unique((ys // 2) * w + xs // 2)
+                ys, xs = np.divmod(flat, w)
+                new = reduce_children(_children(self.levels[level - 1], ys, xs))
+                diff = new != self.levels[level][ys, xs]
+                if not diff.any():
+                    break
+                ys, xs = ys[diff], xs[diff]
+                self.levels[level][ys, xs] = new[diff]
+                self._invalidate(level, ys, xs)
+            return changed
+
+    def _invalidate(self, level, ys, xs):
+        if not self._tiles:
+            return
+        ts = self.tile_size
+        for ty, tx in set(zip((ys // ts).tolist(), (xs // ts).tolist())):
+            self._tiles.pop((level, tx, ty), None)
+
+    def tiles_per_side(self, level):
+        h, w = self.levels[level].shape
+        ts = self.tile_size
+        return (w + ts - 1) // ts, (h + ts - 1) // ts
+
+    def tile(self, level, tx, ty):
+        """
+        -> (etag, raw uint8 bytes in row order, (h, w)), or None if out of range.
+        Edge tiles are smaller than tile_size.
+        """
+        with self._lock:
+            if not 0 <= level < len(self.levels):
+                return None
+            nx, ny = self.tiles_per_side(level)
+            if not (0 <= tx < nx and 0 <= ty < ny):
+                return None
+
+            key = (level, tx, ty)
+            cached = self._tiles.get(key)
+            if cached is None:
+                ts = self.tile_size
+                data = np.ascontiguousarray(self.levels[level][ty * ts:(ty + 1) * ts, tx * ts:(tx + 1) * ts])
+                raw = data.tobytes()
+                etag = '"' + hashlib.blake2b(raw, digest_size=8).hexdigest() + f'-{data.shape[0]}x{data.shape[1]}"'
+                cached = self._tiles[key] = (etag, raw, data.shape)
+            return cached
+
+    def info(self):
+        return {
+            "tile_size": self.tile_size,
+            "levels": [
+                {"level": i, "shape": list(g.shape), "tiles": list(self.tiles_per_side(i))}
+                for i, g in enumerate(self.levels)
+            ],
+        }
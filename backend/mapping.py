@@ -0,0 +1,208 @@
+"""
+2.5D map layers for /build_map, built in one vectorized pass.
+
+Each point is binned into a grid cell once; every layer is then a
+bincount / ufunc.at reduction over the same cell index:
+
+    occupancy    uint8    label of the last point with z in z_thresh per
+                          cell (exactly what points_to_occupancy returns)
+    z_min/z_max  float16  lowest / highest point above the floor (m), NaN if empty
+    z_mean       float16
+    count        uint16   points per cell (saturating)
+    class_hist   uint16   (num_classes, H, W) points per class (saturating)
+    label        uint8    majority class
+    traversable  uint8    observed and nothing between step_height and
+                          robot_height above the floor
+    state        int8     -1 unknown, 0 free, 1 occupied: cells crossed by
+                          a ray from the sensor origin to a hit are free
+
+The grid frame (origin and scale) is fitted to the points inside z_thresh,
+as points_to_occupancy does, so the layers line up cell for cell with the
+occupancy grid. The floor is the median of the per-cell minimum heights.
+
+Free-space carving casts one ray per *observed cell* rather than per
+point: with a single sensor origin every point in a cell traverses the
+same cells, so millions of points collapse to at most H*W rays. Rays are
+traversed with a vectorized DDA: one sample per cell along the major
+axis, i.e. the cells Bresenham visits.
+"""
+
+import numpy as np
+
+# Order of stack_layers()
+LAYER_NAMES = ("occupancy", "z_min", "z_max", "z_mean", "count", "label", "traversable", "state")
+
+UNKNOWN, FREE, OCCUPIED = -1, 0, 1
+
+_U16_MAX = np.iinfo(np.uint16).max
+
+
+def _sat_u16(a):
+    return np.minimum(a, _U16_MAX).astype(np.uint16)
+
+
+def mark_rays(free, origin, ends, grid_size):
+    """
+    Sets free[cell] = True for every cell crossed by a ray from `origin`
+    (x, y in cell units, continuous) to the centre of each of `ends`
+    (M,2 integer cells), end cells excluded.
+
+    Rays are sorted by length and advanced one step at a time across all
+    rays still running, so each step is one vector op over a prefix.
+    """
+    ends = np.asarray(ends, dtype=np.int64)
+    if len(ends) == 0:
+        return free
+    ox, oy = float(origin[0]), float(origin[1])
+    d = ends + 0.5 - np.array([ox, oy])
+    steps = np.ceil(np.abs(d).max(axis=1)).astype(np.int64)
+    order = np.argsort(-steps, kind="stable")
+    steps = steps[order]
+    dx = np.ascontiguousarray(d[order, 0])
+    dy = np.ascontiguousarray(d[order, 1])
+
+    # running[k] = number of rays with more than k steps
+    running = np.searchsorted(-steps, -np.arange(1, steps[0] + 1), side="right")
+    # origin and ends inside the grid -> every sample is inside too
+    clip = not (0 <= ox < grid_size and 0 <= oy < grid_size)
+    for k, m in enumerate(running):
+        t = k / steps[:m]
+        ix = np.floor(ox + t * dx[:m]).astype(np.int64)
+        iy = np.floor(oy + t * dy[:m]).astype(np.int64)
+        if clip:
+            ok = (ix >= 0) & (ix < grid_size) & (iy >= 0) & (iy < grid_size)
+            ix, iy = ix[ok], iy[ok]
+        free[iy * grid_size + ix] = True
+    return free
+
+
+def carve(observed, occupied, origin, grid_size):
+    """
+    Three-state grid (flat, int8): cells on a ray from origin to an
+    observed cell are free, observed cells are free unless occupied, the
+    rest is unknown.
+    """
+    hit = np.flatnonzero(observed)
+    ends = np.stack([hit % grid_size, hit // grid_size], axis=1)
+    free = mark_rays(np.zeros(grid_size * grid_size, dtype=bool), origin, ends, grid_size)
+
+    state = np.full(grid_size * grid_size, UNKNOWN, dtype=np.int8)
+    state[free | observed] = FREE
+    state[occupied] = OCCUPIED
+    return state
+
+
+def build_layers(points, labels=None, grid_size=40, resolution=0.2, z_thresh=(0.1, 2.5),
+                 num_classes=8, robot_height=0.6, step_height=0.1, origin=None):
+    """
+    points: (N,3); labels: (N,) class labels, or None (all 1 = obstacle).
+    origin: sensor (x, y) in the points' frame; default the median of the
+            points, which suits a single static scan.
+    Returns {layer name: (H,W) array} plus class_hist (C,H,W).
+    """
+    pts = np.asarray(points, dtype=np.float32)
+    if pts.ndim != 2 or pts.shape[1] != 3:
+        raise ValueError(f"Expected (N,3), got {pts.shape}")
+    if labels is None:
+        labels = np.ones((pts.shape[0],), dtype=np.uint8)
+    labels = np.asarray(labels, dtype=np.uint8)
+
+    n_cells = grid_size * grid_size
+    z = pts[:, 2]
+    in_band = (z >= z_thresh[0]) & (z <= z_thresh[1])
+
+    if not in_band.any():
+        return empty_layers(grid_size, num_classes)
+
+    # --- Grid frame from the z-filtered points (as points_to_occupancy) ---
+    x, y = pts[:, 0], pts[:, 1]
+    xb, yb = x[in_band], y[in_band]
+    ox, oy = xb.min(), yb.min()
+    world_size = grid_size * resolution
+    extent = max(xb.max() - ox, yb.max() - oy)
+    scale = (world_size - 1e-3) / extent if extent > 0 else 1.0
+
+    sx = (x - ox) * scale
+    sy = (y - oy) * scale
+    # band points are clipped like before; others outside the frame are dropped
+    inside = in_band | ((sx >= 0) & (sx < world_size) & (sy >= 0) & (sy < world_size))
+    np.clip(sx, 0, world_size - 1e-3, out=sx)
+    np.clip(sy, 0, world_size - 1e-3, out=sy)
+    cells = (sy / resolution).astype(np.int64) * grid_size + (sx / resolution).astype(np.int64)
+
+    # --- Occupancy: label of the last band point per cell ---
+    band_idx = np.flatnonzero(in_band)
+    last = np.full(n_cells, -1, dtype=np.int64)
+    np.maximum.at(last, cells[band_idx], band_idx)
+    occ = np.where(last >= 0, labels[np.maximum(last, 0)], 0).astype(np.uint8)
+
+    # --- Height / density / class layers over all points in the frame ---
+    c = cells[inside]
+    zi = z[inside]
+    li = labels[inside]
+
+    count = np.bincount(c, minlength=n_cells)
+    observed = count > 0
+    z_min = np.full(n_cells, np.inf, dtype=np.float32)
+    z_max = np.full(n_cells, -np.inf, dtype=np.float32)
+    np.minimum.at(z_min, c, zi)
+    np.maximum.at(z_max, c, zi)
+    z_sum = np.bincount(c, weights=zi, minlength=n_cells)
+
+    floor = float(np.median(z_min[observed]))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z_mean = np.where(observed, z_sum / count - floor, np.nan)
+    z_min = np.where(observed, z_min - floor, np.nan)
+    z_max = np.where(observed, z_max - floor, np.nan)
+
+    valid = li < num_classes
+    hist = np.bincount(c[valid] * num_classes + li[valid], minlength=n_cells * num_classes)
+    hist = hist.reshape(n_cells, num_classes)
+    label = np.where(observed, hist.argmax(axis=1), 0).astype(np.uint8)
+
+    body = (zi > floor + step_height) & (zi < floor + robot_height)
+    blocked = np.bincount(c[body], minlength=n_cells) > 0
+    traversable = (observed & ~blocked).astype(np.uint8)
+
+    # --- Free space: rays from the sensor to every observed cell ---
+    if origin is None:
+        origin = (np.median(x), np.median(y))
+    origin_cell = ((origin[0] - ox) * scale / resolution, (origin[1] - oy) * scale / resolution)
+    state = carve(observed, last >= 0, origin_cell, grid_size)
+
+    shape = (grid_size, grid_size)
+    return {
+        "occupancy": occ.reshape(shape),
+        "z_min": z_min.astype(np.float16).reshape(shape),
+        "z_max": z_max.astype(np.float16).reshape(shape),
+        "z_mean": z_mean.astype(np.float16).reshape(shape),
+        "count": _sat_u16(count).reshape(shape),
+        "label": label.reshape(shape),
+        "traversable": traversable.reshape(shape),
+        "state": state.reshape(shape),
+        "class_hist": _sat_u16(hist.T).reshape((num_classes,) + shape),
+    }
+
+
+def empty_layers(grid_size, num_classes=8):
+    shape = (grid_size, grid_size)
+    nan = np.full(shape, np.nan, dtype=np.float16)
+    return {
+        "occupancy": np.zeros(shape, dtype=np.uint8),
+        "z_min": nan,
+        "z_max": nan.copy(),
+        "z_mean": nan.copy(),
+        "count": np.zeros(shape, dtype=np.uint16),
+        "label": np.zeros(shape, dtype=np.uint8),
+        "traversable": np.zeros(shape, dtype=np.uint8),
+        "state": np.full(shape, UNKNOWN, dtype=np.int8),
+        "class_hist": np.zeros((num_classes,) + shape, dtype=np.uint16),
+    }
+
+
+def stack_layers(layers):
+    """
+    (len(LAYER_NAMES), H, W) float16 stack; counts above 2048 lose
+    precision in float16, class_hist is served separately.
+    """
+    return np.stack([layers[name].astype(np.float16) for name in LAYER_NAMES])
@@ -0,0 +1,275 @@
+"""
+Minimal Prometheus-style metrics for the API (no extra dependency).
+
+    REGISTRY.render()         -> Prometheus text exposition format
+    with stage("forward"):    -> observes api_stage_seconds{endpoint,stage}
+    MetricsMiddleware(app)    -> api_requests_total / api_request_seconds,
+                                 and sets the endpoint label for stage()
+
+The endpoint label is the route template (e.g. /jobs/{job_id}), so label
+cardinality stays bounded. Set METRICS=0 to disable all recording.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENABLED = os.environ.get("METRICS", "1") != "0"
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_endpoint = ContextVar("metrics_endpoint", default="other")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, v in items:
+            lines.append(f"{self.name}_total{_fmt_labels(self.labelnames, labels)} {_fmt_value(v)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    Either set() explicitly or computed at scrape time by `fn() -> value`.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), fn=None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self):
+        lines = self.header()
+        if self.fn is not None:
+            items = [((), self.fn())]
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        for labels, v in items:
+            if v is not None:
+                lines.append(f"{self.name}{_fmt_labels(self.labelnames, labels)} {_fmt_value(v)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        for labels, (counts, total, n) in items:
+            acc = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                le = ("le", _fmt_value(bound) if bound != float("inf") else "+Inf")
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, labels, le)} {acc}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, labels)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, labels)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+# -----------------------------------------------------------
+# Process memory
+# -----------------------------------------------------------
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+
+
+# -----------------------------------------------------------
+# API metrics
+# -----------------------------------------------------------
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "api_requests", "HTTP requests by endpoint, method and status", ("endpoint", "method", "status")))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "api_request_seconds", "Request latency including the response body", ("endpoint", "method")))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "api_stage_seconds", "Time per processing stage inside a request", ("endpoint", "stage")))
+MODEL_POINTS = REGISTRY.register(Counter(
+    "model_points", "Points run through a model", ("model",)))
+MODEL_BATCHES = REGISTRY.register(Counter(
+    "model_batches", "Forward passes run", ("model",)))
+MODEL_BATCH_POINTS = REGISTRY.register(Histogram(
+    "model_batch_points", "Points per forward pass", ("model",),
+    buckets=(1, 1024, 4096, 16384, 50000, 100000, 250000, 1000000, 5000000)))
+MODEL_FORWARD_SECONDS = REGISTRY.register(Histogram(
+    "model_forward_seconds", "Forward pass latency per model (A/B comparison)", ("model",)))
+MODEL_LOAD_SECONDS = REGISTRY.register(Gauge(
+    "model_load_seconds", "Time to build the served version of a model", ("model",)))
+MODEL_PARAM_BYTES = REGISTRY.register(Gauge(
+    "model_param_bytes", "Parameter + buffer memory of a loaded model", ("model",)))
+FEATURE_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "feature_cache_lookups", "Scene feature cache lookups by result (hit / miss)", ("result",)))
+FEATURE_CACHE_EVICTIONS = REGISTRY.register(Counter(
+    "feature_cache_evictions", "Scenes evicted from the feature cache"))
+FEATURE_CACHE_BYTES = REGISTRY.register(Gauge(
+    "feature_cache_bytes", "Memory held by cached scene features"))
+INGEST_POOL_REQUESTS = REGISTRY.register(Counter(
+    "ingest_pool_requests", "Model input buffer requests by result (hit = reused)", ("result",)))
+INGEST_POOL_BYTES = REGISTRY.register(Gauge(
+    "ingest_pool_bytes", "Memory held by idle pooled model input buffers"))
+REGISTRY.register(Gauge("process_resident_memory_bytes", "Resident set size", fn=rss_bytes))
+REGISTRY.register(Gauge("process_peak_resident_memory_bytes", "Peak resident set size", fn=peak_rss_bytes))
+
+
+@contextmanager
+def stage(name):
+    """
+    Times a block of the current request as api_stage_seconds{endpoint, stage}.
+    """
+    if not ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, _endpoint.get(), name)
+
+
+def record_inference(model, num_points, seconds=None):
+    if ENABLED:
+        MODEL_POINTS.inc(num_points, model)
+        MODEL_BATCHES.inc(1, model)
+        MODEL_BATCH_POINTS.observe(num_points, model)
+        if seconds is not None:
+            MODEL_FORWARD_SECONDS.observe(seconds, model)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: times each HTTP request until its last body chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _endpoint(self, scope):
+        from starlette.routing import Match
+
+        router = scope["app"].router if "app" in scope else None
+        for route in (router.routes if router is not None else ()):
+            if route.matches(scope)[0] == Match.FULL:
+                return route.path
+        return "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = self._endpoint(scope)
+        method = scope["method"]
+        token = _endpoint.set(endpoint)
+        t0 = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                REQUEST_SECONDS.observe(time.perf_counter() - t0, endpoint, method)
+                REQUESTS.inc(1, endpoint, method, status[0])
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _endpoint.reset(token)
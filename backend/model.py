@@ -64,23 +64,50 @@ class PointNetSegLite(nn.Module):
         self.bn5 = nn.BatchNorm1d(256)
         self.bn6 = nn.BatchNorm1d(128)
 
-    def forward(self, x):
+    def input_transform(self, x, num_samples=None, seed=0):
         """
-        x: (B, N, input_dim) -> (B, num_classes, N)
+        x: (B, N, input_dim) -> (B, input_dim, input_dim) T-Net transform,
+        optionally from a seeded random subsample of num_samples points.
         """
+        if num_samples and x.size(1) > num_samples:
+            g = torch.Generator().manual_seed(seed)
+            idx = torch.randperm(x.size(1), generator=g)[:num_samples].to(x.device)
+            x = x[:, idx]
+        x = x.to(self.tnet.conv1.weight.device)
+        return self.tnet(x.transpose(2, 1))
+
+    def local_features(self, x, trans):
         x = x.transpose(2, 1)  # (B, input_dim, N)
-
-        # T-Net transform
-        trans = self.tnet(x)
         x = torch.bmm(trans, x)  # (B, input_dim, N)
+        return F.relu(self.bn1(self.conv1(x)))  # (B, 64, N)
 
-        x = F.relu(self.bn1(self.conv1(x)))  # (B, 64, N)
-        pointfeat = x
-
-        x = F.relu(self.bn2(self.conv2(x)))  # (B, 128, N)
+    def pool(self, pointfeat):
+        x = F.relu(self.bn2(self.conv2(pointfeat)))  # (B, 128, N)
         x = self.bn3(self.conv3(x))          # (B, 1024, N)
-        global_feat = torch.max(x, 2, keepdim=True)[0]  # (B, 1024, 1)
-        global_feat = global_feat.repeat(1, 1, pointfeat.size(2))  # (B, 1024, N)
+        return torch.max(x, 2, keepdim=True)[0]  # (B, 1024, 1)
+
+    def encode(self, x, trans=None, tnet_points=None):
+        """
+        x: (B, N, input_dim) -> (trans, global_feat), see models/pointnet.py
+        """
+        if trans is None:
+            trans = self.input_transform(x, tnet_points)
+        return trans, self.pool(self.local_features(x, trans))
+
+    def forward(self, x, trans=None, tnet_points=None, global_feat=None):
+        """
+        x: (B, N, input_dim) -> (B, num_classes, N)
+        trans: optional precomputed T-Net transform (see models/pointnet.py)
+        global_feat: optional precomputed (B, 1024, 1) feature, see encode()
+        """
+        # T-Net transform
+        if trans is None:
+            trans = self.input_transform(x, tnet_points)
+
+        pointfeat = self.local_features(x, trans)
+        if global_feat is None:
+            global_feat = self.pool(pointfeat)
+        global_feat = global_feat.expand(-1, -1, pointfeat.size(2))  # (B, 1024, N)
 
         # Concatenate local + global
         x = torch.cat([pointfeat, global_feat], 1)  # (B, 1088, N)
@@ -91,3 +118,10 @@ class PointNetSegLite(nn.Module):
         x = self.conv7(x)  # (B, num_classes, N)
 
         return x  # logits
+
+    def profile(self, x):
+        from models.profiling import ModelProfiler
+
+        with ModelProfiler(self, name="PointNetSegLiteBN") as prof:
+            out = self(x)
+        return out, prof
@@ -0,0 +1,106 @@
+"""
+Lazy, thread-safe model holders for the API.
+
+Nothing here imports torch at module import time, so `uvicorn api:app`
+can answer /health before the models (and torch itself) are loaded.
+Models are built on first use, or ahead of time by a background warm-up.
+"""
+
+import threading
+import time
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def get_device():
+    import torch
+    from runtime import apply_torch
+
+    apply_torch()   # thread budget of this API worker, if configured
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+class LazyModel:
+    """
+    Builds an object on first `get()` and caches it.
+
+    factory: () -> obj          builds the model (may be slow)
+    warmup:  (obj) -> None      optional, run once after building
+    """
+
+    def __init__(self, name, factory, warmup=None):
+        self.name = name
+        self._factory = factory
+        self._warmup = warmup
+        self._obj = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+
+    @property
+    def ready(self):
+        return self._obj is not None
+
+    def get(self):
+        obj = self._obj
+        if obj is not None:
+            return obj
+
+        with self._lock:
+            if self._obj is None:
+                t0 = time.perf_counter()
+                try:
+                    obj = self._factory()
+                except Exception as e:
+                    self.error = repr(e)
+                    raise
+                self.load_seconds = time.perf_counter() - t0
+
+                if self._warmup is not None:
+                    t0 = time.perf_counter()
+                    self._warmup(obj)
+                    self.warmup_seconds = time.perf_counter() - t0
+
+                self.error = None
+                self._obj = obj
+        return self._obj
+
+    def __call__(self, *args, **kwargs):
+        return self.get()(*args, **kwargs)
+
+    def warmup_async(self):
+        """
+        Starts loading in a daemon thread. Safe to call more than once.
+        """
+        with self._lock:
+            if self._obj is not None or self._thread is not None:
+                return self._thread
+            self._thread = threading.Thread(
+                target=self._warm, name=f"warmup-{self.name}", daemon=True
+            )
+            self._thread.start()
+            return self._thread
+
+    def _warm(self):
+        try:
+            self.get()
+        except Exception as e:
+            print(f"[WARN] Warm-up of {self.name} failed: {e}")
+
+    def status(self):
+        if self.ready:
+            state = "ready"
+        elif self.error:
+            state = "error"
+        elif self._thread is not None and self._thread.is_alive():
+            state = "loading"
+        else:
+            state = "not_loaded"
+        return {
+            "state": state,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+        }
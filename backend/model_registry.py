@@ -0,0 +1,321 @@
+"""
+Segmentation model registry over CHECKPOINT_DIR.
+
+Every `<name>.pth` in the directory is a model; an optional `<name>.json`
+sidecar holds its metadata:
+
+    {"architecture": "pointnet_lite", "input_dim": 7, "num_classes": 8,
+     "version": "20250101-120000", ...}
+
+Without a sidecar, architecture / input_dim / num_classes are inferred
+from the state dict on load. Models are loaded lazily, one LazyModel per
+checkpoint version.
+
+Hot reload: when a checkpoint file changes (or on reload()), the new
+version is built in the background while the old one keeps serving; the
+swap is a single reference assignment, so requests never wait for a
+load and in-flight requests finish on the version they started with.
+
+Per-request selection (A/B): resolve(name) returns the requested model,
+else a weighted random pick from the A/B split, else the default.
+"""
+
+import json
+import random
+import threading
+import time
+from importlib import import_module
+
+from config import NUM_CLASSES
+from metrics import MODEL_LOAD_SECONDS, MODEL_PARAM_BYTES, rss_bytes
+from model_loader import LazyModel, get_device
+
+# architecture -> (module, class); both take (num_classes, input_dim)
+ARCHITECTURES = {
+    "pointnet_lite": ("models.pointnet", "PointNetSegLite"),   # BatchNorm-free, train_seg.py
+    "pointnet_bn": ("model", "PointNetSegLite"),               # BatchNorm, backend/model.py
+}
+
+# Points per scan the API feeds a model (normalize_point_features)
+API_INPUT_DIM = 7
+
+# Metadata of a checkpoint without sidecar until its weights are read
+DEFAULT_METADATA = {"architecture": "pointnet_lite", "input_dim": 7, "num_classes": NUM_CLASSES}
+
+
+def sidecar_path(ckpt_path):
+    return ckpt_path.with_suffix(".json")
+
+
+def read_metadata(ckpt_path):
+    path = sidecar_path(ckpt_path)
+    if not path.exists():
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def write_metadata(ckpt_path, **meta):
+    meta.setdefault("version", time.strftime("%Y%m%d-%H%M%S"))
+    path = sidecar_path(ckpt_path)
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(meta, fh, indent=2)
+    tmp.replace(path)
+    return meta
+
+
+def infer_metadata(state_dict):
+    """
+    Architecture and shapes from the weights, for checkpoints without a sidecar.
+    """
+    return {
+        "architecture": "pointnet_bn" if "bn1.weight" in state_dict else "pointnet_lite",
+        "input_dim": int(state_dict["conv1.weight"].shape[1]),
+        "num_classes": int(state_dict["conv7.weight"].shape[0]),
+    }
+
+
+def module_bytes(model):
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def parse_ab(spec):
+    """
+    "a:0.9,b:0.1" -> {"a": 0.9, "b": 0.1}
+    """
+    weights = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, w = part.partition(":")
+        weights[name.strip()] = float(w) if w else 1.0
+    return weights
+
+
+class CheckpointModel(LazyModel):
+    """
+    One version of one checkpoint. A missing file builds the default
+    architecture with random weights (as the API always did).
+    """
+
+    def __init__(self, path, default_meta=DEFAULT_METADATA, warmup=None):
+        self.path = path
+        self.mtime = path.stat().st_mtime if path.exists() else None
+        self.metadata = {**default_meta, **read_metadata(path)}
+        self.param_bytes = None
+        self.rss_delta_bytes = None
+        super().__init__(path.stem, self._build, warmup=warmup)
+
+    def _build(self):
+        import torch
+
+        t0 = time.perf_counter()
+        rss0 = rss_bytes()
+        device = get_device()
+        state = None
+        if self.path.exists():
+            state = torch.load(self.path, map_location=device)
+            if not sidecar_path(self.path).exists():
+                self.metadata.update(infer_metadata(state))
+
+        meta = self.metadata
+        if meta["architecture"] not in ARCHITECTURES:
+            raise ValueError(f"Unknown architecture '{meta['architecture']}' for {self.name}")
+        if meta["input_dim"] > API_INPUT_DIM:
+            raise ValueError(f"{self.name}: input_dim {meta['input_dim']} > {API_INPUT_DIM} API features")
+
+        module, cls = ARCHITECTURES[meta["architecture"]]
+        model = getattr(import_module(module), cls)(
+            num_classes=meta["num_classes"], input_dim=meta["input_dim"]
+        ).to(device)
+        if state is not None:
+            model.load_state_dict(state)
+            print(f"[INFO] Loaded segmentation checkpoint {self.name}.")
+        else:
+            print(f"[WARN] Segmentation checkpoint {self.name} not found. Using random weights.")
+        model.eval()
+
+        self.param_bytes = module_bytes(model)
+        rss1 = rss_bytes()
+        # Approximate: includes allocator growth (and the torch import on first load)
+        self.rss_delta_bytes = rss1 - rss0 if rss0 is not None and rss1 is not None else None
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - t0, self.name)
+        MODEL_PARAM_BYTES.set(self.param_bytes, self.name)
+        return model
+
+    @property
+    def version(self):
+        """
+        Identifies the weights: changes whenever the checkpoint file is
+        replaced (feature caches key on it).
+        """
+        return f"{self.name}@{self.mtime}"
+
+    def stale(self):
+        """
+        True when the checkpoint file was replaced since this version was
+        read (a deleted file keeps the loaded version).
+        """
+        try:
+            return self.path.stat().st_mtime != self.mtime
+        except FileNotFoundError:
+            return False
+
+    def status(self):
+        return {
+            **super().status(),
+            "name": self.name,
+            "metadata": self.metadata,
+            "checkpoint": str(self.path) if self.mtime is not None else None,
+            "mtime": self.mtime,
+            "param_bytes": self.param_bytes,
+            "rss_delta_bytes": self.rss_delta_bytes,
+        }
+
+
+class ModelRegistry:
+    def __init__(self, checkpoint_dir, default, default_meta=DEFAULT_METADATA, ab=None, warmup=None):
+        self.checkpoint_dir = checkpoint_dir
+        self.default = default
+        self.default_meta = default_meta
+        self._warmup = warmup
+        self._models = {}     # name -> CheckpointModel currently served
+        self._pending = {}    # name -> CheckpointModel being built by a reload
+        self._failed = {}     # name -> checkpoint mtime whose reload failed
+        self._lock = threading.Lock()
+        self.ab = self.check_ab(parse_ab(ab) if isinstance(ab, str) else dict(ab or {}))
+
+    def names(self):
+        names = {p.stem for p in self.checkpoint_dir.glob("*.pth")}
+        return sorted(names | {self.default})
+
+    def exists(self, name):
+        return name == self.default or (
+            "/" not in name and "\\" not in name and (self.checkpoint_dir / f"{name}.pth").is_file()
+        )
+
+    def check_ab(self, ab):
+        """
+        The A/B split without entries that name no checkpoint or have no
+        positive weight (each dropped with a warning).
+        """
+        valid = {}
+        for name, weight in ab.items():
+            if not self.exists(name):
+                print(f"[WARN] A/B split: unknown model '{name}', ignored.")
+            elif not weight > 0:
+                print(f"[WARN] A/B split: weight {weight} of '{name}' must be > 0, ignored.")
+            else:
+                valid[name] = weight
+        return valid
+
+    def resolve(self, name=None):
+        """
+        Model name for a request: explicit name > A/B split > default.
+        Raises KeyError for an unknown name. An A/B pick whose checkpoint
+        was deleted since falls back to the default.
+        """
+        if not name and self.ab:
+            names, weights = zip(*self.ab.items())
+            name = random.choices(names, weights)[0]
+            if not self.exists(name):
+                name = self.default
+        name = name or self.default
+        if not self.exists(name):
+            raise KeyError(name)
+        return name
+
+    def _new(self, name):
+        return CheckpointModel(self.checkpoint_dir / f"{name}.pth", self.default_meta, warmup=self._warmup)
+
+    def entry(self, name):
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    model = self._models[name] = self._new(name)
+        return model
+
+    def get(self, name=None):
+        """
+        The served model for `name` (resolved as in resolve()). A changed
+        checkpoint file triggers a background reload; until it is ready
+        the current version keeps serving.
+        """
+        return self.served(name).get()
+
+    def served(self, name=None):
+        """
+        The CheckpointModel currently serving `name`; get() on it returns
+        the model, its version identifies the weights.
+        """
+        name = self.resolve(name)
+        entry = self.entry(name)
+        if entry.ready and entry.stale() and self._failed.get(name) != self._mtime(name):
+            self.reload(name, wait=False)
+        return entry
+
+    def _mtime(self, name):
+        try:
+            return (self.checkpoint_dir / f"{name}.pth").stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def reload(self, name, wait=True):
+        """
+        Builds a fresh version of `name` and swaps it in when ready.
+        With wait=False the build runs in the background. Returns the new
+        version; on failure its `error` is set and the old one stays, and
+        requests do not retry that file until it changes again (an
+        explicit reload() always tries).
+        """
+        with self._lock:
+            pending = self._pending.get(name)
+            if pending is None:
+                new = self._new(name)
+                thread = threading.Thread(target=self._swap, args=(name, new),
+                                          name=f"reload-{name}", daemon=True)
+                pending = self._pending[name] = (new, thread)
+                thread.start()
+        if wait:
+            pending[1].join()
+        return pending[0]
+
+    def _swap(self, name, new):
+        try:
+            new.get()
+        except Exception as e:  # reported through new.error
+            print(f"[WARN] Reload of {name} failed, keeping the current version: {e}")
+            with self._lock:
+                self._failed[name] = new.mtime
+                self._pending.pop(name, None)
+            return
+        with self._lock:
+            self._models[name] = new
+            self._failed.pop(name, None)
+            self._pending.pop(name, None)
+        print(f"[INFO] Model {name} reloaded in {new.load_seconds:.2f}s.")
+
+    def set_default(self, name):
+        if not self.exists(name):
+            raise KeyError(name)
+        self.default = name
+
+    def warmup_async(self):
+        return self.entry(self.default).warmup_async()
+
+    def status(self):
+        models = []
+        for name in self.names():
+            entry = self._models.get(name)
+            if entry is not None:
+                s = entry.status()
+            else:
+                path = self.checkpoint_dir / f"{name}.pth"
+                s = {"state": "not_loaded", "name": name,
+                     "metadata": {**self.default_meta, **read_metadata(path)},
+                     "checkpoint": str(path) if path.exists() else None}
+            s["reloading"] = name in self._pending
+            models.append(s)
+        return {"default": self.default, "ab": self.ab, "models": models}
@@ -47,6 +47,7 @@ class PointNetSegLite(nn.Module):
     def __init__(self, num_classes, input_dim=7):
         super().__init__()
         self.k = input_dim
+        self.input_dim = input_dim
 
         self.tnet = TNetLite(k=input_dim)
 
@@ -59,21 +60,56 @@ class PointNetSegLite(nn.Module):
         self.conv6 = nn.Conv1d(256, 128, 1)
         self.conv7 = nn.Conv1d(128, num_classes, 1)
 
-    def forward(self, x):
-        # x: (B, N, k)
+    def input_transform(self, x, num_samples=None, seed=0):
+        """
+        x: (B, N, k) -> (B, k, k) T-Net transform.
+
+        The T-Net only needs a max-pooled summary of the cloud, so with
+        num_samples it runs on a fixed-size random subsample (same seed ->
+        same points) instead of all N points.
+        """
+        if num_samples and x.size(1) > num_samples:
+            g = torch.Generator().manual_seed(seed)
+            idx = torch.randperm(x.size(1), generator=g)[:num_samples].to(x.device)
+            x = x[:, idx]
+        # x may be a CPU view of a whole scene; only the subsample is moved
+        x = x.to(self.tnet.conv1.weight.device)
+        return self.tnet(x.transpose(2, 1))
+
+    def local_features(self, x, trans):
+        # x: (B, N, k) -> (B, 64, N)
         x = x.transpose(2, 1)  # -> (B, k, N)
-
-        trans = self.tnet(x)
         x = torch.bmm(trans, x)
+        return F.relu(self.conv1(x))
 
-        x = F.relu(self.conv1(x))
-        local_feat = x
-
-        x = F.relu(self.conv2(x))
+    def pool(self, local_feat):
+        # (B, 64, N) -> max-pooled global feature (B, 1024, 1)
+        x = F.relu(self.conv2(local_feat))
         x = F.relu(self.conv3(x))
+        return torch.max(x, 2, keepdim=True)[0]
+
+    def encode(self, x, trans=None, tnet_points=None):
+        """
+        x: (B, N, k) -> (trans, global_feat): the parts of forward() that
+        depend on the whole cloud. Passing both back to forward() with a
+        subset of the points runs only the local-feature and head layers.
+        """
+        if trans is None:
+            trans = self.input_transform(x, tnet_points)
+        return trans, self.pool(self.local_features(x, trans))
+
+    def forward(self, x, trans=None, tnet_points=None, global_feat=None):
+        # x: (B, N, k)
+        # trans: optional precomputed (B, k, k) transform, e.g. one per scene
+        # tnet_points: estimate the transform from this many points only
+        # global_feat: optional precomputed (B, 1024, 1) feature, see encode()
+        if trans is None:
+            trans = self.input_transform(x, tnet_points)
 
-        global_feat = torch.max(x, 2, keepdim=True)[0]
-        global_feat = global_feat.repeat(1, 1, local_feat.size(2))
+        local_feat = self.local_features(x, trans)
+        if global_feat is None:
+            global_feat = self.pool(local_feat)
+        global_feat = global_feat.expand(-1, -1, local_feat.size(2))
 
         x = torch.cat([local_feat, global_feat], dim=1)
 
@@ -83,3 +119,14 @@ class PointNetSegLite(nn.Module):
         x = self.conv7(x)
 
         return x  # (B, num_classes, N)
+
+    def profile(self, x):
+        """
+        Forward pass with per-module timing / FLOPs / activation size.
+        Returns (logits, ModelProfiler); see models/profiling.py.
+        """
+        from models.profiling import ModelProfiler
+
+        with ModelProfiler(self, name="PointNetSegLite") as prof:
+            out = self(x)
+        return out, prof
@@ -0,0 +1,161 @@
+"""
+Opt-in layer-level profiling for PointNetSegLite / TNetLite.
+
+    with ModelProfiler(model) as prof:
+        model(x)
+    print(prof.table())
+    prof.save_trace("trace.json")     # chrome://tracing, Perfetto, speedscope
+
+Forward pre/post hooks on every module record wall time (total and self,
+i.e. minus child modules), FLOPs of Conv1d/Linear layers (summed into
+their parents) and the size of each module's output activation. Only
+forwards from the thread that opened the profiler are recorded, so a
+shared model can be profiled while it serves other requests. Hooks are
+removed on exit.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import torch
+import torch.nn as nn
+
+
+def module_flops(module, inp, out):
+    """
+    FLOPs (2 x multiply-accumulates) of one call; 0 for layers we do not model.
+    """
+    if isinstance(module, nn.Conv1d):
+        k = module.kernel_size[0]
+        return 2 * out.numel() * (module.in_channels // module.groups) * k
+    if isinstance(module, nn.Linear):
+        return 2 * out.numel() * module.in_features
+    return 0
+
+
+def _nbytes(out):
+    if torch.is_tensor(out):
+        return out.numel() * out.element_size()
+    if isinstance(out, (tuple, list)):
+        return sum(_nbytes(o) for o in out)
+    return 0
+
+
+class ModelProfiler:
+    def __init__(self, model, name="model"):
+        self.model = model
+        self.name = name
+        self.events = []          # (qualified name, depth, start_s, dur_s, flops, act_bytes)
+        self.stats = OrderedDict()
+        self._handles = []
+        self._stack = []
+        self._thread = None
+        self._t0 = None
+        self._sync = torch.cuda.synchronize if torch.cuda.is_available() else (lambda: None)
+
+    # -------------------------------------------------------
+
+    def __enter__(self):
+        self._thread = threading.get_ident()
+        self._t0 = time.perf_counter()
+        for qname, module in self.model.named_modules():
+            qname = qname or self.name
+            self._handles.append(module.register_forward_pre_hook(self._pre(qname)))
+            self._handles.append(module.register_forward_hook(self._post(qname)))
+        return self
+
+    def __exit__(self, *exc):
+        for h in self._handles:
+            h.remove()
+        self._handles.clear()
+        return False
+
+    def _pre(self, qname):
+        def hook(module, inp):
+            if threading.get_ident() != self._thread:
+                return
+            self._sync()
+            self._stack.append([qname, time.perf_counter(), 0.0, 0])
+        return hook
+
+    def _post(self, qname):
+        def hook(module, inp, out):
+            if threading.get_ident() != self._thread or not self._stack:
+                return
+            self._sync()
+            end = time.perf_counter()
+            _, start, child_time, child_flops = self._stack.pop()
+            dur = end - start
+            # FLOPs are inclusive: a T-Net reports the sum of its layers
+            flops = module_flops(module, inp, out) + child_flops
+            if self._stack:
+                self._stack[-1][2] += dur
+                self._stack[-1][3] += flops
+
+            act = _nbytes(out)
+            self.events.append((qname, len(self._stack), start - self._t0, dur, flops, act))
+
+            s = self.stats.setdefault(qname, {
+                "type": type(module).__name__, "calls": 0, "total_s": 0.0,
+                "self_s": 0.0, "flops": 0, "act_bytes": 0,
+            })
+            s["calls"] += 1
+            s["total_s"] += dur
+            s["self_s"] += dur - child_time
+            s["flops"] += flops
+            s["act_bytes"] = max(s["act_bytes"], act)
+        return hook
+
+    # -------------------------------------------------------
+
+    def root_seconds(self):
+        root = self.stats.get(self.name)
+        return root["total_s"] if root else 0.0
+
+    def summary(self):
+        """
+        Rows sorted by total time. The root row's self time is everything
+        outside submodules (bmm, max-pool, concat, repeat, ...).
+        """
+        total = self.root_seconds() or 1e-12
+        rows = []
+        for qname, s in self.stats.items():
+            rows.append({
+                "module": qname,
+                "type": s["type"],
+                "calls": s["calls"],
+                "total_ms": round(s["total_s"] * 1000, 3),
+                "self_ms": round(s["self_s"] * 1000, 3),
+                "pct": round(100 * s["total_s"] / total, 1),
+                "gflops": round(s["flops"] / 1e9, 3),
+                "act_mb": round(s["act_bytes"] / 2 ** 20, 2),
+            })
+        rows.sort(key=lambda r: -r["total_ms"])
+        return rows
+
+    def table(self):
+        lines = [f"{'module':<16} {'type':<15} {'calls':>5} {'total ms':>10} {'self ms':>10} "
+                 f"{'%':>6} {'GFLOPs':>9} {'act MB':>9}"]
+        for r in self.summary():
+            lines.append(f"{r['module']:<16} {r['type']:<15} {r['calls']:>5} {r['total_ms']:>10.2f} "
+                         f"{r['self_ms']:>10.2f} {r['pct']:>6.1f} {r['gflops']:>9.2f} {r['act_mb']:>9.1f}")
+        return "\n".join(lines)
+
+    def trace(self):
+        """
+        Chrome trace events ("X" complete events, microseconds). Nesting
+        follows the module tree, so it renders as a flame graph.
+        """
+        events = [{
+            "name": qname, "cat": "module", "ph": "X", "pid": 0, "tid": 0,
+            "ts": round(start * 1e6, 3), "dur": round(dur * 1e6, 3),
+            "args": {"flops": flops, "act_bytes": act, "depth": depth},
+        } for qname, depth, start, dur, flops, act in self.events]
+        events.sort(key=lambda e: (e["ts"], -e["dur"]))
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_trace(self, path):
+        with open(path, "w") as fh:
+            json.dump(self.trace(), fh)
@@ -17,17 +17,25 @@ Then run:
 
     cd backend
     python preprocess_3dses.py
+    python preprocess_3dses.py --format lsc   # compressed columnar scans, see scan_format.py
 """
 
+import argparse
 import glob
 import shutil
 from sklearn.model_selection import train_test_split
+from class_index import build_class_index, index_path, save_class_index
 from config import DATA_RAW, DATA_PROCESSED
+from scan_format import open_scan, write_scan
 
 RAW_NPZ_DIR = DATA_RAW / "3dses_npz"
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--format", choices=("npz", "lsc"), default="npz", help="format of the processed scans")
+    args = parser.parse_args()
+
     DATA_PROCESSED.mkdir(parents=True, exist_ok=True)
     files = sorted(glob.glob(str(RAW_NPZ_DIR / "*.npz")))
     if not files:
@@ -40,10 +48,19 @@ def main():
     train_files, val_files = train_test_split(train_files, test_size=0.1, random_state=42)
 
     def copy_split(split, split_files):
+        dsts = []
         for i, src in enumerate(split_files):
-            dst = DATA_PROCESSED / f"{split}_{i:04d}.npz"
-            shutil.copy2(src, dst)
-        print(f"{split}: {len(split_files)} files")
+            dst = DATA_PROCESSED / f"{split}_{i:04d}.{args.format}"
+            if args.format == "npz":
+                shutil.copy2(src, dst)
+            else:
+                with open_scan(src) as data:
+                    write_scan(dst, data["points"], data["labels"])
+            dsts.append(str(dst))
+        # per-block class histograms for train_seg.py --balanced
+        index = build_class_index(dsts)
+        save_class_index(index_path(DATA_PROCESSED, split), index)
+        print(f"{split}: {len(split_files)} files, {len(index['block'])} blocks")
 
     copy_split("train", train_files)
     copy_split("val", val_files)
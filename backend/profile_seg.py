@@ -0,0 +1,59 @@
+"""
+Layer-level profile of PointNetSegLite at chosen point counts.
+
+    cd backend
+    python profile_seg.py --points 50000 1000000 --trace_dir profiles/
+
+Prints a per-module table (total/self time, FLOPs, activation size) for
+each N, the share of the T-Net in the whole forward, and optionally writes
+a Chrome trace per N (open in chrome://tracing, Perfetto or speedscope).
+"""
+
+import argparse
+from pathlib import Path
+
+import torch
+
+from config import CHECKPOINT_DIR, NUM_CLASSES
+from models.pointnet import PointNetSegLite
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, nargs="+", default=[4096, 50000, 500000])
+    parser.add_argument("--trace_dir", default=None, help="write trace_<N>.json here")
+    parser.add_argument("--warmup", type=int, default=1)
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = PointNetSegLite(num_classes=NUM_CLASSES, input_dim=7).to(device).eval()
+    ckpt = CHECKPOINT_DIR / "pointnet_3dses_best.pth"
+    if ckpt.exists():
+        model.load_state_dict(torch.load(ckpt, map_location=device))
+
+    if args.trace_dir:
+        Path(args.trace_dir).mkdir(parents=True, exist_ok=True)
+
+    for n in args.points:
+        x = torch.rand((1, n, 7), device=device)
+        with torch.no_grad():
+            for _ in range(args.warmup):
+                model(x)
+            _, prof = model.profile(x)
+
+        total = prof.root_seconds()
+        tnet = prof.stats["tnet"]
+        print(f"\n=== N = {n:,}  forward {total * 1000:.1f} ms ===")
+        print(prof.table())
+        root = prof.stats[prof.name]
+        print(f"T-Net: {100 * tnet['total_s'] / total:.1f}% of time, "
+              f"{tnet['flops'] / 1e9:.2f} of {root['flops'] / 1e9:.2f} GFLOPs")
+
+        if args.trace_dir:
+            path = Path(args.trace_dir) / f"trace_{n}.json"
+            prof.save_trace(path)
+            print("Trace saved to", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Scan-to-map registration so scans can be fused without external poses.
+
+Each scan (points in its sensor frame) is aligned to a world-frame cloud
+fused from the previous scans with point-to-plane ICP, coarse to fine
+over voxel-downsampled clouds:
+
+    smap = ScanMap()
+    reg = smap.integrate(points, labels)       # first scan defines the world frame
+    reg = smap.integrate(points2, labels2)     # -> reg["pose"] (4x4 scan -> world)
+    smap.points, smap.labels                   # fused cloud for build_layers()
+
+The scan is voxel-downsampled once at the map voxel; the coarser ICP
+levels are built from that cloud, never from the raw points. Per level
+the target cloud, its cKDTree and its normals are cached until the map
+changes. ICP starts from the previous scan's pose (consecutive scans
+move little) or from an explicit initial guess.
+"""
+
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+MAP_VOXEL = 0.05                 # m, resolution of the fused cloud
+ICP_VOXELS = (0.4, 0.2, 0.1)     # m, coarse -> fine
+MAX_ITERATIONS = 30              # per level
+MAX_SOURCE_POINTS = 20000        # per level; more points barely change the pose
+MIN_FITNESS = 0.3                # share of scan points with a match; below -> not fused
+
+
+def voxel_downsample(points, voxel):
+    """
+    -> (centroids (M,3) float32, inverse (N,) index of each point's voxel).
+    """
+    if len(points) == 0:
+        return np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=np.int64)
+    keys = np.floor(points / voxel).astype(np.int64)
+    keys -= keys.min(axis=0)
+    dims = keys.max(axis=0) + 1
+    flat = (keys[:, 0] * dims[1] + keys[:, 1]) * dims[2] + keys[:, 2]
+    _, inverse, counts = np.unique(flat, return_inverse=True, return_counts=True)
+    m = len(counts)
+    sums = np.stack([np.bincount(inverse, weights=points[:, i], minlength=m) for i in range(3)], axis=1)
+    return (sums / counts[:, None]).astype(np.float32), inverse
+
+
+def last_per_voxel(values, inverse, m):
+    """
+    Value of the last point falling in each of the m voxels.
+    """
+    last = np.zeros(m, dtype=np.int64)
+    np.maximum.at(last, inverse, np.arange(len(inverse)))
+    return values[last]
+
+
+def voxel_normals(points, cloud, voxel):
+    """
+    Normal of each `cloud` point from the covariance of the `points` in
+    its voxel (smallest eigenvector). Voxels with fewer than 3 points get
+    a zero normal, which drops their matches from the ICP solve. Moments
+    are bincounts over the voxels, so no neighbour search is needed.
+    """
+    both = np.concatenate([points, cloud])
+    keys = np.floor(both / voxel).astype(np.int64)
+    keys -= keys.min(axis=0)
+    dims = keys.max(axis=0) + 1
+    flat = (keys[:, 0] * dims[1] + keys[:, 1]) * dims[2] + keys[:, 2]
+    _, inverse = np.unique(flat, return_inverse=True)
+    cell, query = inverse[:len(points)], inverse[len(points):]
+    m = inverse.max() + 1
+
+    n = np.bincount(cell, minlength=m).astype(np.float64)
+    safe = np.maximum(n, 1)[:, None]
+    mean = np.stack([np.bincount(cell, weights=points[:, i], minlength=m) for i in range(3)], axis=1) / safe
+    cov = np.empty((m, 3, 3))
+    for i in range(3):
+        for j in range(i, 3):
+            cov[:, i, j] = cov[:, j, i] = (
+                np.bincount(cell, weights=points[:, i] * points[:, j], minlength=m) / safe[:, 0]
+                - mean[:, i] * mean[:, j])
+    normals = np.linalg.eigh(cov)[1][:, :, 0]
+    normals[n < 3] = 0
+    return normals[query].astype(np.float32)
+
+
+def rotation(w):
+    """
+    Rotation matrix of the axis-angle vector w (Rodrigues).
+    """
+    theta = np.linalg.norm(w)
+    if theta < 1e-12:
+        return np.eye(3)
+    kx, ky, kz = w / theta
+    K = np.array([[0, -kz, ky], [kz, 0, -kx], [-ky, kx, 0]])
+    return np.eye(3) + np.sin(theta) * K + (1 - np.cos(theta)) * K @ K
+
+
+def transform(points, pose):
+    return (points @ pose[:3, :3].T.astype(np.float32) + pose[:3, 3].astype(np.float32)).astype(np.float32)
+
+
+class _Target:
+    """
+    One ICP level of the map: cloud, KD-tree and normals.
+    """
+
+    def __init__(self, points, normals):
+        self.points = points
+        self.tree = cKDTree(points)
+        self.normals = normals
+
+
+def icp_point_to_plane(source, target, pose, max_dist, iterations=MAX_ITERATIONS, tol=1e-4):
+    """
+    Refines `pose` (4x4, source -> target frame) by minimising the
+    point-to-plane distance of matches closer than max_dist.
+    -> (pose, fitness, rmse, iterations run)
+    """
+    R, t = pose[:3, :3].copy(), pose[:3, 3].copy()
+    fitness, rmse = 0.0, float("inf")
+    for it in range(1, iterations + 1):
+        p = source @ R.T + t
+        dist, j = target.tree.query(p, distance_upper_bound=max_dist)
+        ok = np.isfinite(dist)
+        fitness = ok.mean()
+        if ok.sum() < 6:
+            break
+        p, q, n = p[ok], target.points[j[ok]], target.normals[j[ok]]
+        r = np.einsum("ij,ij->i", p - q, n)
+        rmse = float(np.sqrt(np.mean(r * r)))
+
+        # r(w, dt) ~ r + w.(p x n) + dt.n for a small rotation w
+        A = np.hstack([np.cross(p, n), n])
+        x = np.linalg.lstsq(A.T @ A, -A.T @ r, rcond=None)[0]
+        dR = rotation(x[:3])
+        R, t = dR @ R, dR @ t + x[3:]
+        if np.linalg.norm(x) < tol:
+            break
+
+    out = np.eye(4)
+    out[:3, :3], out[:3, 3] = R, t
+    return out, float(fitness), rmse, it
+
+
+class ScanMap:
+    """
+    World-frame cloud (MAP_VOXEL centroids + the label of the latest
+    point per voxel) and the pose of every fused scan.
+    """
+
+    def __init__(self, voxel=MAP_VOXEL, levels=ICP_VOXELS, min_fitness=MIN_FITNESS):
+        self.voxel = voxel
+        self.levels = tuple(levels)
+        self.min_fitness = min_fitness
+        self.points = np.zeros((0, 3), dtype=np.float32)
+        self.labels = np.zeros((0,), dtype=np.uint8)
+        self.poses = []
+        self._targets = {}    # voxel -> _Target, dropped whenever the map changes
+
+    @property
+    def empty(self):
+        return len(self.points) == 0
+
+    def downsample(self, points, labels):
+        cloud, inverse = voxel_downsample(np.asarray(points, dtype=np.float32), self.voxel)
+        return cloud, last_per_voxel(np.asarray(labels, dtype=np.uint8), inverse, len(cloud))
+
+    def _target(self, voxel):
+        target = self._targets.get(voxel)
+        if target is None:
+            cloud = voxel_downsample(self.points, voxel)[0]
+            # normals over 2x the voxel: enough map points per cell for a plane fit
+            target = self._targets[voxel] = _Target(cloud, voxel_normals(self.points, cloud, 2 * voxel))
+        return target
+
+    def register(self, cloud, init=None):
+        """
+        cloud: scan at the map voxel (see downsample), scan frame.
+        -> {"pose", "fitness", "rmse", "iterations"} against the current map.
+        """
+        pose = np.array(init if init is not None else (self.poses[-1] if self.poses else np.eye(4)), dtype=np.float64)
+        iterations = 0
+        fitness, rmse = 0.0, float("inf")
+        for voxel in self.levels:
+            source = voxel_downsample(cloud, voxel)[0] if voxel > self.voxel else cloud
+            source = source[::-(-len(source) // MAX_SOURCE_POINTS)]
+            pose, fitness, rmse, n = icp_point_to_plane(source, self._target(voxel), pose, max_dist=2.5 * voxel)
+            iterations += n
+        return {"pose": pose, "fitness": fitness, "rmse": rmse, "iterations": iterations}
+
+    def add(self, cloud, labels, pose):
+        points = np.concatenate([self.points, transform(cloud, pose)])
+        labels = np.concatenate([self.labels, labels])
+        self.points, inverse = voxel_downsample(points, self.voxel)
+        self.labels = last_per_voxel(labels, inverse, len(self.points))
+        self.poses.append(np.asarray(pose, dtype=np.float64))
+        self._targets.clear()
+
+    def integrate(self, points, labels, init=None):
+        """
+        Registers a scan (N,3) and fuses it when the alignment is good
+        enough. The first scan is placed at `init` (default identity).
+        -> registration result plus "fused" and "seconds".
+        """
+        t0 = time.perf_counter()
+        cloud, cloud_labels = self.downsample(points, labels)
+        if self.empty:
+            reg = {"pose": np.array(init if init is not None else np.eye(4), dtype=np.float64),
+                   "fitness": 1.0, "rmse": 0.0, "iterations": 0}
+        else:
+            reg = self.register(cloud, init)
+
+        reg["fused"] = reg["fitness"] >= self.min_fitness
+        if reg["fused"]:
+            self.add(cloud, cloud_labels, reg["pose"])
+        reg["seconds"] = time.perf_counter() - t0
+        return reg
+
+    def state_dict(self):
+        return {
+            "points": self.points,
+            "labels": self.labels,
+            "poses": np.array(self.poses, dtype=np.float64).reshape(-1, 4, 4),
+        }
+
+    def load_state_dict(self, state):
+        self.points = np.asarray(state["points"], dtype=np.float32)
+        self.labels = np.asarray(state["labels"], dtype=np.uint8)
+        self.poses = list(np.asarray(state["poses"], dtype=np.float64))
+        self._targets.clear()
+        return self
@@ -45,22 +45,48 @@ class MapEnv:
         self.steps = 0
         return self.grid.copy()
 
-    def load_from_occ(self, occ):
+    def load_from_occ(self, occ, state=None, start=None, goal=None):
+        """
+        state: optional three-state grid (-1 unknown, 0 free, 1 occupied,
+               see mapping.py); unknown cells are treated as obstacles
+               instead of free space.
+        start: agent cell (x, y), default the (0, 0) corner.
+        goal: goal cell (x, y), default the opposite corner.
+        """
         g = np.zeros_like(occ, dtype=np.int32)
         g[occ == 1] = 1
+        if state is not None:
+            g[state < 0] = 1
         self.grid_size = g.shape[0]
         self.grid = g
-        self.agent_pos = [0, 0]
-        self.goal_pos = [self.grid_size - 1, self.grid_size - 1]
+        self.agent_pos = [0, 0] if start is None else [int(start[0]), int(start[1])]
+        self.goal_pos = [self.grid_size - 1] * 2 if goal is None else [int(goal[0]), int(goal[1])]
         self.grid[self.goal_pos[1], self.goal_pos[0]] = 2
         self.grid[self.agent_pos[1], self.agent_pos[0]] = 3
         self.steps = 0
         return self.grid.copy()
 
-    def step(self, action):
+    def set_goal(self, goal):
+        """
+        Moves the goal to cell goal = (x, y), e.g. the next exploration
+        frontier (exploration.py); the agent stays where it is.
+        """
+        x, y = int(goal[0]), int(goal[1])
+        if not (0 <= x < self.grid.shape[1] and 0 <= y < self.grid.shape[0]):
+            raise ValueError(f"goal {goal} outside the grid")
+        gx, gy = self.goal_pos
+        if self.grid[gy, gx] == 2:
+            self.grid[gy, gx] = 0
+        self.goal_pos = [x, y]
+        if [x, y] != list(self.agent_pos):
+            self.grid[y, x] = 2
+        self.steps = 0
+        return self.grid.copy()
+
+    def step(self, action, copy=True):
         # 0=up,1=down,2=left,3=right
         self.steps += 1
-        y, x = self.agent_pos
+        x, y = self.agent_pos
         self.grid[y, x] = 0
         if action == 0 and y > 0:
             y -= 1
@@ -85,31 +111,93 @@ class MapEnv:
         self.grid[y, x] = 3
         if self.steps >= self.grid_size * self.grid_size:
             done = True
-        return self.grid.copy(), reward, done
+        return (self.grid.copy() if copy else self.grid), reward, done
+
+    def state_dict(self):
+        return {
+            "grid": self.grid.copy(),
+            "agent_pos": np.array(self.agent_pos, dtype=np.int64),
+            "goal_pos": np.array(self.goal_pos, dtype=np.int64),
+            "steps": np.int64(self.steps),
+        }
+
+    def load_state_dict(self, state):
+        self.grid = np.array(state["grid"], dtype=np.int32)
+        self.grid_size = self.grid.shape[0]
+        self.agent_pos = [int(v) for v in state["agent_pos"]]
+        self.goal_pos = [int(v) for v in state["goal_pos"]]
+        self.steps = int(state["steps"])
+        return self.grid.copy()
 
 
 class SimpleRLAgent:
-    def __init__(self, device=None):
+    """
+    q_net: optional shared DQN, so many agents (one per session) can
+           step with the same weights.
+    """
+    def __init__(self, device=None, q_net=None):
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         self.env = MapEnv()
-        self.q_net = DQN(self.env.grid_size, 4).to(self.device)
+        self.q_net = q_net if q_net is not None else DQN(self.env.grid_size, 4).to(self.device)
         self.state = self.env.reset_random()
 
     def reset_random(self):
         self.state = self.env.reset_random()
         return self.state
 
-    def reset_from_occ(self, occ):
-        self.state = self.env.load_from_occ(occ)
+    def reset_from_occ(self, occ, state=None, start=None, goal=None):
+        self.state = self.env.load_from_occ(occ, state, start, goal)
         return self.state
-    def step(self, epsilon=0.2):
-        st = torch.from_numpy(self.state).float().unsqueeze(0).to(self.device)
+
+    def set_goal(self, goal):
+        self.state = self.env.set_goal(goal)
+        return self.state
+
+    def select_action(self, st, epsilon):
         with torch.no_grad():
-            q = self.q_net(st)[0].cpu().numpy()
+            q = self.q_net(st)[0]
         if random.random() < epsilon:
-            action = random.randint(0, 3)
-        else:
-            action = int(np.argmax(q))
+            return random.randint(0, 3)
+        return int(q.argmax())
+
+    def rollout(self, max_steps=None, epsilon=0.2):
+        """
+        Runs up to max_steps (default: until the episode ends) on the server.
+
+        Returns a compact trajectory instead of per-step grids:
+          actions   : [a_1, ..., a_T]
+          positions : [[x, y] after each step]
+          rewards   : [r_1, ..., r_T]
+          done      : episode finished
+        """
+        env = self.env
+        if max_steps is None:
+            max_steps = env.grid_size * env.grid_size
+
+        # Keep the observation on-device and patch the two cells that change
+        st = torch.from_numpy(self.state).float().unsqueeze(0).to(self.device)
+        actions, positions, rewards = [], [], []
+        done = False
+        for _ in range(max_steps):
+            action = self.select_action(st, epsilon)
+            x0, y0 = env.agent_pos
+            _, reward, done = env.step(action, copy=False)
+            x1, y1 = env.agent_pos
+            st[0, y0, x0] = float(env.grid[y0, x0])
+            st[0, y1, x1] = float(env.grid[y1, x1])
+
+            actions.append(action)
+            positions.append([x1, y1])
+            rewards.append(float(reward))
+            if done:
+                break
+
+        self.state = env.grid.copy()
+        return {"actions": actions, "positions": positions, "rewards": rewards, "done": done}
+
+    def step(self, epsilon=0.2):
+        st = torch.from_numpy(self.state).float().unsqueeze(0).to(self.device)
+        action = self.select_action(st, epsilon)
         ns, reward, done = self.env.step(action)
         self.state = ns
         return ns, reward, done, action
@@ -0,0 +1,171 @@
+"""
+CPU budget of an API worker process for torch inference.
+
+Left alone, every uvicorn worker runs torch with one thread per core, so
+N workers on one host oversubscribe the CPU N times over and tail
+latency becomes unpredictable. Configured from config.py (environment):
+
+    WEB_CONCURRENCY         workers on the host (also uvicorn's default for --workers)
+    TORCH_THREADS           intra-op threads per worker; "auto" = the worker's
+                            cores / WEB_CONCURRENCY (its own cores when pinned,
+                            torch's default for a single worker), 0 = torch default
+    TORCH_INTEROP_THREADS   inter-op threads per worker, 0 = torch default
+    CPU_AFFINITY            "" = no pinning, "auto" = each worker gets its own
+                            slice of the cores, or a CPU list such as "0-3,8"
+
+configure() runs at `import api`, before torch is imported, so the
+OpenMP / MKL thread variables still take effect; apply_torch() sets the
+torch thread counts when torch is first used (model_loader.get_device()).
+The allocator has to be chosen before the process starts: serve.py
+preloads jemalloc / tcmalloc and starts uvicorn, sweep_threads.py
+measures which setting is best on the current host.
+"""
+
+import os
+import sys
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_settings = None
+_slot_lock = None    # open lock file holding this worker's affinity slot
+
+
+def parse_cpus(spec):
+    """
+    "0-3,8" -> [0, 1, 2, 3, 8]
+    """
+    cpus = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        lo, _, hi = part.partition("-")
+        cpus.update(range(int(lo), int(hi or lo) + 1))
+    return sorted(cpus)
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def claim_slot(workers):
+    """
+    Index of this worker among the `workers` started by the same parent
+    (uvicorn's supervisor), via one lock file per slot. A restarted
+    worker takes over the slot of the one that died.
+    """
+    global _slot_lock
+    if fcntl is None:
+        return os.getpid() % workers
+    for slot in range(workers):
+        path = os.path.join(tempfile.gettempdir(), f"lidar-api-{os.getppid()}-{slot}.lock")
+        fh = open(path, "w")
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            continue
+        _slot_lock = fh
+        return slot
+    return os.getpid() % workers
+
+
+def slot_cpus(cpus, slot, workers):
+    """
+    Slot `slot` of `workers` disjoint slices of `cpus` (shared round-robin
+    when there are more workers than cores).
+    """
+    per = max(len(cpus) // workers, 1)
+    start = (slot * per) % len(cpus)
+    return cpus[start:start + per]
+
+
+def configure(workers=1, threads="auto", interop_threads=0, affinity="", slot=None):
+    """
+    Pins this process (affinity) and decides its thread counts. Returns
+    the settings; they are applied to torch by apply_torch().
+    """
+    global _settings
+    workers = max(int(workers), 1)
+    cpus = available_cpus()
+    pinned = None
+    if affinity:
+        if affinity == "auto":
+            if slot is None:
+                slot = claim_slot(workers)
+            pinned = slot_cpus(cpus, slot, workers)
+        else:
+            pinned = parse_cpus(affinity)
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, pinned)
+        else:
+            print("[WARN] CPU_AFFINITY is not supported on this platform.")
+            pinned = None
+
+    if threads in ("auto", "", None):
+        if pinned:
+            threads = len(pinned)
+        else:   # a single unpinned worker keeps torch's default (physical cores)
+            threads = max(len(cpus) // workers, 1) if workers > 1 else 0
+    threads = int(threads)
+    if threads > 0:
+        # read by OpenMP / MKL when torch is imported
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+        os.environ["MKL_NUM_THREADS"] = str(threads)
+        if "torch" in sys.modules:
+            print("[WARN] torch was imported before runtime.configure(); thread env vars have no effect.")
+
+    _settings = {
+        "workers": workers,
+        "slot": slot,
+        "threads": threads,
+        "interop_threads": int(interop_threads),
+        "cpus": pinned,
+    }
+    return _settings
+
+
+def apply_torch():
+    """
+    Sets torch's thread counts to the configured ones. No-op unless
+    configure() ran (scripts keep torch's defaults).
+    """
+    if _settings is None:
+        return
+    import torch
+
+    if _settings["threads"] > 0:
+        torch.set_num_threads(_settings["threads"])
+    if _settings["interop_threads"] > 0:
+        try:
+            torch.set_num_interop_threads(_settings["interop_threads"])
+        except RuntimeError:  # only allowed before any inter-op parallel work
+            print("[WARN] torch inter-op threads already started; TORCH_INTEROP_THREADS ignored.")
+
+
+def allocator():
+    """
+    Preloaded allocator library (serve.py --malloc), None = system malloc.
+    """
+    for lib in os.environ.get("LD_PRELOAD", "").replace(":", " ").split():
+        name = os.path.basename(lib)
+        if "jemalloc" in name or "tcmalloc" in name:
+            return name
+    return None
+
+
+def describe():
+    out = dict(_settings or {})
+    out["allocator"] = allocator()
+    torch = sys.modules.get("torch")
+    # skip while a warm-up thread is still importing it (partially initialised)
+    if torch is not None and hasattr(torch, "get_num_interop_threads"):
+        out["torch_threads"] = torch.get_num_threads()
+        out["torch_interop_threads"] = torch.get_num_interop_threads()
+    return out
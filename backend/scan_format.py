@@ -0,0 +1,353 @@
+"""
+Compressed, columnar scan format (.lsc) with per-column dtypes and a
+chunk index for partial reads.
+
+A scan [x, y, z, r, g, b, intensity, ...] + labels is cut into
+chunk_size x chunk_size m columns on its own xy grid (origin = the
+scan's xy minimum, as in class_index.py, so with chunk_size = BLOCK_SIZE
+a training block is one chunk). Every (chunk, column) pair is one
+zlib-compressed block, so a reader fetches only the columns and chunks
+it needs:
+
+    xyz      quantized to `precision` (default 1 mm) relative to the
+             chunk's minimum corner, uint16 (uint32 for chunks > 65 m)
+    features integers in 0..255 / 0..65535 are stored as uint8 / uint16
+             as they are; other values are quantized to uint16 over the
+             column's range
+    labels   uint8 (int32 if outside 0..255)
+
+Layout: b"LSCN" + version byte, u32 header length, JSON header, blocks.
+The header holds the column dtypes / scale / offset and, per chunk, its
+grid key, point count, bounds and (offset, length) of each block.
+Points are stored chunk by chunk, in their original order within a chunk;
+unless that is the scan's order already, every chunk also has a "rows"
+block (its points' original row indices, delta-coded), and full reads
+(data["points"], data["labels"], read() without region / chunks) put
+the points back in their original order. Partial reads are chunk by chunk.
+
+    write_scan("scan.lsc", points, labels)
+    with open_scan("scan.lsc") as data:              # or a .npz, same interface
+        points, labels = data["points"], data["labels"]
+    with ScanFile("scan.lsc") as scan:
+        xyz = scan.read(["x", "y", "z"], region=(0, 0, 3, 3))   # overlapping chunks only
+"""
+
+import glob
+import io
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from config import BLOCK_SIZE
+
+MAGIC = b"LSCN"
+VERSION = 2          # 2: "rows" blocks (original row order)
+SUFFIXES = (".npz", ".lsc")
+FEATURE_NAMES = ("x", "y", "z", "r", "g", "b", "intensity")
+
+
+def feature_names(num_features):
+    return [FEATURE_NAMES[i] if i < len(FEATURE_NAMES) else f"f{i}" for i in range(num_features)]
+
+
+def _encode(values):
+    """
+    Byte-shuffled (all first bytes, then all second bytes, ...) and
+    compressed: multi-byte integers compress much better that way.
+    """
+    raw = np.ascontiguousarray(values)
+    if raw.itemsize > 1:
+        raw = raw.view(np.uint8).reshape(-1, raw.itemsize).T
+    return raw.tobytes()
+
+
+def _decode(buf, dtype, count):
+    dtype = np.dtype(dtype)
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    if dtype.itemsize == 1:
+        return raw
+    out = np.empty((count, dtype.itemsize), dtype=np.uint8)
+    for i in range(dtype.itemsize):   # one strided copy per byte plane beats a transpose
+        out[:, i] = raw[i * count:(i + 1) * count]
+    return out.view(dtype).reshape(count)
+
+
+def _feature_column(values):
+    """
+    -> (dtype, scale, offset) storing `values` as offset + scale * stored.
+    """
+    lo, hi = (float(values.min()), float(values.max())) if len(values) else (0.0, 0.0)
+    if lo >= 0 and np.array_equal(values, np.round(values)):
+        if hi < 256:
+            return "uint8", 1.0, 0.0
+        if hi < 65536:
+            return "uint16", 1.0, 0.0
+    return "uint16", (hi - lo) / 65535 or 1.0, lo
+
+
+def write_scan(path, points, labels=None, chunk_size=BLOCK_SIZE, precision=0.001, level=6):
+    """
+    Writes an (N, F) scan (F >= 3) and optional (N,) labels to `path`
+    (a file name or a binary file object).
+    """
+    points = np.asarray(points)
+    n, f = points.shape
+    names = feature_names(f)
+    xy = points[:, :2].astype(np.float64)
+    origin = xy.min(axis=0) if n else np.zeros(2)
+    keys = np.floor((xy - origin) / chunk_size).astype(np.int64)
+    cols = int(keys[:, 0].max()) + 1 if n else 1
+    flat = keys[:, 1] * cols + keys[:, 0]
+    order = np.argsort(flat, kind="stable")
+    uniq, starts = np.unique(flat[order], return_index=True)
+    ends = np.append(starts[1:], n)
+    row_order = not np.array_equal(order, np.arange(n))
+    rows_dtype = "uint32" if n < 2 ** 32 else "uint64"
+
+    columns = []
+    xyz_extent = 0.0
+    mins = []
+    for s, e in zip(starts, ends):
+        idx = order[s:e]
+        lo = points[idx, :3].astype(np.float64).min(axis=0)
+        mins.append(lo)
+        xyz_extent = max(xyz_extent, float((points[idx, :3].max(axis=0) - lo).max()))
+    xyz_dtype = "uint16" if round(xyz_extent / precision) < 65536 else "uint32"
+    for i, name in enumerate(names):
+        if i < 3:
+            columns.append({"name": name, "dtype": xyz_dtype, "scale": precision, "offset": None})
+        else:
+            dtype, scale, offset = _feature_column(points[:, i].astype(np.float64))
+            columns.append({"name": name, "dtype": dtype, "scale": scale, "offset": offset})
+    if labels is not None:
+        labels = np.asarray(labels)
+        small = len(labels) == 0 or (labels.min() >= 0 and labels.max() < 256)
+        columns.append({"name": "labels", "dtype": "uint8" if small else "int32", "scale": None, "offset": None})
+
+    chunks, blocks, pos = [], [], 0
+    for (s, e), key, lo in zip(zip(starts, ends), uniq, mins):
+        idx = order[s:e]
+        pts = points[idx].astype(np.float64)
+        entry = {
+            "key": [int(key % cols), int(key // cols)],
+            "count": int(e - s),
+            "min": lo.tolist(),
+            "max": pts[:, :3].max(axis=0).tolist(),
+            "blocks": [],
+        }
+        for i, col in enumerate(columns):
+            if col["name"] == "labels":
+                values = labels[idx].astype(col["dtype"])
+            elif i < 3:
+                values = np.round((pts[:, i] - lo[i]) / precision).astype(col["dtype"])
+            else:
+                q = np.round((pts[:, i] - col["offset"]) / col["scale"])
+                values = np.clip(q, 0, np.iinfo(col["dtype"]).max).astype(col["dtype"])
+            block = zlib.compress(_encode(values), level)
+            entry["blocks"].append([pos, len(block)])
+            blocks.append(block)
+            pos += len(block)
+        if row_order:
+            # increasing within a chunk (stable sort): small deltas, first = idx[0]
+            block = zlib.compress(_encode(np.diff(idx, prepend=0).astype(rows_dtype)), level)
+            entry["rows"] = [pos, len(block)]
+            blocks.append(block)
+            pos += len(block)
+        chunks.append(entry)
+
+    header = json.dumps({
+        "version": VERSION,
+        "num_points": int(n),
+        "num_features": int(f),
+        "chunk_size": float(chunk_size),
+        "origin": origin.tolist(),
+        "row_order": rows_dtype if row_order else None,
+        "columns": columns,
+        "chunks": chunks,
+    }, separators=(",", ":")).encode()
+
+    fh = open(path, "wb") if isinstance(path, (str, os.PathLike)) else path
+    try:
+        fh.write(MAGIC + bytes([VERSION]) + struct.pack("<I", len(header)) + header)
+        for block in blocks:
+            fh.write(block)
+    finally:
+        if fh is not path:
+            fh.close()
+
+
+class ScanFile:
+    """
+    Reader for .lsc files (a path or a seekable binary file object).
+
+    Mapping-style access like np.load() of a .npz: "points" (N, F)
+    float32, "labels" (N,) int64, or a single column by name.
+    """
+
+    def __init__(self, source):
+        self._own = isinstance(source, (str, os.PathLike))
+        self._fh = open(source, "rb") if self._own else source
+        start = self._fh.tell()
+        head = self._fh.read(9)
+        if head[:4] != MAGIC:
+            raise ValueError("not an .lsc scan")
+        if head[4] > VERSION:
+            raise ValueError(f".lsc version {head[4]} is newer than this reader ({VERSION})")
+        (size,) = struct.unpack("<I", head[5:9])
+        self.header = json.loads(self._fh.read(size))
+        self._data_start = start + 9 + size
+        self.columns = {c["name"]: i for i, c in enumerate(self.header["columns"])}
+        self.features = feature_names(self.header["num_features"])
+        self.chunks = self.header["chunks"]
+        self.num_points = self.header["num_points"]
+        self.row_order = self.header.get("row_order")   # None: stored order is the original
+
+    @property
+    def files(self):
+        return ["points"] + (["labels"] if "labels" in self.columns else [])
+
+    def __contains__(self, name):
+        return name in self.files or name in self.columns
+
+    def __getitem__(self, name):
+        if name == "points":
+            out = np.empty((self.num_points, len(self.features)), dtype=np.float32)
+            self.read_points_into(out)
+            return out
+        if name not in self.columns:
+            raise KeyError(name)
+        return self.read([name])[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._own:
+            self._fh.close()
+
+    def read_points_into(self, out):
+        """
+        Decodes the first out.shape[1] features of all points into the
+        float32 (N, >= 1) array `out` (e.g. a pooled model input buffer).
+        Returns the number of features written; further columns of out
+        are left untouched.
+        """
+        k = min(out.shape[1], len(self.features))
+        names = self.features[:k]
+        if self.row_order is None:
+            self._read_into({c: out[:, i] for i, c in enumerate(names)}, range(len(self.chunks)))
+            return k
+        for ci, chunk in enumerate(self.chunks):   # decode a chunk's rows, then one row scatter
+            tmp = np.empty((chunk["count"], k), dtype=np.float32)
+            self._read_into({c: tmp[:, i] for i, c in enumerate(names)}, [ci])
+            out[self._rows(chunk), :k] = tmp
+        return k
+
+    def chunks_in(self, region):
+        """
+        Indices of the chunks whose xy bounds overlap region =
+        (xmin, ymin, xmax, ymax).
+        """
+        xmin, ymin, xmax, ymax = region
+        return [i for i, c in enumerate(self.chunks)
+                if c["max"][0] >= xmin and c["min"][0] <= xmax and c["max"][1] >= ymin and c["min"][1] <= ymax]
+
+    def read(self, columns=None, region=None, chunks=None):
+        """
+        -> {column: array} for the given columns (default: all) of the
+        given chunks (default: those overlapping `region`, else all).
+        Whole chunks are returned, chunk by chunk; filter to the exact
+        region if needed. Without region and chunks, all points are
+        returned in their original order. Features are float32, labels
+        int64.
+        """
+        columns = list(self.columns) if columns is None else list(columns)
+        restore = chunks is None and region is None
+        if chunks is None:
+            chunks = range(len(self.chunks)) if region is None else self.chunks_in(region)
+        n = sum(self.chunks[ci]["count"] for ci in chunks)
+        out = {name: np.empty(n, dtype=np.int64 if name == "labels" else np.float32) for name in columns}
+        self._read_into(out, chunks, restore)
+        return out
+
+    def _rows(self, chunk):
+        """
+        Original row indices of a chunk's points (row_order files only).
+        """
+        offset, length = chunk["rows"]
+        self._fh.seek(self._data_start + offset)
+        deltas = _decode(zlib.decompress(self._fh.read(length)), self.row_order, chunk["count"])
+        return np.cumsum(deltas, dtype=np.int64)
+
+    def _read_into(self, out, chunks, restore=False):
+        """
+        Decodes the chunks' blocks of each column in `out` straight into
+        out[column] (1-D, possibly a strided view), chunk after chunk.
+        restore=True (all chunks): into the points' original rows instead.
+        """
+        if restore and self.row_order is not None:
+            for ci in chunks:
+                chunk = self.chunks[ci]
+                tmp = {name: np.empty(chunk["count"], dtype=dst.dtype) for name, dst in out.items()}
+                self._read_into(tmp, [ci])
+                rows = self._rows(chunk)
+                for name, dst in out.items():
+                    dst[rows] = tmp[name]
+            return
+        pos = 0
+        for ci in chunks:
+            chunk = self.chunks[ci]
+            count = chunk["count"]
+            for name, dst in out.items():
+                col = self.header["columns"][self.columns[name]]
+                offset, length = chunk["blocks"][self.columns[name]]
+                self._fh.seek(self._data_start + offset)
+                q = _decode(zlib.decompress(self._fh.read(length)), col["dtype"], count)
+                view = dst[pos:pos + count]
+                if name == "labels":
+                    view[...] = q
+                    continue
+                base = chunk["min"][self.columns[name]] if col["offset"] is None else col["offset"]
+                np.multiply(q, np.float32(col["scale"]), out=view)
+                view += np.float32(base)
+            pos += count
+
+
+def open_scan(source):
+    """
+    A .npz (np.load) or .lsc (ScanFile) scan, by content; `source` is a
+    path or a binary file object. Both support `"points" in data`,
+    data["points"], data["labels"] and `with`.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fh:
+            magic = fh.read(4)
+    else:
+        pos = source.tell()
+        magic = source.read(4)
+        source.seek(pos)
+    if magic == MAGIC:
+        return ScanFile(source)
+    return np.load(source)
+
+
+def open_scan_bytes(content):
+    return open_scan(io.BytesIO(content))
+
+
+def scan_files(root_dir, split):
+    """
+    Sorted <split>_*.npz / <split>_*.lsc scans of a directory, one per
+    scene: where convert_npz_to_lsc.py left both, the .lsc is used.
+    """
+    by_stem = {}
+    for suffix in SUFFIXES:   # later suffixes take precedence
+        for p in glob.glob(os.path.join(str(root_dir), f"{split}_*{suffix}")):
+            by_stem[os.path.splitext(p)[0]] = p
+    return sorted(by_stem.values())
@@ -0,0 +1,188 @@
+"""
+Batch segmentation jobs over many scans.
+
+A job is a list of .npz / .lsc scans. Jobs run on a small local worker pool;
+inside a job the next scan is loaded on an I/O thread while the current
+one is being segmented. Labels are written next to each scan as
+`<scan>.labels.npy` (uint8, one byte per point).
+
+Progress, ETA and a throughput report (scenes/min, points/sec) are
+available from `SegJob.status()` while the job runs and after it ends.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from scan_format import open_scan
+
+
+def label_path(scan_path):
+    scan_path = Path(scan_path)
+    return scan_path.with_name(scan_path.stem + ".labels.npy")
+
+
+class SegJob:
+    def __init__(self, scenes, model=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.scenes = [Path(p) for p in scenes]
+        self.model = model
+        self.state = "queued"
+        self.current = None
+        self.done = 0
+        self.points_done = 0
+        self.bytes_total = sum(p.stat().st_size for p in self.scenes)
+        self.bytes_done = 0
+        self.results = []
+        self.errors = []
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancelled = threading.Event()
+
+    def status(self):
+        now = time.perf_counter()
+        elapsed = (self.finished or now) - self.started if self.started else 0.0
+
+        eta = None
+        if self.state == "running" and self.bytes_done > 0:
+            # Points scale with file size, so bytes give a steadier ETA than scene count
+            eta = elapsed / self.bytes_done * (self.bytes_total - self.bytes_done)
+
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "model": self.model,
+            "total": len(self.scenes),
+            "done": self.done,
+            "current": self.current,
+            "progress": round(self.bytes_done / self.bytes_total, 4) if self.bytes_total else 1.0,
+            "elapsed_s": round(elapsed, 3),
+            "eta_s": round(eta, 1) if eta is not None else None,
+            "errors": self.errors,
+            "results": self.results,
+            "report": self.report(elapsed),
+        }
+
+    def report(self, elapsed):
+        if elapsed <= 0:
+            return None
+        return {
+            "scenes": self.done,
+            "points": self.points_done,
+            "seconds": round(elapsed, 3),
+            "scenes_per_min": round(self.done / elapsed * 60, 2),
+            "points_per_sec": round(self.points_done / elapsed, 1),
+        }
+
+
+class SegJobManager:
+    """
+    model_getter: (name) -> model, called on the worker (loads lazily)
+    preprocess:   (points) -> (N,7) float32
+    infer:        (model, points (N,7), name) -> labels (N,)
+    """
+
+    def __init__(self, model_getter, preprocess, infer, workers=1, max_jobs=100):
+        self.model_getter = model_getter
+        self.preprocess = preprocess
+        self.infer = infer
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="segjob")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, scenes, model=None):
+        job = SegJob(scenes, model)
+        with self._lock:
+            self._jobs[job.id] = job
+            # keep the most recent jobs only; never drop unfinished ones
+            for jid in list(self._jobs):
+                if len(self._jobs) <= self.max_jobs:
+                    break
+                if self._jobs[jid].state not in ("queued", "running"):
+                    del self._jobs[jid]
+        self._pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.cancelled.set()
+        return job
+
+    def _load(self, path):
+        with open_scan(path) as data:
+            if "points" not in data:
+                raise ValueError("'points' missing")
+            return self.preprocess(data["points"])
+
+    def _run(self, job):
+        if job.cancelled.is_set():
+            job.state = "cancelled"
+            return
+
+        job.state = "running"
+        try:
+            model = self.model_getter(job.model)
+        except Exception as e:
+            job.errors.append({"scene": None, "error": repr(e)})
+            job.state = "failed"
+            return
+
+        # Throughput excludes the one-off model load
+        job.started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="segjob-io") as io_pool:
+            pending = io_pool.submit(self._load, job.scenes[0]) if job.scenes else None
+            for i, path in enumerate(job.scenes):
+                if job.cancelled.is_set():
+                    break
+                job.current = path.name
+                try:
+                    points = pending.result()
+                except Exception as e:
+                    points = None
+                    job.errors.append({"scene": str(path), "error": repr(e)})
+
+                # Prefetch the next scan while this one is on the model
+                if i + 1 < len(job.scenes):
+                    pending = io_pool.submit(self._load, job.scenes[i + 1])
+
+                if points is not None:
+                    try:
+                        t0 = time.perf_counter()
+                        labels = self.infer(model, points, job.model)
+                        out = label_path(path)
+                        np.save(out, labels.astype(np.uint8))
+                        job.results.append({
+                            "scene": str(path),
+                            "labels": str(out),
+                            "num_points": int(points.shape[0]),
+                            "seconds": round(time.perf_counter() - t0, 3),
+                        })
+                        job.points_done += int(points.shape[0])
+                    except Exception as e:
+                        job.errors.append({"scene": str(path), "error": repr(e)})
+
+                job.done += 1
+                job.bytes_done += path.stat().st_size
+
+        job.current = None
+        job.finished = time.perf_counter()
+        job.state = "cancelled" if job.cancelled.is_set() else "finished"
+        report = job.report(job.finished - job.started)
+        if report:
+            print(f"[INFO] Segmentation job {job.id}: {report['scenes']} scenes, "
+                  f"{report['scenes_per_min']} scenes/min, {report['points_per_sec']} points/sec")
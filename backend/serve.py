@@ -0,0 +1,81 @@
+"""
+Starts the API with a CPU budget per worker and an optional allocator.
+
+    cd backend
+    python serve.py --workers 4 --threads auto --affinity auto --malloc jemalloc -- --host 0.0.0.0 --port 8000
+
+Sets WEB_CONCURRENCY / TORCH_THREADS / TORCH_INTEROP_THREADS /
+CPU_AFFINITY for the workers (see runtime.py), preloads the allocator
+with LD_PRELOAD and replaces itself with `uvicorn api:app`; arguments
+after "--" go to uvicorn. sweep_threads.py suggests the values for the
+current host.
+"""
+
+import argparse
+import ctypes.util
+import os
+import sys
+
+ALLOCATORS = ("system", "jemalloc", "tcmalloc")
+PACKAGES = {"jemalloc": "libjemalloc2", "tcmalloc": "libgoogle-perftools4"}   # Debian / Ubuntu
+
+
+def find_allocator(name):
+    """
+    Library to LD_PRELOAD for `name`, None for the system malloc.
+    Raises FileNotFoundError when the library is not installed.
+    """
+    if name == "system":
+        return None
+    lib = ctypes.util.find_library(name)
+    if lib is None and name == "tcmalloc":
+        lib = ctypes.util.find_library("tcmalloc_minimal")
+    if lib is None:
+        raise FileNotFoundError(f"{name} not found (apt install {PACKAGES[name]})")
+    return lib
+
+
+def worker_env(workers, threads="auto", interop_threads=0, affinity="", malloc="system", env=None):
+    """
+    Environment for API workers with the given budget.
+    """
+    env = dict(os.environ if env is None else env)
+    env.update({
+        "WEB_CONCURRENCY": str(workers),
+        "TORCH_THREADS": str(threads),
+        "TORCH_INTEROP_THREADS": str(interop_threads),
+        "CPU_AFFINITY": affinity,
+    })
+    lib = find_allocator(malloc)
+    if lib is not None:
+        env["LD_PRELOAD"] = " ".join(filter(None, [lib, env.get("LD_PRELOAD", "")]))
+    return env
+
+
+def main():
+    argv = sys.argv[1:]
+    uvicorn_args = []
+    if "--" in argv:
+        i = argv.index("--")
+        argv, uvicorn_args = argv[:i], argv[i + 1:]
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", default="auto", help="torch threads per worker, auto = cores / workers")
+    parser.add_argument("--interop_threads", type=int, default=0)
+    parser.add_argument("--affinity", default="", help='"" (no pinning), auto, or a CPU list such as 0-3')
+    parser.add_argument("--malloc", choices=ALLOCATORS, default="system")
+    args = parser.parse_args(argv)
+
+    try:
+        env = worker_env(args.workers, args.threads, args.interop_threads, args.affinity, args.malloc)
+    except FileNotFoundError as e:
+        sys.exit(f"[ERROR] {e}")
+    cmd = [sys.executable, "-m", "uvicorn", "api:app", "--workers", str(args.workers), *uvicorn_args]
+    print(f"[INFO] {' '.join(cmd)}  (threads={args.threads}, affinity={args.affinity or 'none'}, "
+          f"malloc={args.malloc})")
+    os.execve(sys.executable, cmd, env)
+
+
+if __name__ == "__main__":
+    main()
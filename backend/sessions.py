@@ -0,0 +1,306 @@
+"""
+Per-session map and RL state for the API.
+
+Each client sends an `X-Session-ID` header; the map (occupancy grid) and
+the RL environment it steps are kept per session instead of in process
+globals. Sessions are evicted after SESSION_TTL seconds without use, and
+the least recently used one is dropped when more than SESSION_MAX exist.
+Changes to the map and the RL grid are published to the session's
+MapFeed (map_feed.py) for the /ws/map WebSocket.
+
+With SESSION_DIR set, sessions are also kept on disk so several uvicorn
+workers can serve them: the map (occupancy, layers, fused scans) in
+<id>.npz and the RL environment in rl/<id>.npz. After a request, only
+the parts it changed are written (an /rl_step does not rewrite the map),
+and a part is re-read when another worker changed it. Read-only
+requests (session(id, write=False)) load but never save. A per-session
+lock file (fcntl, POSIX only) serialises access across processes;
+read-only access takes it shared.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from exploration import FrontierMap
+from map_feed import MapFeed
+from registration import ScanMap
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single worker only
+    fcntl = None
+
+
+_SAFE_ID = re.compile(r"[^A-Za-z0-9_.-]")
+
+# persisted separately: a request rewrites only the parts it changed
+PARTS = ("map", "rl")
+
+
+class Session:
+    def __init__(self, session_id, grid_size, agent_factory):
+        self.id = session_id
+        self.feed = MapFeed()
+        self.dirty = set()        # PARTS changed since the last save
+        self.occ_version = 0
+        self.occ = np.zeros((grid_size, grid_size), dtype=np.uint8)
+        self.layers = None        # 2.5D map layers (mapping.build_layers) of the last scan
+        self.pyramid = None       # MapPyramid of occ for /map/tile, built on first use
+        self.scan_map = None      # registration.ScanMap fused by /map/add_scan
+        self.frontiers = FrontierMap()   # exploration frontiers of layers["state"], rebuilt on demand
+        self._agent_factory = agent_factory
+        self._agent = None
+        self.lock = threading.RLock()
+        self.users = 0            # requests holding the session (never evicted meanwhile)
+        self.last_access = time.monotonic()
+        self.disk_mtime = dict.fromkeys(PARTS)
+        self.dirty.clear()
+
+    @property
+    def occ(self):
+        return self._occ
+
+    @occ.setter
+    def occ(self, grid):
+        # Replace, don't mutate in place: the version tells caches (map tiles) to refresh
+        self._occ = grid
+        self.occ_version += 1
+        self.dirty.add("map")
+        self.feed.publish("map", grid)
+
+    @property
+    def layers(self):
+        return self._layers
+
+    @layers.setter
+    def layers(self, layers):
+        self._layers = layers
+        self.dirty.add("map")
+
+    @property
+    def scan_map(self):
+        # fused in place by /map/add_scan, which also replaces occ when it changes
+        return self._scan_map
+
+    @scan_map.setter
+    def scan_map(self, scan_map):
+        self._scan_map = scan_map
+        self.dirty.add("map")
+
+    @property
+    def agent(self):
+        # Built on first RL use; map-only sessions never load torch.
+        # Any use in a writable block may move it: the RL part is saved.
+        if self._agent is None:
+            self._agent = self._agent_factory()
+        self.dirty.add("rl")
+        return self._agent
+
+    @property
+    def has_agent(self):
+        return self._agent is not None
+
+    def publish_rl(self, **info):
+        """
+        Pushes the RL grid and agent state (plus e.g. reward, done) to the feed.
+        """
+        env = self.agent.env
+        self.feed.publish("rl", env.grid, {"pos": list(env.agent_pos), "goal": list(env.goal_pos), **info})
+
+    def state_dict(self, part):
+        """
+        Arrays of one of PARTS, None if there is nothing to save (no agent yet).
+        """
+        if part == "rl":
+            if self._agent is None:
+                return None
+            return {f"env_{k}": v for k, v in self._agent.env.state_dict().items()}
+        state = {"occ": self.occ}
+        for k, v in (self.layers or {}).items():
+            state[f"layer_{k}"] = v
+        if self.scan_map is not None:
+            for k, v in self.scan_map.state_dict().items():
+                state[f"scan_{k}"] = v
+        return state
+
+    def load_state_dict(self, part, state):
+        if part == "rl":
+            env_state = {k[4:]: state[k] for k in state if k.startswith("env_")}
+            self.agent.state = self.agent.env.load_state_dict(env_state)
+            self.publish_rl()
+            return
+        self.occ = np.array(state["occ"], dtype=np.uint8)
+        layers = {k[6:]: state[k] for k in state if k.startswith("layer_")}
+        self.layers = layers or None
+        scan_state = {k[5:]: state[k] for k in state if k.startswith("scan_")}
+        self.scan_map = ScanMap().load_state_dict(scan_state) if scan_state else None
+
+
+class DiskSessionBackend:
+    """
+    Per session under `root`: `<id>.npz` (map part), `rl/<id>.npz` (RL
+    part) and `<id>.lock`.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        (self.root / "rl").mkdir(parents=True, exist_ok=True)
+
+    def _path(self, session_id, suffix, part="map"):
+        base = self.root / "rl" if part == "rl" else self.root
+        return base / f"{_SAFE_ID.sub('_', session_id)}{suffix}"
+
+    @contextmanager
+    def locked(self, session_id, shared=False):
+        if fcntl is None:
+            yield
+            return
+        with open(self._path(session_id, ".lock"), "a+") as fh:
+            fcntl.flock(fh, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def mtime(self, session_id, part):
+        try:
+            return self._path(session_id, ".npz", part).stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load(self, session_id, part):
+        path = self._path(session_id, ".npz", part)
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            return {k: data[k] for k in data.files}
+
+    def save(self, session_id, part, state):
+        path = self._path(session_id, ".npz", part)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            np.savez(fh, **state)
+        os.replace(tmp, path)   # atomic: readers never see a partial file
+        return path.stat().st_mtime_ns
+
+    def delete(self, session_id):
+        self._path(session_id, ".npz", "rl").unlink(missing_ok=True)
+        for suffix in (".npz", ".lock"):
+            self._path(session_id, suffix).unlink(missing_ok=True)
+
+    def purge(self, ttl):
+        # a session expires when none of its parts was written within ttl
+        cutoff = time.time() - ttl
+        newest = {}
+        for path in [*self.root.glob("*.npz"), *(self.root / "rl").glob("*.npz")]:
+            newest[path.stem] = max(newest.get(path.stem, 0), path.stat().st_mtime)
+        for session_id, mtime in newest.items():
+            if mtime < cutoff:
+                self.delete(session_id)
+
+
+class SessionStore:
+    """
+    Thread-safe session registry with TTL + LRU eviction.
+
+    Usage:
+        with SESSIONS.session(session_id) as s:
+            s.occ = ...
+            s.agent.step()
+
+        with SESSIONS.session(session_id, write=False) as s:   # reads only: no save
+            grid = s.occ.tolist()
+    """
+
+    def __init__(self, grid_size, agent_factory, ttl=3600.0, max_sessions=256, backend=None):
+        self.grid_size = grid_size
+        self.agent_factory = agent_factory
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.backend = backend
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_purge = time.monotonic()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _get_or_create(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            s = self._sessions.get(session_id)
+            if s is None:
+                s = Session(session_id, self.grid_size, self.agent_factory)
+                self._sessions[session_id] = s
+                excess = len(self._sessions) - self.max_sessions
+                if excess > 0:
+                    # least recently used first; a session in use is never dropped
+                    idle = [sid for sid, other in self._sessions.items() if not other.users]
+                    for sid in idle[:excess]:
+                        del self._sessions[sid]
+            else:
+                self._sessions.move_to_end(session_id)
+            s.last_access = now
+            s.users += 1
+            return s
+
+    def _release(self, s):
+        with self._lock:
+            s.users -= 1
+            s.last_access = time.monotonic()
+
+    def _evict(self, now):
+        # OrderedDict is kept in access order: expired sessions are at the front
+        for sid, s in list(self._sessions.items()):
+            if now - s.last_access <= self.ttl:
+                break
+            if not s.users:
+                del self._sessions[sid]
+
+        if self.backend is not None and now - self._last_purge > 60:
+            self._last_purge = now
+            self.backend.purge(self.ttl)
+
+    @contextmanager
+    def session(self, session_id, write=True):
+        """
+        The session, locked for the block. write=False: the block only
+        reads it, so it is not saved to SESSION_DIR afterwards.
+        """
+        s = self._get_or_create(session_id or "default")
+        try:
+            with s.lock:
+                if self.backend is None:
+                    yield s
+                    return
+
+                with self.backend.locked(s.id, shared=not write):
+                    for part in PARTS:
+                        mtime = self.backend.mtime(s.id, part)
+                        if mtime is not None and mtime != s.disk_mtime[part]:
+                            s.load_state_dict(part, self.backend.load(s.id, part))
+                            s.disk_mtime[part] = mtime
+                    s.dirty.clear()
+                    yield s
+                    if write:
+                        for part in PARTS:
+                            state = s.state_dict(part) if part in s.dirty else None
+                            if state is not None:
+                                s.disk_mtime[part] = self.backend.save(s.id, part, state)
+                    s.dirty.clear()
+        finally:
+            self._release(s)
+
+    def drop(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        if self.backend is not None:
+            self.backend.delete(session_id)
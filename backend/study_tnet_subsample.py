@@ -0,0 +1,141 @@
+"""
+Accuracy / speed study for estimating the T-Net transform from a subsample.
+
+Baseline is the current chunked inference: every 50k chunk runs the T-Net
+over all of its points. The alternative computes one transform per scene
+from S random points (PointNetSegLite.input_transform) and reuses it for
+every chunk (TNET_POINTS=S in the API).
+
+Accuracy: per-class IoU on the val split for the baseline and each S,
+the IoU delta, and the share of points whose label changed.
+
+Speed: for each N, time of the T-Net work and the resulting end-to-end
+throughput. Per-chunk costs are measured on up to --measure_chunks chunks
+and scaled to the full scan.
+
+    cd backend
+    python study_tnet_subsample.py --samples 1024 4096 16384 --points 100000 1000000 5000000
+"""
+
+import argparse
+import glob
+import time
+
+import numpy as np
+import torch
+
+from config import CHECKPOINT_DIR, DATA_PROCESSED, NUM_CLASSES
+from evaluate import confusion_matrix, per_class_iou
+from generate_dummy_npz import ensure_fixture
+from models.pointnet import PointNetSegLite
+
+CHUNK = 50000
+
+
+def predict(model, points, tnet_points=None):
+    """
+    Chunked labels; tnet_points=None -> per-chunk full T-Net (baseline).
+    """
+    x = torch.from_numpy(points).unsqueeze(0)
+    trans = model.input_transform(x, tnet_points) if tnet_points else None
+    out = np.empty(points.shape[0], dtype=np.int64)
+    for i in range(0, points.shape[0], CHUNK):
+        logits = model(x[:, i:i + CHUNK], trans=trans)
+        out[i:i + CHUNK] = logits.argmax(dim=1)[0].numpy()
+    return out
+
+
+def accuracy_study(model, files, samples):
+    modes = [None] + samples
+    conf = {m: np.zeros((NUM_CLASSES, NUM_CLASSES), dtype=np.int64) for m in modes}
+    changed = {m: 0 for m in samples}
+    total = 0
+    for path in files:
+        with np.load(path) as d:
+            points = d["points"][:, :7].astype(np.float32)
+            labels = d["labels"].astype(np.int64)
+        base = predict(model, points)
+        conf[None] += confusion_matrix(base, labels, NUM_CLASSES)
+        for s in samples:
+            pred = predict(model, points, s)
+            conf[s] += confusion_matrix(pred, labels, NUM_CLASSES)
+            changed[s] += int((pred != base).sum())
+        total += points.shape[0]
+
+    base_iou = per_class_iou(conf[None])
+    header = f"{'class':>5} | {'baseline':>8} | " + " | ".join(f"S={s:>6} d" for s in samples)
+    print(header)
+    for c in range(NUM_CLASSES):
+        cells = [f"{per_class_iou(conf[s])[c] - base_iou[c]:>+10.4f}" for s in samples]
+        print(f"{c:>5} | {base_iou[c]:>8.4f} | " + " | ".join(cells))
+    print(f"{'mIoU':>5} | {np.nanmean(base_iou):>8.4f} | " + " | ".join(
+        f"{np.nanmean(per_class_iou(conf[s])) - np.nanmean(base_iou):>+10.4f}" for s in samples))
+    print(f"{'chg%':>5} | {'':>8} | " + " | ".join(f"{100 * changed[s] / total:>10.3f}" for s in samples))
+
+
+def timed(fn, repeat=3):
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def speed_study(model, sizes, samples, measure_chunks):
+    print(f"{'N':>10} | {'mode':>8} | {'T-Net s':>8} | {'total s':>9} | {'Mpts/s':>7}")
+    for n in sizes:
+        with np.load(ensure_fixture(n)) as d:
+            x = torch.from_numpy(d["points"]).unsqueeze(0)
+        chunks = (n + CHUNK - 1) // CHUNK
+        measured = min(chunks, measure_chunks)
+        parts = [x[:, i * CHUNK:(i + 1) * CHUNK] for i in range(measured)]
+        scale = chunks / measured
+
+        tnet_chunk = timed(lambda: [model.input_transform(p) for p in parts]) * scale
+        fixed = model.input_transform(parts[0])
+        body = timed(lambda: [model(p, trans=fixed) for p in parts]) * scale
+        base_total = body + tnet_chunk
+        print(f"{n:>10,} | {'per-chunk':>8} | {tnet_chunk:>8.3f} | {base_total:>9.2f} | {n / base_total / 1e6:>7.3f}")
+
+        for s in samples:
+            tnet_scene = timed(lambda: model.input_transform(x, s))
+            total = body + tnet_scene
+            print(f"{n:>10,} | {'S=' + str(s):>8} | {tnet_scene:>8.3f} | {total:>9.2f} | "
+                  f"{n / total / 1e6:>7.3f}  ({base_total / total:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, nargs="+", default=[1024, 4096, 16384])
+    parser.add_argument("--points", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--val_glob", default=str(DATA_PROCESSED / "val_*.npz"))
+    parser.add_argument("--measure_chunks", type=int, default=3)
+    parser.add_argument("--skip_accuracy", action="store_true")
+    parser.add_argument("--skip_speed", action="store_true")
+    args = parser.parse_args()
+
+    torch.set_grad_enabled(False)
+    model = PointNetSegLite(num_classes=NUM_CLASSES, input_dim=7).eval()
+    ckpt = CHECKPOINT_DIR / "pointnet_3dses_best.pth"
+    if ckpt.exists():
+        model.load_state_dict(torch.load(ckpt, map_location="cpu"))
+    else:
+        print("[WARN] No checkpoint: random weights, IoU numbers are not meaningful.")
+
+    if not args.skip_accuracy:
+        files = sorted(glob.glob(args.val_glob))
+        if files:
+            print(f"\n=== Per-class IoU on {len(files)} val scans (delta vs baseline) ===")
+            accuracy_study(model, files, args.samples)
+        else:
+            print(f"[WARN] No val scans match {args.val_glob}; skipping accuracy study.")
+
+    if not args.skip_speed:
+        print("\n=== T-Net cost and throughput ===")
+        speed_study(model, args.points, args.samples, args.measure_chunks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Throughput and tail latency of /segment inference for combinations of
+worker processes x torch threads (x pinning x allocator) on this host,
+and the best setting for serve.py.
+
+Each combination starts `workers` processes configured exactly like
+API workers (serve.worker_env + runtime.py), lets them warm up, then
+runs segment_subsampled() back to back in every worker for --seconds
+(closed loop, feature cache off, so every request pays for the full
+forward pass). "default" threads = torch's own choice, i.e. the
+unconfigured API. Combinations that need more threads than cores are
+skipped unless --oversubscribe. The suggestion is the lowest p99 among
+the settings within 5% of the best throughput (and within --p99_ms).
+
+    cd backend
+    python sweep_threads.py --workers 1 2 4 --threads default 1 2 4 --seconds 10
+    python sweep_threads.py --affinity none auto --malloc system jemalloc --p99_ms 500
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from runtime import available_cpus
+from serve import find_allocator, worker_env
+
+
+def child(points, seconds):
+    import api
+
+    rng = np.random.default_rng()
+    raw = rng.random((points, 7), dtype=np.float32) * np.float32(10)
+    api.segment_subsampled(raw, max_points=points)   # load + warm up
+    print("ready", flush=True)
+    sys.stdin.readline()                              # start signal
+
+    latencies = []
+    start = time.perf_counter()
+    while time.perf_counter() < start + seconds:
+        t0 = time.perf_counter()
+        api.segment_subsampled(raw, max_points=points)
+        latencies.append(time.perf_counter() - t0)
+    print(json.dumps({"latencies": latencies, "elapsed": time.perf_counter() - start,
+                      "runtime": api.runtime.describe()}), flush=True)
+
+
+def run(workers, threads, affinity, malloc, args):
+    env = worker_env(workers, 0 if threads == "default" else threads, 0, affinity, malloc)
+    env["FEATURE_CACHE_MB"] = "0"
+    cmd = [sys.executable, __file__, "--child", "--points", str(args.points), "--seconds", str(args.seconds)]
+    procs = [subprocess.Popen(cmd, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    try:
+        for p in procs:   # wait until every worker is warm
+            while p.stdout.readline().strip() != "ready":
+                if p.poll() is not None:
+                    raise RuntimeError(f"worker exited with {p.returncode}")
+        for p in procs:
+            p.stdin.write("go\n")
+            p.stdin.flush()
+        results = [json.loads(p.stdout.readline()) for p in procs]
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.kill()
+            p.wait()
+
+    lat = np.concatenate([r["latencies"] for r in results]) * 1000
+    return {
+        "workers": workers,
+        "threads": threads,
+        "affinity": affinity or "none",
+        "malloc": malloc,
+        "req_s": len(lat) / max(r["elapsed"] for r in results),
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "torch_threads": results[0]["runtime"].get("torch_threads"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", nargs="+", default=["default", "1", "2", "4"])
+    parser.add_argument("--affinity", nargs="+", default=["none"], help="none, auto or a CPU list")
+    parser.add_argument("--malloc", nargs="+", default=["system"], help="system, jemalloc, tcmalloc")
+    parser.add_argument("--points", type=int, default=50_000, help="points per request")
+    parser.add_argument("--seconds", type=float, default=10.0, help="measured time per combination")
+    parser.add_argument("--p99_ms", type=float, default=None, help="latency budget for the suggestion")
+    parser.add_argument("--oversubscribe", action="store_true", help="also run workers x threads > cores")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.points, args.seconds)
+        return
+
+    cores = len(available_cpus())
+    mallocs = []
+    for m in args.malloc:
+        try:
+            find_allocator(m)
+            mallocs.append(m)
+        except FileNotFoundError as e:
+            print(f"[WARN] skipping {m}: {e}")
+
+    print(f"{cores} cores, {args.points} points per request, {args.seconds:.0f} s per combination")
+    print(f"{'workers':>7} {'threads':>8} {'affinity':>8} {'malloc':>8} | {'req/s':>7} | "
+          f"{'p50 ms':>8} | {'p99 ms':>8}")
+    rows = []
+    for malloc in mallocs:
+        for affinity in args.affinity:
+            for workers in args.workers:
+                for threads in args.threads:
+                    used = workers * (cores if threads == "default" else int(threads))
+                    if threads != "default" and used > cores and not args.oversubscribe:
+                        continue
+                    row = run(workers, threads, "" if affinity == "none" else affinity, malloc, args)
+                    rows.append(row)
+                    print(f"{workers:>7} {threads:>8} {row['affinity']:>8} {malloc:>8} | {row['req_s']:>7.2f} | "
+                          f"{row['p50_ms']:>8.1f} | {row['p99_ms']:>8.1f}", flush=True)
+
+    ok = [r for r in rows if args.p99_ms is None or r["p99_ms"] <= args.p99_ms]
+    if not ok:
+        print(f"\nNo setting meets p99 <= {args.p99_ms} ms.")
+        return
+    # lowest p99 among the settings within 5% of the best throughput
+    top = max(r["req_s"] for r in ok)
+    best = min((r for r in ok if r["req_s"] >= 0.95 * top), key=lambda r: r["p99_ms"])
+    threads = "0" if best["threads"] == "default" else best["threads"]
+    affinity = "" if best["affinity"] == "none" else f" --affinity {best['affinity']}"
+    print(f"\nBest: {best['workers']} workers x {best['threads']} threads, {best['req_s']:.2f} req/s, "
+          f"p99 {best['p99_ms']:.1f} ms")
+    print(f"  python serve.py --workers {best['workers']} --threads {threads}{affinity} --malloc {best['malloc']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""
+The backend modules import each other as top-level modules (run from
+backend/), so put backend/ on the path for the tests.
+
+    cd backend
+    python -m pytest -q tests
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,82 @@
+"""
+/build_map vs /map/add_scan on one session: build_map starts over from
+its scan, add_scan fuses into the map built by earlier add_scan calls.
+"""
+
+import io
+import uuid
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def session():
+    return {"X-Session-ID": f"test-{uuid.uuid4().hex}"}
+
+
+def room_scan(n=20000, seed=0, shift=0.0):
+    """
+    Walls and floor of a 8 x 6 m room, as an NPZ upload.
+    """
+    rng = np.random.default_rng(seed)
+    pts = np.c_[rng.random(n) * 8, rng.random(n) * 6, rng.random(n) * 2.5]
+    quarter = n // 4
+    pts[:quarter, 0] = 0
+    pts[quarter:2 * quarter, 1] = 0
+    pts[2 * quarter:3 * quarter, 0] = 8
+    pts[3 * quarter:, 2] = 0.0      # floor
+    pts[:, 0] += shift
+    buf = io.BytesIO()
+    np.savez(buf, points=pts.astype(np.float32), labels=rng.integers(0, 8, n).astype(np.uint8))
+    return {"file": ("scan.npz", buf.getvalue())}
+
+
+def scan_map(headers):
+    with api.SESSIONS.session(headers["X-Session-ID"], write=False) as s:
+        return s.scan_map
+
+
+def test_add_scan_fuses(client, session):
+    first = client.post("/map/add_scan", files=room_scan(), headers=session).json()
+    assert first["fused"] and first["scans"] == 1
+    second = client.post("/map/add_scan", files=room_scan(seed=1, shift=0.05), headers=session).json()
+    assert second["fused"] and second["scans"] == 2
+    assert len(scan_map(session).poses) == 2
+
+
+def test_build_map_starts_over(client, session):
+    client.post("/map/add_scan", files=room_scan(), headers=session)
+    for _ in range(2):
+        r = client.post("/build_map", files=room_scan(seed=2), headers=session)
+        assert r.status_code == 200
+        assert scan_map(session) is None
+    grid = client.get("/get_map", headers=session).json()["grid"]
+    assert np.asarray(grid).any()
+    # the next add_scan starts a new fused map
+    assert client.post("/map/add_scan", files=room_scan(), headers=session).json()["scans"] == 1
+
+
+def test_add_scan_rejects_bad_uploads(client, session):
+    buf = io.BytesIO()
+    np.savez(buf, points=np.zeros((0, 7), np.float32), labels=np.zeros(0, np.uint8))
+    r = client.post("/map/add_scan", files={"file": ("scan.npz", buf.getvalue())}, headers=session)
+    assert r.status_code == 400 and "error" in r.json()
+    buf = io.BytesIO()
+    np.savez(buf, points=np.zeros((5, 7), np.float32))
+    r = client.post("/map/add_scan", files={"file": ("scan.npz", buf.getvalue())}, headers=session)
+    assert r.status_code == 400 and "labels" in r.json()["error"]
+
+
+def test_sessions_are_isolated(client, session):
+    other = {"X-Session-ID": session["X-Session-ID"] + "-other"}
+    client.post("/build_map", files=room_scan(), headers=session)
+    assert not np.asarray(client.get("/get_map", headers=other).json()["grid"]).any()
@@ -0,0 +1,55 @@
+import numpy as np
+
+from exploration import FrontierMap, frontier_mask, nearest_free
+from mapping import FREE, OCCUPIED, UNKNOWN
+
+
+def random_state(shape, rng):
+    return rng.choice(np.array([UNKNOWN, FREE, OCCUPIED], dtype=np.int8), size=shape, p=[0.5, 0.4, 0.1])
+
+
+def frontier_cells(state):
+    return set(np.flatnonzero(frontier_mask(state)).tolist())
+
+
+def test_incremental_update_matches_full_scan():
+    rng = np.random.default_rng(0)
+    state = random_state((64, 80), rng)
+    diff, hinted = FrontierMap(), FrontierMap()
+    diff.update(state)
+    hinted.update(state)
+    for _ in range(30):
+        changed = rng.choice(state.size, 40, replace=False)
+        state = state.copy()
+        state.ravel()[changed] = random_state(40, rng)
+        diff.update(state)
+        hinted.update(state, changed)
+        expected = frontier_cells(state)
+        assert diff.cells == expected
+        assert hinted.cells == expected
+        np.testing.assert_array_equal(diff.frontier, frontier_mask(state))
+
+
+def test_update_without_changes_keeps_version():
+    state = random_state((16, 16), np.random.default_rng(1))
+    frontiers = FrontierMap()
+    frontiers.update(state)
+    version = frontiers.version
+    assert frontiers.update(state.copy()) == 0
+    assert frontiers.version == version
+
+
+def test_next_goal_is_reachable_frontier():
+    state = np.full((20, 20), UNKNOWN, dtype=np.int8)
+    state[5:15, 2:10] = FREE
+    state[5:15, 10] = OCCUPIED
+    state[9, 10] = FREE       # door
+    state[5:15, 11:14] = FREE
+    frontiers = FrontierMap(min_size=1)
+    frontiers.update(state)
+    start = nearest_free(state, (0, 0))
+    goal = frontiers.next_goal(start)
+    assert goal is not None and frontier_mask(state)[goal[1], goal[0]]
+    path = frontiers.path(start, goal)
+    assert path[0] == list(start) and path[-1] == list(goal)
+    assert all(state[y, x] == FREE for x, y in path)
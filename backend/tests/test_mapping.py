@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from api import points_to_occupancy
+from mapping import FREE, OCCUPIED, UNKNOWN, build_layers
+
+
+@pytest.mark.parametrize("grid", [40, 200])
+def test_occupancy_matches_points_to_occupancy(grid):
+    rng = np.random.default_rng(grid)
+    n = 50000
+    points = np.c_[rng.random((n, 2)) * [12, 9], rng.random(n) * 3].astype(np.float32)
+    labels = rng.integers(0, 8, n).astype(np.uint8)
+    kw = dict(grid_size=grid, resolution=0.2, z_thresh=(0.1, 2.5))
+    layers = build_layers(points, labels=labels, **kw)
+    np.testing.assert_array_equal(layers["occupancy"], points_to_occupancy(points, labels=labels, **kw))
+
+
+def test_layers_are_consistent():
+    rng = np.random.default_rng(0)
+    n = 20000
+    points = np.c_[rng.random((n, 2)) * 6, rng.random(n) * 3].astype(np.float32)
+    labels = rng.integers(0, 8, n).astype(np.uint8)
+    layers = build_layers(points, labels=labels, grid_size=40, resolution=0.2, z_thresh=(0.1, 2.5),
+                          num_classes=8, origin=(3.0, 3.0))
+    count = layers["count"].astype(np.int64)
+    assert count.sum() == n
+    np.testing.assert_array_equal(layers["class_hist"].sum(axis=0), count)
+    observed = count > 0
+    assert (layers["state"][~observed] != OCCUPIED).all()
+    assert set(np.unique(layers["state"])) <= {UNKNOWN, FREE, OCCUPIED}
@@ -0,0 +1,97 @@
+import io
+
+import numpy as np
+import pytest
+from scipy.spatial import cKDTree
+
+from scan_format import ScanFile, open_scan, scan_files, write_scan
+
+
+def scene(n=20000, seed=0):
+    """
+    Random points over several 3 m chunks, in no particular order.
+    """
+    rng = np.random.default_rng(seed)
+    points = np.c_[
+        rng.random((n, 2)) * [10, 7],
+        rng.random(n) * 3,
+        rng.integers(0, 256, (n, 3)),
+        rng.random(n) * 1000,
+    ].astype(np.float32)
+    return points, rng.integers(0, 13, n)
+
+
+def roundtrip(points, labels=None, **kw):
+    buf = io.BytesIO()
+    write_scan(buf, points, labels, **kw)
+    buf.seek(0)
+    return ScanFile(buf)
+
+
+def test_full_read_restores_row_order():
+    points, labels = scene()
+    scan = roundtrip(points, labels)
+    assert scan.row_order is not None
+    out = scan["points"]
+    assert out.shape == points.shape
+    np.testing.assert_allclose(out[:, :3], points[:, :3], atol=0.0005 + 1e-6)
+    np.testing.assert_array_equal(out[:, 3:6], points[:, 3:6])         # uint8 colours: exact
+    np.testing.assert_allclose(out[:, 6], points[:, 6], atol=1000 / 65535)
+    np.testing.assert_array_equal(scan["labels"], labels)
+    np.testing.assert_array_equal(scan.read(["labels"])["labels"], labels)
+
+
+def test_chunk_ordered_scan_has_no_rows_block():
+    points, labels = scene()
+    one_chunk = points[(points[:, 0] < 2) & (points[:, 1] < 2)]
+    scan = roundtrip(one_chunk)
+    assert scan.row_order is None
+    np.testing.assert_allclose(scan["points"][:, :3], one_chunk[:, :3], atol=0.0005 + 1e-6)
+
+
+def test_read_points_into_matches_getitem():
+    points, labels = scene()
+    scan = roundtrip(points, labels)
+    out = np.full((len(points), 9), -1, dtype=np.float32)
+    assert scan.read_points_into(out) == 7
+    np.testing.assert_array_equal(out[:, :7], scan["points"])
+    assert (out[:, 7:] == -1).all()    # columns past the scan's features untouched
+
+
+def test_region_read_returns_overlapping_chunks():
+    points, labels = scene()
+    scan = roundtrip(points, labels)
+    region = (3.0, 3.0, 6.0, 6.0)
+    cols = scan.read(region=region)
+    chunks = scan.chunks_in(region)
+    assert 0 < len(chunks) < len(scan.chunks)
+    assert len(cols["x"]) == sum(scan.chunks[c]["count"] for c in chunks)
+
+    # every point of the region is there, with its label
+    lo, hi = np.array(region[:2]), np.array(region[2:])
+    inside = ((points[:, :2] >= lo) & (points[:, :2] <= hi)).all(axis=1)
+    dist, nearest = cKDTree(np.c_[cols["x"], cols["y"]]).query(points[inside, :2])
+    assert dist.max() < 0.001
+    np.testing.assert_array_equal(cols["labels"][nearest], labels[inside])
+
+
+def test_open_scan_reads_both_formats(tmp_path):
+    points, labels = scene(2000)
+    np.savez(tmp_path / "a.npz", points=points, labels=labels)
+    write_scan(tmp_path / "a.lsc", points, labels)
+    for name in ("a.npz", "a.lsc"):
+        with open_scan(tmp_path / name) as data:
+            np.testing.assert_array_equal(data["labels"], labels)
+            assert data["points"].shape == points.shape
+
+
+def test_scan_files_lists_one_file_per_scene(tmp_path):
+    for name in ("train_a.npz", "train_a.lsc", "train_b.npz", "train_c.lsc", "val_d.npz"):
+        (tmp_path / name).touch()
+    names = [p.rsplit("/", 1)[-1] for p in scan_files(tmp_path, "train")]
+    assert names == ["train_a.lsc", "train_b.npz", "train_c.lsc"]
+
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        ScanFile(io.BytesIO(b"PK\x03\x04" + bytes(16)))
@@ -1,32 +1,69 @@
 import argparse
+import time
+from pathlib import Path
+
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
 from torch.utils.data import DataLoader
 
+from augment import BatchAugment
+from class_index import ClassBalancedSampler, class_weights, load_or_build_class_index
 from config import DATA_PROCESSED, CHECKPOINT_DIR, NUM_CLASSES, NUM_POINTS
-from dataset import PointCloudDataset
+from dataset import BlockDataset, PointCloudDataset
+from evaluate import confusion_matrix, per_class_iou
+from model_registry import write_metadata
 from models.pointnet import PointNetSegLite
 
 
 def train(args):
+    """
+    Returns the per-epoch history (loss, accuracy, val mIoU, elapsed seconds).
+    """
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
-
-    train_ds = PointCloudDataset(DATA_PROCESSED, split="train", num_points=NUM_POINTS)
-    val_ds = PointCloudDataset(DATA_PROCESSED, split="val", num_points=NUM_POINTS)
-    train_loader = DataLoader(train_ds, batch_size=args.batch_size, shuffle=True, num_workers=2)
-    val_loader = DataLoader(val_ds, batch_size=args.batch_size, shuffle=False, num_workers=2)
+    checkpoint_dir = Path(args.checkpoint_dir)
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+    val_ds = PointCloudDataset(args.data_dir, split="val", num_points=args.num_points)
+    val_loader = DataLoader(val_ds, batch_size=args.batch_size, shuffle=False, num_workers=args.workers)
+
+    sampler = None
+    loss_weight = None
+    if args.balanced:
+        # Blocks drawn by class rarity, points inside a block weighted by
+        # class, and the same class weights in the loss (class_index.py)
+        index = load_or_build_class_index(args.data_dir, "train")
+        weights = class_weights(index["hist"])
+        train_ds = BlockDataset(args.data_dir, index, split="train", num_points=args.num_points,
+                                point_weights=weights)
+        sampler = ClassBalancedSampler(index["hist"], weights, num_samples=args.samples_per_epoch,
+                                       balance_start=args.balance_start, balance_end=args.balance_end,
+                                       epochs=args.epochs, seed=args.seed)
+        loss_weight = torch.tensor(weights, dtype=torch.float32, device=device)
+        print(f"Balanced sampling over {len(train_ds)} blocks; class weights",
+              np.round(weights, 2).tolist())
+    else:
+        train_ds = PointCloudDataset(args.data_dir, split="train", num_points=args.num_points)
+    train_loader = DataLoader(train_ds, batch_size=args.batch_size, shuffle=sampler is None,
+                              sampler=sampler, num_workers=args.workers)
 
     from models.pointnet import PointNetSegLite
     model = PointNetSegLite(num_classes=NUM_CLASSES, input_dim=7).to(device)
 
-    criterion = nn.CrossEntropyLoss()
+    # Augmentation runs on the collated batch (augment.py), not in the loader workers
+    augment = BatchAugment(seed=args.seed) if args.augment else None
+
+    criterion = nn.CrossEntropyLoss(weight=loss_weight)
     optimizer = optim.Adam(model.parameters(), lr=args.lr)
 
     best_val_acc = 0.0
+    history = []
+    t0 = time.perf_counter()
 
     for epoch in range(1, args.epochs + 1):
+        if sampler is not None:
+            sampler.set_epoch(epoch - 1)
         model.train()
         total_loss = 0.0
         total_correct = 0
@@ -34,6 +71,8 @@ def train(args):
 
         for pts, labels in train_loader:
             pts, labels = pts.to(device), labels.to(device)
+            if augment is not None:
+                pts, labels = augment(pts, labels)
             optimizer.zero_grad()
             logits = model(pts)  # (B,C,N)
             logits = logits.transpose(2, 1).contiguous().view(-1, NUM_CLASSES)
@@ -54,6 +93,7 @@ def train(args):
         model.eval()
         val_correct = 0
         val_points = 0
+        conf = np.zeros((NUM_CLASSES, NUM_CLASSES), dtype=np.int64)
         with torch.no_grad():
             for pts, labels in val_loader:
                 pts, labels = pts.to(device), labels.to(device)
@@ -63,16 +103,30 @@ def train(args):
                 preds = logits.argmax(dim=1)
                 val_correct += (preds == labels_flat).sum().item()
                 val_points += labels_flat.numel()
+                conf += confusion_matrix(preds.cpu().numpy(), labels_flat.cpu().numpy(), NUM_CLASSES)
 
         val_acc = val_correct / val_points if val_points > 0 else 0.0
+        val_iou = per_class_iou(conf)
+        val_miou = float(np.nanmean(val_iou)) if not np.all(np.isnan(val_iou)) else 0.0
         print(f"Epoch {epoch:03d} | Train loss {train_loss:.4f} | "
-              f"Train acc {train_acc:.4f} | Val acc {val_acc:.4f}")
+              f"Train acc {train_acc:.4f} | Val acc {val_acc:.4f} | Val mIoU {val_miou:.4f}")
+        history.append({"epoch": epoch, "seconds": time.perf_counter() - t0, "train_loss": train_loss,
+                        "train_acc": train_acc, "val_acc": val_acc, "val_miou": val_miou,
+                        "val_iou": val_iou.tolist()})
 
         if val_acc > best_val_acc:
             best_val_acc = val_acc
-            ckpt = CHECKPOINT_DIR / "pointnet_3dses_best.pth"
-            torch.save(model.state_dict(), ckpt)
+            ckpt = checkpoint_dir / f"{args.name}.pth"
+            # Sidecar first, then an atomic replace: a running API hot-reloads
+            # on the new mtime and never reads a half-written file
+            write_metadata(ckpt, architecture="pointnet_lite", input_dim=7, num_classes=NUM_CLASSES,
+                           epoch=epoch, val_acc=round(val_acc, 4), augment=args.augment,
+                           balanced=args.balanced)
+            tmp = ckpt.with_suffix(".pth.tmp")
+            torch.save(model.state_dict(), tmp)
+            tmp.replace(ckpt)
             print("  -> Saved best model to", ckpt)
+    return history
 
 
 if __name__ == "__main__":
@@ -80,5 +134,20 @@ if __name__ == "__main__":
     parser.add_argument("--epochs", type=int, default=10)
     parser.add_argument("--batch_size", type=int, default=4)
     parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--name", default="pointnet_3dses_best", help="checkpoint name in CHECKPOINT_DIR")
+    parser.add_argument("--augment", action="store_true",
+                        help="random z-rotation, scaling, jitter, colour/intensity gain and point dropout per batch")
+    parser.add_argument("--seed", type=int, default=0, help="augmentation / sampler seed")
+    parser.add_argument("--balanced", action="store_true",
+                        help="class-balanced block sampling + class-weighted loss (class_index.py)")
+    parser.add_argument("--balance_start", type=float, default=1.0,
+                        help="share of balanced vs uniform block draws in the first epoch")
+    parser.add_argument("--balance_end", type=float, default=1.0, help="... and in the last epoch")
+    parser.add_argument("--samples_per_epoch", type=int, default=None,
+                        help="blocks per epoch with --balanced (default: one per block)")
+    parser.add_argument("--num_points", type=int, default=NUM_POINTS)
+    parser.add_argument("--workers", type=int, default=2, help="DataLoader workers")
+    parser.add_argument("--data_dir", default=str(DATA_PROCESSED))
+    parser.add_argument("--checkpoint_dir", default=str(CHECKPOINT_DIR))
     args = parser.parse_args()
     train(args)
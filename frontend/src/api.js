@@ -1,14 +1,28 @@
 export const API_BASE = import.meta.env.VITE_API_BASE || "http://localhost:8000";
 
+// Map + RL state is kept per session on the server; one id per browser tab.
+function getSessionId() {
+  let id = sessionStorage.getItem("sessionId");
+  if (!id) {
+    id = crypto.randomUUID();
+    sessionStorage.setItem("sessionId", id);
+  }
+  return id;
+}
+
+const sessionHeaders = () => ({ "X-Session-ID": getSessionId() });
+
 export async function healthCheck() {
   const res = await fetch(`${API_BASE}/health`);
   return res.json();
 }
 
-export async function segmentPointCloud(file) {
+// scene: the `scene` of an earlier response when `file` is a crop / subset of that cloud
+export async function segmentPointCloud(file, scene) {
   const fd = new FormData();
   fd.append("file", file);
-  const res = await fetch(`${API_BASE}/segment`, { method: "POST", body: fd });
+  const headers = scene ? { "X-Scene": scene } : {};
+  const res = await fetch(`${API_BASE}/segment`, { method: "POST", body: fd, headers });
   if (!res.ok) throw new Error("segment API failed");
   return res.json();
 }
@@ -21,34 +35,130 @@ export async function segmentRandom() {
 export async function buildMap(file) {
   const fd = new FormData();
   fd.append("file", file);
-  const res = await fetch(`${API_BASE}/build_map`, { method: "POST", body: fd });
+  const res = await fetch(`${API_BASE}/build_map`, { method: "POST", body: fd, headers: sessionHeaders() });
   if (!res.ok) throw new Error("build_map API failed");
   return res.json();
 }
 
+// Align a scan to the session's fused map and add it: { grid, pose, fitness, rmse, iterations, fused, scans }
+export async function addScan(file) {
+  const fd = new FormData();
+  fd.append("file", file);
+  const res = await fetch(`${API_BASE}/map/add_scan`, { method: "POST", body: fd, headers: sessionHeaders() });
+  if (!res.ok) throw new Error("add_scan API failed");
+  return res.json();
+}
+
 export async function getMap() {
-  const res = await fetch(`${API_BASE}/get_map`);
+  const res = await fetch(`${API_BASE}/get_map`, { headers: sessionHeaders() });
   if (!res.ok) throw new Error("get_map API failed");
   return res.json();
 }
 
 export async function rlResetRandom() {
-  const res = await fetch(`${API_BASE}/rl_reset_random`, { method: "POST" });
+  const res = await fetch(`${API_BASE}/rl_reset_random`, { method: "POST", headers: sessionHeaders() });
   if (!res.ok) throw new Error("rl_reset_random failed");
   return res.json();
 }
 
-export async function rlResetFromMap() {
-  const res = await fetch(`${API_BASE}/rl_reset_from_map`, { method: "POST" });
+export async function rlResetFromMap(explore = false) {
+  const res = await fetch(`${API_BASE}/rl_reset_from_map?explore=${explore}`, {
+    method: "POST",
+    headers: sessionHeaders(),
+  });
   if (!res.ok) throw new Error("rl_reset_from_map failed");
   return res.json();
 }
 
+// Frontier clusters of the session map, best first, and the path to the best one.
+// Returns { robot, frontier_cells, updated_cells, clusters, goal, path }.
+export async function getFrontiers(x, y) {
+  const query = x === undefined ? "" : `?x=${x}&y=${y}`;
+  const res = await fetch(`${API_BASE}/explore/frontiers${query}`, { headers: sessionHeaders() });
+  if (!res.ok) throw new Error("explore/frontiers failed");
+  return res.json();
+}
+
+// Moves the RL goal to the best frontier; goal is null once the map is explored.
+export async function exploreNextGoal() {
+  const res = await fetch(`${API_BASE}/explore/next_goal`, { method: "POST", headers: sessionHeaders() });
+  if (!res.ok) throw new Error("explore/next_goal failed");
+  return res.json();
+}
+
 export async function rlStep() {
-  const res = await fetch(`${API_BASE}/rl_step`, { method: "POST" });
+  const res = await fetch(`${API_BASE}/rl_step`, { method: "POST", headers: sessionHeaders() });
   if (!res.ok) throw new Error("rl_step failed");
   return res.json();
 }
+
+// Roll out `steps` moves (0 = whole episode) in one request.
+// Returns { start, goal, actions, positions, rewards, total_reward, done }.
+export async function rlRollout(steps = 0, epsilon = 0.2) {
+  const res = await fetch(
+    `${API_BASE}/rl_rollout?steps=${steps}&epsilon=${epsilon}`,
+    { method: "POST", headers: sessionHeaders() }
+  );
+  if (!res.ok) throw new Error("rl_rollout failed");
+  return res.json();
+}
+
+// Map pyramid: { tile_size, levels: [{ level, shape: [rows, cols], tiles: [nx, ny] }] }
+export async function getMapPyramid() {
+  const res = await fetch(`${API_BASE}/map/pyramid`, { headers: sessionHeaders() });
+  if (!res.ok) throw new Error("map/pyramid failed");
+  return res.json();
+}
+
+// One tile of class labels; the browser revalidates it with its ETag.
+// Returns { rows, cols, labels: Uint8Array(rows * cols) }.
+export async function getMapTile(level, x, y) {
+  const res = await fetch(`${API_BASE}/map/tile/${level}/${x}/${y}`, { headers: sessionHeaders() });
+  if (!res.ok) throw new Error("map/tile failed");
+  const [rows, cols] = res.headers.get("X-Tile-Shape").split(",").map(Number);
+  return { rows, cols, labels: new Uint8Array(await res.arrayBuffer()) };
+}
+
+// Live map + RL updates over /ws/map. Keeps a local copy of each channel's
+// grid ({ version, rows, cols, cells: Uint8Array, agent }) and calls
+// onUpdate(channel, state, msg) after every snapshot or delta. Reconnects
+// with the last epoch + versions, so only missed deltas are resent.
+export function openMapFeed(onUpdate, retryMs = 1000) {
+  const state = {};
+  let epoch = "";
+  let ws = null;
+  let closed = false;
+
+  const connect = () => {
+    const params = new URLSearchParams({ session: getSessionId(), epoch });
+    for (const [channel, s] of Object.entries(state)) params.set(`${channel}_version`, s.version);
+    ws = new WebSocket(`${API_BASE.replace(/^http/, "ws")}/ws/map?${params}`);
+
+    ws.onmessage = (e) => {
+      const msg = JSON.parse(e.data);
+      if (msg.type === "hello") {
+        if (msg.epoch !== epoch) for (const k of Object.keys(state)) delete state[k];
+        epoch = msg.epoch;
+        return;
+      }
+      if (msg.type === "snapshot") {
+        state[msg.channel] = { rows: msg.shape[0], cols: msg.shape[1], cells: decodeLabels(msg.data) };
+      } else {
+        const cells = state[msg.channel].cells;
+        msg.cells.forEach((idx, i) => { cells[idx] = msg.values[i]; });
+      }
+      const s = state[msg.channel];
+      s.version = msg.version;
+      if (msg.agent) s.agent = msg.agent;
+      onUpdate(msg.channel, s, msg);
+    };
+    ws.onclose = () => { if (!closed) setTimeout(connect, retryMs); };
+  };
+
+  connect();
+  return () => { closed = true; ws.close(); };
+}
+
 export function downloadRandomScene() {
   return `${API_BASE}/random_scene_npz`;
 }
@@ -57,18 +167,34 @@ export function downloadRandomScene() {
   ❗️ Correct Streaming Segmentation Function 
   Do NOT add another `segmentStream` above this.
 */
+// Decode base64 uint8 labels sent by /segment_stream
+function decodeLabels(b64) {
+  const bin = atob(b64);
+  const out = new Uint8Array(bin.length);
+  for (let i = 0; i < bin.length; i++) out[i] = bin.charCodeAt(i);
+  return out;
+}
+
 // 🚀 SSE Streaming API
-export async function segmentStream(file, onBatch, onComplete) {
+// Each batch carries its own (offset, count) slice of labels; the full
+// result is assembled here, so the server never re-sends it.
+export async function segmentStream(file, onBatch, onComplete, lastEventId) {
   return new Promise((resolve, reject) => {
     const url = `${API_BASE}/segment_stream`;
 
     const formData = new FormData();
     formData.append("file", file);
 
+    const headers = {};
+    if (lastEventId) headers["Last-Event-ID"] = String(lastEventId);
+
+    let labels = null;
+
     // Create fetch request
     fetch(url, {
       method: "POST",
       body: formData,
+      headers,
     }).then((res) => {
       if (!res.body) {
         reject(new Error("No response body received"));
@@ -92,27 +218,40 @@ export async function segmentStream(file, onBatch, onComplete) {
           buffer = parts.pop(); // last incomplete
 
           for (let part of parts) {
-            if (!part.startsWith("data:")) continue;
+            const line = part.split("\n").find((l) => l.startsWith("data:"));
+            if (!line) continue;
 
-            const jsonStr = part.replace("data:", "").trim();
-            const data = JSON.parse(jsonStr);
+            const data = JSON.parse(line.slice(5).trim());
 
             // Header
-            if (data.total_batches) {
+            if (data.type === "header") {
+              labels = new Uint8Array(data.num_points);
               onBatch({ header: true, total: data.total_batches });
               continue;
             }
 
             // Normal batch update
-            if (data.batch && data.preds) {
-              onBatch({ batch: data.batch, preds: data.preds });
+            if (data.type === "batch") {
+              const preds = decodeLabels(data.labels);
+              labels.set(preds, data.offset);
+              onBatch({
+                batch: data.batch,
+                preds,
+                progress: data.progress,
+                elapsedMs: data.elapsed_ms,
+              });
               continue;
             }
 
             // Final completion
-            if (data.done && data.final) {
-              onComplete(data.final);
+            if (data.type === "done") {
+              onComplete(Array.from(labels));
               resolve();
+              continue;
+            }
+
+            if (data.type === "error") {
+              reject(new Error(data.error));
             }
           }
 
@@ -121,7 +260,6 @@ export async function segmentStream(file, onBatch, onComplete) {
       }
 
       read();
-    });
+    }, reject);
   });
 }
-